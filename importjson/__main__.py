@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+# importjson : Command line tools
+
+Summary :
+    Command line interface for the importjson tools
+Use Case :
+    As a Developer I want to prepare my json modules ahead of time So that
+    my application starts quickly
+
+Testable Statements :
+    Can I build a bundle from the command line
+    Can I compile json files to python modules from the command line
+"""
+from __future__ import print_function
+
+import argparse
+import os
+import sys
+
+from .bundle import build_bundle
+from .compiler import compile_file, compile_directory
+
+__author__ = 'Tony Flury : anthony.flury@btinternet.com'
+__created__ = '19 Oct 2026'
+
+
+def _bundle(args):
+    """Build a bundle of json modules"""
+    modules = build_bundle(args.roots, args.output)
+    print("{} : {} modules".format(args.output, len(modules)))
+
+
+def _compile(args):
+    """Compile json files to standalone python modules"""
+    if os.path.isdir(args.source):
+        created = compile_directory(args.source, args.output,
+                                    include_json=args.include_json)
+        print("{} : {} modules".format(args.output, len(created)))
+    else:
+        compile_file(args.source, args.output, include_json=args.include_json)
+        print(args.output)
+
+
+def main(argv=None):
+    """Execute the importjson command line"""
+    parser = argparse.ArgumentParser(prog='python -m importjson',
+                                     description='importjson tools')
+    commands = parser.add_subparsers(dest='command')
+
+    bundle = commands.add_parser(
+        'bundle', help='Precompile the json modules in one or more '
+                       'directories into a single bundle file')
+    bundle.add_argument('roots', nargs='+', metavar='dir',
+                        help='Directory containing json modules')
+    bundle.add_argument('-o', '--output', required=True,
+                        help='The bundle file to create')
+    bundle.set_defaults(action=_bundle)
+
+    compile_ = commands.add_parser(
+        'compile', help='Compile a json file (or a directory of json files) '
+                        'into standalone python modules')
+    compile_.add_argument('source', metavar='source',
+                          help='The json file or directory to compile')
+    compile_.add_argument('-o', '--output', required=True,
+                          help='The python file to create - or the output '
+                               'directory if source is a directory')
+    compile_.add_argument('--no-json', dest='include_json',
+                          action='store_false',
+                          help='Do not include the __json__ attribute')
+    compile_.set_defaults(action=_compile)
+
+    args = parser.parse_args(argv)
+    if getattr(args, 'action', None) is None:
+        parser.print_help()
+        return 2
+
+    try:
+        args.action(args)
+    except (ImportError, IOError, OSError) as e:
+        print("{} : {}".format(parser.prog, e), file=sys.stderr)
+        return 1
+
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -0,0 +1,127 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+# importjson : Implementation of archive.py
+
+Summary :
+    Index of the json members of zip archives found on sys.path
+Use Case :
+    As a Developer I want to import json files from a zip archive So that
+    I can ship many small json modules as a single file
+
+Testable Statements :
+    Is the central directory of an archive only read once
+    Can a member be found without touching the file system
+    Can a member be read with a single seek and read
+"""
+import io
+import os
+import threading
+
+__author__ = 'Tony Flury : anthony.flury@btinternet.com'
+__created__ = '19 Oct 2026'
+
+
+def _is_zipfile(path):
+    """Whether the path is a zip archive
+
+       zipfile is only imported if the path is a file
+    """
+    if not os.path.isfile(path):
+        return False
+
+    import zipfile
+    try:
+        return zipfile.is_zipfile(path)
+    except (IOError, OSError):
+        return False
+
+
+class ZipIndex(object):
+    """In memory index of the members of a zip archive
+
+       The central directory is read once when the index is created, and the
+       archive is kept open so that each member is a single seek and read.
+    """
+
+    # Index for each path checked - None if the path isn't a zip archive
+    _indexes = {}
+    _indexes_lock = threading.Lock()
+
+    def __init__(self, archive):
+        import zipfile
+
+        self._archive = archive
+        self._zip = zipfile.ZipFile(archive)
+        self._members = dict((info.filename, info)
+                             for info in self._zip.infolist())
+        self._lock = threading.Lock()
+
+    @property
+    def archive(self):
+        """The file name of the archive"""
+        return self._archive
+
+    def __contains__(self, member):
+        return member in self._members
+
+    def size(self, member):
+        """The (uncompressed) size of a member - as recorded in the archive"""
+        return self._members[member].file_size
+
+    def read(self, member, max_size=None):
+        """Read the content of a member as bytes
+
+           With a max_size, no more than max_size + 1 bytes are decompressed
+        """
+        # The ZipFile shares a single file object between all members
+        with self._lock:
+            if max_size is None:
+                return self._zip.read(self._members[member])
+
+            with self._zip.open(self._members[member]) as fp:
+                return fp.read(max_size + 1)
+
+    def open(self, member, max_size=None):
+        """Open a member as a binary stream"""
+        return io.BytesIO(self.read(member, max_size))
+
+    def close(self):
+        """Close the archive"""
+        self._zip.close()
+
+    @classmethod
+    def for_path(cls, path):
+        """The index for a path entry, or None if it isn't a zip archive"""
+        try:
+            return cls._indexes[path]
+        except KeyError:
+            pass
+
+        with cls._indexes_lock:
+            if path not in cls._indexes:
+                cls._indexes[path] = cls(path) if _is_zipfile(path) else None
+
+            return cls._indexes[path]
+
+    @classmethod
+    def split(cls, file_name):
+        """Split a file name into the archive index and the member name
+
+           :return (None, None) : If the file isn't within a zip archive
+        """
+        archive, member = os.path.split(file_name)
+        index = cls.for_path(archive)
+        if index is None:
+            return None, None
+
+        return index, member
+
+    @classmethod
+    def invalidate(cls):
+        """Forget all indexes - archives are re-read on next use"""
+        with cls._indexes_lock:
+            for index in cls._indexes.values():
+                if index is not None:
+                    index.close()
+            cls._indexes.clear()
@@ -0,0 +1,162 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+# importjson : Implementation of asyncload.py
+
+Summary :
+    Loading of json modules without blocking the asyncio event loop
+Use Case :
+    As a Developer I want to load json modules on demand within an asyncio
+    application So that other tasks are not blocked while the json is
+    parsed and the code generated
+
+Testable Statements :
+    Can I load a json module by name or by file name
+    Is the event loop free to run other tasks during the load
+    Do concurrent loads of the same module share a single load
+"""
+import asyncio
+import os
+import sys
+
+from . import importjson as _importjson
+
+__author__ = 'Tony Flury : anthony.flury@btinternet.com'
+__created__ = '19 Oct 2026'
+
+# The loads in progress - keyed by (event loop, module name)
+_pending = {}
+
+
+def _resolve(name_or_path):
+    """The module name, and the json file name if a file name is given"""
+    suffixes = tuple(_importjson.get_configure("JSONSuffixes"))
+    if (os.sep in name_or_path or
+            (os.altsep and os.altsep in name_or_path) or
+            name_or_path.endswith(suffixes)):
+        mod_name = _importjson._module_name(name_or_path)
+        if mod_name is None:
+            raise ImportError(
+                "Unable to import : {} is not a json file".format(
+                    name_or_path))
+        return mod_name, name_or_path
+
+    return name_or_path, None
+
+
+def _load_detached(mod_name, file_name):
+    """Find, parse, generate & execute the module - without installing it
+
+       Executed within the event loop's executor, holding the same lock as
+       an import of the module; until it is installed the loaded module is
+       kept so that an import in the meantime uses it rather than loading
+       the module again.
+    """
+    if mod_name in sys.modules:
+        return sys.modules[mod_name]
+
+    loader = _importjson.JSONLoader()
+    with loader._module_lock(mod_name):
+        if mod_name in sys.modules:
+            return sys.modules[mod_name]
+
+        if file_name is not None:
+            _importjson.JSONLoader._found_modules[mod_name] = file_name
+        elif not _importjson._find_module(mod_name):
+            raise ImportError(
+                "Unable to import : No json module named {}".format(mod_name))
+
+        mod = loader._exec_module(mod_name)
+        _importjson.JSONLoader._detached[mod_name] = mod
+        return mod
+
+
+def _install(mod_name, mod):
+    """Install the module into sys.modules - executed on the event loop
+
+       If the module was imported by other means in the meantime, that
+       module is used instead.
+    """
+    loader = _importjson.JSONLoader
+    with loader._module_lock(mod_name):
+        # Not installed already by an import of the module (see load_module)
+        detached = loader._detached.get(mod_name) is mod
+        if detached:
+            del loader._detached[mod_name]
+        installed = sys.modules.setdefault(mod_name, mod)
+        detached = detached and installed is mod
+        if detached:
+            loader._record_load(mod_name)
+
+    if detached:
+        parent, _, child = mod_name.rpartition('.')
+        if parent in sys.modules:
+            setattr(sys.modules[parent], child, installed)
+
+        _importjson._evict(mod_name)
+
+    return installed
+
+
+async def aload(name_or_path):
+    """Load a json module without blocking the event loop
+
+       Reading & parsing the json file and generating & executing the code
+       are executed in the running loop's default executor; only the final
+       installation into sys.modules is executed on the event loop.
+       Concurrent loads of the same module share a single load - cancelling
+       one of them doesn't cancel the others.
+
+       :param name_or_path : The dotted module name, or the json file name
+       :return : The module
+    """
+    loop = _running_loop()
+    mod_name, file_name = _resolve(name_or_path)
+
+    if mod_name in sys.modules:
+        if mod_name in _importjson.JSONLoader._loaded:
+            _importjson._touch(mod_name)
+        return sys.modules[mod_name]
+
+    key = (loop, mod_name)
+    future = _pending.get(key)
+    if future is None:
+        future = _pending[key] = loop.create_future()
+
+        def _done(work):
+            """Install the loaded module & complete the future"""
+            del _pending[key]
+            if work.cancelled():
+                future.cancel()
+                return
+
+            if work.exception() is not None:
+                if not future.cancelled():
+                    future.set_exception(work.exception())
+                return
+
+            mod = _install(mod_name, work.result())
+            if not future.cancelled():
+                future.set_result(mod)
+
+        loop.run_in_executor(None, _load_detached,
+                             mod_name, file_name).add_done_callback(_done)
+
+    return await asyncio.shield(future)
+
+
+async def aload_many(names_or_paths):
+    """Load many json modules without blocking the event loop
+
+       :param names_or_paths : The dotted module names, or json file names
+       :return : The list of modules - in the same order
+    """
+    return await asyncio.gather(*[aload(name) for name in names_or_paths])
+
+
+def _running_loop():
+    """The running event loop - get_running_loop is new in Python 3.7"""
+    try:
+        return asyncio.get_running_loop()
+    except AttributeError:
+        return asyncio.get_event_loop()
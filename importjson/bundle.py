@@ -0,0 +1,189 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+# importjson : Implementation of bundle.py
+
+Summary :
+    A single file of precompiled json modules
+Use Case :
+    As a Developer I want to import many json modules from a single
+    precompiled file So that my application starts as quickly as possible
+
+Testable Statements :
+    Can I build a bundle from one or more directories
+    Can I import a module from a bundle without the original json file
+    Is the __json__ attribute available for modules loaded from a bundle
+    Is a bundle built by a different python version rejected
+"""
+import marshal
+import mmap
+import os
+import re
+import struct
+import sys
+import traceback as tr
+import types
+from collections import OrderedDict
+
+from . import importjson as _importjson
+from .cache import MAGIC_NUMBER
+
+__author__ = 'Tony Flury : anthony.flury@btinternet.com'
+__created__ = '19 Oct 2026'
+
+# The file starts with the bundle signature, the bytecode magic number of the
+# python version which built it, and the offset of the index
+_signature = b'IJB\x01'
+_header = struct.Struct('<4s4sQ')
+
+_identifier_re = re.compile(r'^[A-Za-z_][A-Za-z0-9_]*$')
+
+
+def _plain(value):
+    """Convert the parsed json into types which can be marshalled"""
+    if isinstance(value, dict):
+        return dict((k, _plain(v)) for k, v in value.items())
+    if isinstance(value, list):
+        return [_plain(v) for v in value]
+    return value
+
+
+def _find_json_files(roots):
+    """Generator of (module name, file name) for the json files in roots
+
+       Where the same module exists in more than one root, the first root
+       wins - in the same way as sys.path.
+    """
+    seen = set()
+    for root in roots:
+        for entry in sorted(os.listdir(root)):
+            file_name = os.path.join(root, entry)
+            mod_name = _importjson._module_name(entry)
+            if (mod_name is None or mod_name in seen or
+                    not _identifier_re.match(mod_name) or
+                    not os.path.isfile(file_name)):
+                continue
+            seen.add(mod_name)
+            yield mod_name, file_name
+
+
+def build_bundle(roots, output):
+    """Parse, generate and compile every json module in roots into a bundle
+
+       :param roots : The directories to search for json files
+       :param output : The file name of the bundle to create
+       :return : The list of module names in the bundle
+    """
+    loader = _importjson.JSONLoader()
+    index = OrderedDict()
+
+    with open(output, 'wb') as fp:
+        fp.write(_header.pack(_signature, MAGIC_NUMBER, 0))
+
+        for mod_name, file_name in _find_json_files(roots):
+            json_dict = _importjson._read_json(file_name)
+            source = loader._generate(mod_name, json_dict,
+                                      json_file=file_name)
+            code = _importjson._compile(source, file_name)
+
+            data = marshal.dumps((code, _plain(json_dict)))
+            index[mod_name] = (fp.tell(), len(data),
+                               os.path.basename(file_name))
+            fp.write(data)
+
+        index_offset = fp.tell()
+        fp.write(marshal.dumps(dict(index)))
+        fp.seek(0)
+        fp.write(_header.pack(_signature, MAGIC_NUMBER, index_offset))
+
+    return list(index)
+
+
+class BundleFinder(object):
+    """Finder and loader for the json modules within a bundle
+
+       The bundle is memory mapped and the index read once; imports of
+       modules in the bundle require no file system access at all.
+    """
+
+    def __init__(self, file_name):
+        self._file_name = file_name
+
+        with open(file_name, 'rb') as fp:
+            self._map = mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+        signature, magic, index_offset = _header.unpack_from(self._map, 0)
+        if signature != _signature:
+            raise ImportError(
+                "Unable to import : {} is not a json bundle".format(file_name))
+        if magic != MAGIC_NUMBER:
+            raise ImportError(
+                "Unable to import : {} was built by a different python "
+                "version".format(file_name))
+
+        self._index = marshal.loads(self._map[index_offset:])
+
+    @property
+    def file_name(self):
+        """The file name of the bundle"""
+        return self._file_name
+
+    def modules(self):
+        """The names of the modules within this bundle"""
+        return list(self._index)
+
+    def find_module(self, fullname, path=None):
+        """Identify if the module is within this bundle"""
+        return self if fullname in self._index else None
+
+    def is_package(self, mod_name):
+        """Returns False in all cases, unless the module is unknown"""
+        if mod_name not in self._index:
+            raise ImportError("Unable to import : Cannot find module")
+
+        return False
+
+    def _load_entry(self, mod_name):
+        """The code object & json data for a module"""
+        if mod_name not in self._index:
+            raise ImportError("Unable to import : Cannot find module")
+
+        offset, length, _ = self._index[mod_name]
+        return marshal.loads(self._map[offset:offset + length])
+
+    def get_code(self, mod_name):
+        """Returns the executable code for a given module"""
+        return _importjson._share_factories(self._load_entry(mod_name)[0],
+                                            mod_name)
+
+    def get_source(self, mod_name):
+        """The source is not kept within the bundle"""
+        if mod_name not in self._index:
+            raise ImportError("Unable to import : Cannot find module")
+
+        return None
+
+    def load_module(self, fullname):
+        """Load the module from the bundle"""
+        code, json_dict = self._load_entry(fullname)
+        code = _importjson._share_factories(code, fullname)
+
+        if fullname in sys.modules:
+            mod = sys.modules[fullname]
+        else:
+            mod = types.ModuleType(fullname)
+
+        mod.__file__ = os.path.join(self._file_name, self._index[fullname][2])
+        mod.__loader__ = self
+        mod.__package__ = ''
+        mod.__json__ = json_dict
+        sys.modules[fullname] = mod
+
+        try:
+            exec(code, mod.__dict__)
+        except BaseException:
+            del sys.modules[fullname]
+            raise ImportError("Error Importing {}"
+                              ": {}".format(fullname, tr.format_exc()))
+
+        return mod
@@ -0,0 +1,171 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+# importjson : Implementation of cache.py
+
+Summary :
+    Content addressed cache of generated source and compiled code
+Use Case :
+    As a Developer I want the code generated for a json file to be cached
+    by content So that many hosts sharing a file system only generate the
+    code for each json file once
+
+Testable Statements :
+    Is the same key generated for the same content
+    Is a different key generated for different content or options
+    Is cached source returned without regenerating it
+    Is a cache which cannot be written ignored
+    Are cache entries readable by the other users of the cache (umask)
+    Is the index of the record lists cached
+"""
+import hashlib
+import marshal
+import os
+import tempfile
+
+from . import version
+
+__author__ = 'Tony Flury : anthony.flury@btinternet.com'
+__created__ = '19 Oct 2026'
+
+try:
+    from importlib.util import MAGIC_NUMBER
+except ImportError:
+    import imp
+    MAGIC_NUMBER = imp.get_magic()
+
+try:
+    from _imp import _fix_co_filename
+except ImportError:
+    def _fix_co_filename(code, file_name):
+        """Not supported - the code keeps the file name it was compiled with"""
+        pass
+
+
+def _file_mode():
+    """The mode of a new file - as created by open (i.e. 0o666 & ~umask)
+
+       The umask can only be read by changing it, so it is read once.
+    """
+    global _mode
+    if _mode is None:
+        umask = os.umask(0)
+        os.umask(umask)
+        _mode = 0o666 & ~umask
+    return _mode
+
+
+_mode = None
+
+
+class CodeCache(object):
+    """A directory of generated source & compiled code keyed by content
+
+       The generated source is portable between python versions; compiled
+       code is also cached, tagged with the byte code magic number of the
+       python version which compiled it. Entries are written atomically so
+       that the directory can be shared between processes and hosts.
+    """
+
+    def __init__(self, directory):
+        self._directory = directory
+
+    @property
+    def directory(self):
+        """The cache directory"""
+        return self._directory
+
+    @staticmethod
+    def key(raw, *parts):
+        """The cache key for the raw json content and generation options
+
+           :param raw : The bytes of the json file
+           :param parts : The other values which affect the generated code
+        """
+        digest = hashlib.sha256()
+        digest.update(raw)
+        for part in (version.__version__,) + parts:
+            digest.update(b'\0')
+            digest.update(repr(part).encode('utf-8'))
+        return digest.hexdigest()
+
+    def _path(self, key, suffix):
+        """The file name for a cache entry"""
+        return os.path.join(self._directory, key[:2], key + suffix)
+
+    def _code_suffix(self):
+        """The suffix for compiled code for this python version"""
+        return '.{}.code'.format(
+            ''.join('{:02x}'.format(b) for b in bytearray(MAGIC_NUMBER)))
+
+    def _read(self, key, suffix):
+        """Read a cache entry - None if it doesn't exist"""
+        try:
+            with open(self._path(key, suffix), 'rb') as fp:
+                return fp.read()
+        except (IOError, OSError):
+            return None
+
+    def _write(self, key, suffix, data):
+        """Atomically write a cache entry - failures are ignored"""
+        path = self._path(key, suffix)
+        try:
+            if not os.path.isdir(os.path.dirname(path)):
+                os.makedirs(os.path.dirname(path))
+
+            fd, temp_name = tempfile.mkstemp(dir=os.path.dirname(path),
+                                             prefix='.tmp-')
+        except (IOError, OSError):
+            return
+
+        try:
+            # mkstemp creates the file readable only by its owner
+            os.chmod(temp_name, _file_mode())
+            with os.fdopen(fd, 'wb') as fp:
+                fp.write(data)
+            os.rename(temp_name, path)
+        except (IOError, OSError):
+            try:
+                os.remove(temp_name)
+            except OSError:
+                pass
+
+    def get_source(self, key):
+        """The cached source code - None if it isn't cached"""
+        data = self._read(key, '.py')
+        return data.decode('utf-8') if data is not None else None
+
+    def put_source(self, key, source):
+        """Add generated source to the cache"""
+        self._write(key, '.py', source.encode('utf-8'))
+
+    def get_code(self, key, file_name):
+        """The cached compiled code - None if it isn't cached
+
+           :param key : The cache key
+           :param file_name : The json file name - the code may have been
+                    compiled on a different host with a different file name
+        """
+        data = self._read(key, self._code_suffix())
+        if data is None:
+            return None
+
+        try:
+            code = marshal.loads(data)
+        except (ValueError, EOFError, TypeError):
+            return None
+
+        _fix_co_filename(code, file_name)
+        return code
+
+    def put_code(self, key, code):
+        """Add compiled code to the cache"""
+        self._write(key, self._code_suffix(), marshal.dumps(code))
+
+    def get_index(self, key):
+        """The cached index of the record lists - None if it isn't cached"""
+        return self._read(key, '.index')
+
+    def put_index(self, key, data):
+        """Add the serialised index of the record lists to the cache"""
+        self._write(key, '.index', data)
@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+# importjson : Implementation of compiler.py
+
+Summary :
+    Ahead of time compilation of json files to standalone python modules
+Use Case :
+    As a Developer I want to convert my json files to python modules So that
+    my application doesn't depend on importjson at run time
+
+Testable Statements :
+    Can I compile a single json file to a python module
+    Can I compile a directory of json files
+    Does the python module behave the same as the imported json file
+"""
+import io
+import os
+
+from . import importjson as _importjson
+from .internal import recursive_repr
+
+__author__ = 'Tony Flury : anthony.flury@btinternet.com'
+__created__ = '19 Oct 2026'
+
+
+def generate_source(json_file, mod_name=None, include_json=True):
+    """Generate the standalone python source for a json file
+
+       :param json_file : The json file to compile
+       :param mod_name : The module name - defaults to the name of the file
+       :param include_json : Whether the module has the __json__ attribute
+    """
+    mod_name = mod_name or _importjson._module_name(json_file)
+    if mod_name is None:
+        raise ImportError(
+            "Unable to compile : {} is not a json file".format(json_file))
+
+    json_dict = _importjson._read_json(json_file)
+    source = _importjson.JSONLoader()._generate(mod_name, json_dict,
+                                                json_file=json_file,
+                                                standalone=True)
+
+    if include_json:
+        source += '\n__json__ = {}\n'.format(recursive_repr(json_dict))
+
+    return source
+
+
+def compile_file(json_file, output, include_json=True):
+    """Compile a json file into a standalone python module
+
+       :param json_file : The json file to compile
+       :param output : The python file to create
+       :param include_json : Whether the module has the __json__ attribute
+    """
+    mod_name = os.path.splitext(os.path.basename(output))[0]
+    source = generate_source(json_file, mod_name=mod_name,
+                             include_json=include_json)
+
+    with io.open(output, 'w', encoding='utf-8') as fp:
+        fp.write(u'# coding=utf-8\n')
+        fp.write(source if isinstance(source, type(u'')) else
+                 source.decode('utf-8'))
+
+
+def compile_directory(source_dir, output_dir, include_json=True):
+    """Compile every json file in a directory into python modules
+
+       :param source_dir : The directory containing the json files
+       :param output_dir : The directory to write the python modules to
+       :param include_json : Whether the modules have the __json__ attribute
+       :return : The list of python files created
+    """
+    if not os.path.isdir(output_dir):
+        os.makedirs(output_dir)
+
+    created = []
+    for entry in sorted(os.listdir(source_dir)):
+        json_file = os.path.join(source_dir, entry)
+        mod_name = _importjson._module_name(entry)
+        if mod_name is None or not os.path.isfile(json_file):
+            continue
+
+        output = os.path.join(output_dir, mod_name + '.py')
+        compile_file(json_file, output, include_json=include_json)
+        created.append(output)
+
+    return created
@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+# importjson : Implementation of decoder.py
+
+Summary :
+    Decoding of json payloads straight into instances of the generated
+    classes
+Use Case :
+    As a Developer I want json payloads decoded directly into instances of
+    my classes So that ingesting api payloads is fast
+
+Testable Statements :
+    Is a json object decoded into an instance - with its constraints applied
+    Are missing attributes given their defaults
+    Are nested objects (& lists of objects) decoded into instances of the
+    class named by the type constraint
+    Is a list of objects, or json lines, decoded into a list of instances
+    Is a subclass which isn't generated created by its initializer
+"""
+import copy
+import json
+import re
+import sys
+
+__author__ = 'Tony Flury : anthony.flury@btinternet.com'
+__created__ = '19 Oct 2026'
+
+_white_space = re.compile(r'[ \t\n\r]*')
+_decoder = json.JSONDecoder()
+
+def _generated(klass):
+    """Whether the class was generated by importjson (by either backend)"""
+    return 'get_instance_attributes' in vars(klass)
+
+
+class _Plan(object):
+    """How the decoded json objects become instances of a class
+
+       If every class in the hierarchy was generated, the decoded dictionary
+       becomes the instance's dictionary - without calling the initializer.
+       Only the attributes with constraints are checked, or are decoded as
+       instances of a class; the defaults of missing attributes are
+       constrained once, by the plan. Otherwise the decoded values are
+       passed to the initializer.
+    """
+
+    def __init__(self, cls):
+        self.cls = cls
+        self.fast = all(_generated(klass) for klass in cls.__mro__[:-1])
+        self.names = set()
+        self.moved = []
+        self.checked = []
+        self.nested = []
+        self.nested_plans = None
+        self.defaults = []
+
+        # The checked attributes of every generated class in the hierarchy
+        self.checks = [(klass, vars(klass).get('_json_checks', {}))
+                       for klass in cls.__mro__[:-1] if _generated(klass)]
+
+        sample = cls.__new__(cls) if self.fast else None
+        for klass in cls.__mro__[:-1]:
+            if not _generated(klass):
+                continue
+            for attr in vars(klass)['get_instance_attributes'].__get__(
+                    None, klass)():
+                if attr.name not in self.names:
+                    self.names.add(attr.name)
+                    self._add(klass, attr, sample)
+
+    @staticmethod
+    def _class(klass, expression):
+        """Evaluate the class of a type constraint - within the module"""
+        return eval(expression, vars(sys.modules[klass.__module__]))
+
+    def _add(self, klass, attr, sample):
+        """Add an attribute - as defined by the most derived class"""
+        name = attr.name
+        descriptor = next((vars(base)[name] for base in self.cls.__mro__
+                           if name in vars(base)), None)
+        stored = '_' + name if hasattr(descriptor, '__set__') else name
+        check = getattr(self.cls, '_constrain_' + name, None)
+
+        # The constraints of every class - a subclass extends them
+        entries = [(klass_, checks[name]) for klass_, checks in self.checks
+                   if name in checks]
+        nested = next(((klass_, entry) for klass_, entry in entries
+                       if entry is not None), None)
+        if nested is not None:
+            nested_cls = self._class(nested[0], nested[1][0])
+
+            # Values decoded as instances aren't checked again if the class
+            # (of the value or its items) is the only constraint
+            exact = self.fast and stored != name and all(
+                entry is not None and entry[2] and
+                issubclass(nested_cls, self._class(klass_, entry[0]))
+                for klass_, entry in entries)
+            self.nested.append((name, nested_cls, nested[1][1],
+                                stored if exact else None))
+        if entries:
+            self.checked.append((name, stored, check))
+        elif stored != name:
+            self.moved.append((name, stored))
+
+        if not self.fast:
+            return
+
+        # The initial value of a missing attribute - constrained once
+        default, mutable, error = attr.default, False, None
+        if isinstance(default, (list, dict)):
+            shared = '_default_' + name
+            default, mutable = ((getattr(klass, shared), False)
+                                if shared in vars(klass) else (default, True))
+        if stored != name:
+            try:
+                checked = check(sample, default)
+            except (TypeError, ValueError) as exc:
+                error = exc
+            else:
+                # A shared default converted by its constraints (e.g. to an
+                # array) is no longer copied when first read
+                mutable = mutable or checked is not default
+                default = checked
+        self.defaults.append((stored, default, mutable, error))
+
+    def instance(self, data):
+        """The instance for a decoded json object"""
+        nested = self.nested_plans
+        if nested is None:
+            # Resolved when first used - the classes may refer to each other
+            nested = self.nested_plans = [
+                (name, _plan(cls), many, exact)
+                for name, cls, many, exact in self.nested]
+
+        # Other keys are ignored - as by the initializer
+        if self.fast and not self.names.issuperset(data):
+            data = dict((key, value) for key, value in data.items()
+                        if key in self.names)
+
+        for name, plan, many, exact in nested:
+            value = data.get(name)
+            if many and isinstance(value, list):
+                if exact and all(isinstance(item, dict) for item in value):
+                    del data[name]
+                    data[exact] = [plan.instance(item) for item in value]
+                else:
+                    data[name] = [plan.instance(item)
+                                  if isinstance(item, dict) else item
+                                  for item in value]
+            elif not many and isinstance(value, dict):
+                if exact:
+                    del data[name]
+                    data[exact] = plan.instance(value)
+                else:
+                    data[name] = plan.instance(value)
+
+        if not self.fast:
+            return self.cls(**data)
+
+        instance = self.cls.__new__(self.cls)
+        for name, stored, check in self.checked:
+            if name in data:
+                data[stored] = check(instance, data.pop(name))
+        for name, stored in self.moved:
+            if name in data:
+                data[stored] = data.pop(name)
+
+        if len(data) != len(self.defaults):
+            for stored, default, mutable, error in self.defaults:
+                if stored not in data:
+                    if error is not None:
+                        raise error
+                    data[stored] = (copy.deepcopy(default) if mutable
+                                    else default)
+
+        instance.__dict__ = data
+        return instance
+
+
+def _plan(cls):
+    """The decoding plan of a class - built when first used
+
+       The plan is held by the class itself, so that it is released with
+       the class (e.g. when the module is unloaded).
+    """
+    plan = vars(cls).get('_json_plan')
+    if plan is None:
+        plan = _Plan(cls)
+        setattr(cls, '_json_plan', plan)
+    return plan
+
+
+def _text(text):
+    """The text of a json document - bytes are utf-8"""
+    if isinstance(text, bytes):
+        return text.decode('utf-8-sig')
+    return text
+
+
+def _object(cls, value):
+    """Check the decoded json value is an object"""
+    if not isinstance(value, dict):
+        raise ValueError("Unable to decode : expecting a json object for "
+                         "{} : {} given".format(cls.__name__,
+                                                type(value).__name__))
+    return value
+
+
+def loads(cls, text):
+    """Decode a json object as an instance of the class - or a json list of
+       objects as a list of instances
+
+       The json is decoded by the json module's own decoder, and each
+       dictionary becomes the dictionary of an instance.
+
+       :param cls : The class
+       :param text : The json document (str or utf-8 bytes)
+    """
+    plan, value = _plan(cls), json.loads(_text(text))
+    if isinstance(value, list):
+        return [plan.instance(_object(cls, item)) for item in value]
+    return plan.instance(_object(cls, value))
+
+
+def load_many(cls, fp):
+    """Decode every json object in a file as an instance of the class
+
+       The file is either a json list of objects, or a sequence of json
+       objects (e.g. json lines).
+
+       :param cls : The class
+       :param fp : The file (opened in text or binary mode)
+       :return : The list of instances
+    """
+    text = _text(fp.read())
+    position = _white_space.match(text).end()
+    if text[position:position + 1] == '[':
+        return loads(cls, text)
+
+    plan, instances = _plan(cls), []
+    while position < len(text):
+        value, position = _decoder.raw_decode(text, position)
+        instances.append(plan.instance(_object(cls, value)))
+        position = _white_space.match(text, position).end()
+    return instances
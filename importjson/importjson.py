@@ -20,20 +20,39 @@ Testable Statements :
     Are instance initialisation methods created
     Are instance attribute property methods created
 """
-import sys
 import os
-import imp
-import json
+import re
+import sys
+import threading
+import types
 from collections import OrderedDict
-import copy
+import importlib
 from . import version
 
-from .internal import Module
-import traceback as tr
-import six
+from .archive import ZipIndex
 
+# Only the finder is needed when importjson is imported. The json parser,
+# the code model (and the template engine) and the code cache are imported
+# when a json file is actually imported.
 
-__configuration__ = {"JSONSuffixes": [".json"]}
+__configuration__ = {"JSONSuffixes": [".json"],
+                     "GlobalSearch": True,
+                     "MaxModules": None,
+                     "Reproducible": False,
+                     "CacheDirectory": None,
+                     "ParseMode": "ordered",
+                     "ModuleJSON": "eager",
+                     "NumericArrays": None,
+                     "GenerateWorkers": None,
+                     "MaxFileSize": None,
+                     "MaxDepth": None,
+                     "MaxClasses": None,
+                     "MaxAttributes": None,
+                     "MaxSourceSize": None,
+                     "MaxImportSeconds": None,
+                     "SharedDefaults": False,
+                     "PlainAttributes": False,
+                     "ClassBackend": "code"}
 __obsolete__ = {"AllDictionariesAsClasses":
                 "No longer required - the different forms of json "
                 "are automatically recognised"}
@@ -59,11 +78,369 @@ def get_configure(key, default=None):
     return __configuration__.get(key, default)
 
 
+# An empty file which marks a directory (without an __init__ json file) as a
+# json package
+_package_marker = "__jsonpackage__"
+
+# Compressed json files - keyed by the final suffix of the file name
+# The values are the module & class which will decompress the file, and the
+# keyword used to pass an already open file object.
+_decompressors = {".gz": ("gzip", "GzipFile", "fileobj"),
+                  ".bz2": ("bz2", "BZ2File", "filename"),
+                  ".xz": ("lzma", "LZMAFile", "filename")}
+
+
+def _json_exists(file_name):
+    """Whether the json file exists - either on disk or within a zip archive"""
+    archive, member = ZipIndex.split(file_name)
+    if archive is not None:
+        return member in archive
+
+    return os.path.exists(file_name)
+
+
+def _open_json(file_name, max_size=None):
+    """Open a json file as a binary stream, decompressing if required
+
+       The decompression module is only imported when a compressed file is
+       actually found. No more than max_size + 1 bytes of an uncompressed
+       member of a zip archive are decompressed.
+    """
+    archive, member = ZipIndex.split(file_name)
+
+    compression = _decompressors.get(os.path.splitext(file_name)[1])
+    if compression is None:
+        return (archive.open(member, max_size) if archive
+                else open(file_name, "rb"))
+
+    mod_name, cls_name, fileobj_kw = compression
+    try:
+        decompressor = getattr(importlib.import_module(mod_name), cls_name)
+    except ImportError:
+        raise IOError(
+            "{} decompression is not available".format(mod_name))
+
+    if archive is not None:
+        return decompressor(mode="rb", **{fileobj_kw: archive.open(member)})
+
+    return decompressor(file_name, "rb")
+
+
+def _read_errors():
+    """The exceptions raised when a json file cannot be read - including
+       the errors of any decompression module which has been imported"""
+    errors = [IOError, EOFError, ValueError]
+    for mod_name, error_name in (("zlib", "error"), ("lzma", "LZMAError")):
+        module = sys.modules.get(mod_name)
+        if module is not None:
+            errors.append(getattr(module, error_name))
+    return tuple(errors)
+
+
+def _module_name(file_name):
+    """The module name for a json file, or None if it isn't a json file
+
+       The longest matching suffix is removed - so that `a.json.gz` is module
+       `a` even when both `.json` and `.json.gz` are valid suffixes.
+    """
+    base_name = os.path.basename(file_name)
+    for suff in sorted(get_configure("JSONSuffixes", default=[".json"]),
+                       key=len, reverse=True):
+        if base_name.endswith(suff) and len(base_name) > len(suff):
+            return base_name[:-len(suff)]
+
+    return None
+
+
+def _read_bytes(file_name, limits=None):
+    """Read the (decompressed) content of a json file
+
+       With a file size limit, no more than the limit is read (or
+       decompressed).
+    """
+    max_size = limits.max_file_size if limits is not None else None
+    if max_size is not None:
+        # The size of a member of a zip archive is known before it is read
+        archive, member = ZipIndex.split(file_name)
+        if (archive is not None and
+                os.path.splitext(file_name)[1] not in _decompressors):
+            limits.check_file_size(archive.size(member))
+
+    try:
+        with _open_json(file_name, max_size) as fp:
+            raw = fp.read() if max_size is None else fp.read(max_size + 1)
+    except _read_errors() as e:
+        raise ImportError("Unable to import : Cannot open {} : {}".format(
+            file_name, e))
+
+    if limits is not None:
+        limits.check_file_size(len(raw))
+    return raw
+
+
+def _lean_hook(shared):
+    """The object_pairs_hook for the lean & shared parse modes
+
+       Dictionaries are plain dictionaries (ordered from python 3.7), keys are
+       interned and repeated strings within the file are a single object. If
+       shared, identical numbers are also a single object. Dictionaries and
+       lists are never shared - they are mutable, and each one is a distinct
+       value.
+    """
+    dict_type = dict if sys.version_info >= (3, 7) else OrderedDict
+    values = {}
+    intern = getattr(sys, "intern", None) or (
+        lambda key: values.setdefault((type(key), key), key))
+
+    def canonical(value):
+        """The single copy of an immutable value"""
+        if isinstance(value, list):
+            value[:] = [canonical(item) for item in value]
+            return value
+
+        if isinstance(value, dict) or value is None:
+            return value
+
+        if shared or not isinstance(value, (int, float)):
+            # -0.0 == 0.0, but isn't the same value
+            key = ((float, repr(value)) if type(value) is float and
+                   value == 0 else (type(value), value))
+            return values.setdefault(key, value)
+        return value
+
+    def hook(pairs):
+        """Build the dictionary from the key, value pairs"""
+        return dict_type((intern(key), canonical(value))
+                         for key, value in pairs)
+
+    return hook
+
+
+def _parse_json(raw, file_name, limits=None):
+    """Parse the json content - the top level must be a dictionary
+
+       The ParseMode configuration decides how the json is held in memory :
+        'ordered' - OrderedDict for every dictionary (the default)
+        'lean' - plain dictionaries, interned keys and repeated strings shared
+        'shared' - as lean, and identical numbers are shared - dictionaries
+                   and lists are never shared
+    """
+    import json
+
+    mode = get_configure("ParseMode")
+    if mode == "ordered":
+        hook = OrderedDict
+    elif mode in ("lean", "shared"):
+        hook = _lean_hook(shared=(mode == "shared"))
+    else:
+        raise ValueError("Unknown ParseMode : {!r}".format(mode))
+
+    hooks = dict(object_pairs_hook=hook)
+    if limits is not None:
+        limits.check_depth(raw)
+        hooks = limits.parser_hooks(hook)
+
+    try:
+        json_dict = json.loads(raw.decode("utf-8"), **hooks)
+    except ValueError as e:
+        raise ImportError(
+            "Unable to import : Invalid json file {} : {}".format(
+                file_name, e))
+
+    if not isinstance(json_dict, dict):
+        raise ImportError(
+            "Unable to import : "
+            "Top Level of Json file must be a dictionary")
+
+    return json_dict
+
+
+def _read_json(file_name):
+    """Read and parse a json file - the top level must be a dictionary"""
+    return _parse_json(_read_bytes(file_name), file_name)
+
+
+def _record_names(json_dict, file_name):
+    """The names of the top level lists which are lists of records"""
+    import six
+
+    names = json_dict.get("__records__", [])
+    if (not isinstance(names, list) or
+            not all(isinstance(name, six.string_types) and
+                    isinstance(json_dict.get(name), list) for name in names)):
+        raise ImportError("Unable to import : __records__ must be a list of "
+                          "the names of top level lists {}".format(file_name))
+    return names
+
+
+def _parse_records(raw, file_name, cache=None, key=None, limits=None):
+    """Parse the json - the lists named by __records__ are RecordLists
+
+       The records are indexed rather than kept - the index is built in a
+       single pass before the rest of the json is parsed, so the records are
+       never all decoded at once. Once the index is in the code cache, the
+       records are not decoded at all when importing.
+    """
+    if b'"__records__"' not in raw:
+        return _parse_json(raw, file_name, limits)
+
+    from . import records
+
+    index, cached = None, False
+    if cache is not None:
+        data = cache.get_index(key)
+        if data is not None:
+            index = records.loads(data)
+            cached = bool(index)
+
+    if not cached:
+        if limits is not None:
+            limits.check_depth(raw)
+        try:
+            index = records.index_records(
+                raw, check_time=limits.check_time if limits else None)
+        except ValueError as e:
+            raise ImportError(
+                "Unable to import : Invalid json file {} : {}".format(
+                    file_name, e))
+
+    json_dict = _parse_json(records.without_records(raw, index),
+                            file_name, limits)
+    if not _record_names(json_dict, file_name):
+        return json_dict
+
+    if cache is not None and not cached:
+        cache.put_index(key, records.dumps(index))
+
+    records.register(file_name, index)
+    for name in index:
+        json_dict[name] = records.RecordList.open(file_name, name)
+    return json_dict
+
+
+def _generation_options():
+    """The configuration values which change the generated code"""
+    return (get_configure("NumericArrays"), get_configure("SharedDefaults"),
+            get_configure("PlainAttributes"), get_configure("ClassBackend"))
+
+
+def _compile(source, file_name):
+    """Compile the generated source
+
+       With the GenerateWorkers configuration, the class factories of a huge
+       module are compiled by many processes.
+    """
+    workers = get_configure("GenerateWorkers")
+    if workers is not None:
+        from .internal import factory_sources
+        from .parallel import compile_source
+        code = compile_source(source, file_name, workers, factory_sources())
+        if code is not None:
+            return code
+
+    return compile(source, file_name, "exec", dont_inherit=True)
+
+
+def _code_cache():
+    """The content addressed code cache - None if it isn't configured"""
+    directory = get_configure("CacheDirectory")
+    if not directory:
+        return None
+
+    from .cache import CodeCache
+    return CodeCache(directory)
+
+
+def register_root(path, prefix=''):
+    """Register a directory of json modules with an optional package prefix
+
+       With a prefix, the json file `<path>/x.json` is imported as
+       `<prefix>.x`, and the prefix itself is imported as a package. Names
+       within a registered prefix are only searched for in the registered
+       directories. Combine with configure('GlobalSearch', False) so that
+       only registered roots are ever searched.
+
+       :param path : The directory containing json files
+       :param prefix : The dotted package name for the json modules, or ''
+                       for top level modules
+    """
+    if (prefix, path) not in JSONLoader._roots:
+        JSONLoader._roots.append((prefix, path))
+
+
+def unregister_root(path, prefix=''):
+    """Remove a directory previously registered with register_root"""
+    try:
+        JSONLoader._roots.remove((prefix, path))
+    except ValueError:
+        raise ValueError(
+            "Unknown root : {} with prefix {!r}".format(path, prefix))
+
+
 class JSONLoader(object):
     """Finder object to identify json files, and process them"""
 
     _found_modules = {}
 
+    # Packages - the directories searched for their sub modules
+    _packages = {}
+
+    # The registered roots - a list of (prefix, directory)
+    _roots = []
+
+    # Per module locks, and the number of times each module has been loaded
+    _locks = {}
+    _locks_lock = threading.Lock()
+    _load_count = {}
+
+    # The modules being loaded by each thread - outermost first
+    _loading = threading.local()
+
+    # Modules loaded by aload which are not yet in sys.modules
+    _detached = {}
+
+    # The loaded json modules - least recently loaded first
+    _loaded = OrderedDict()
+    _loaded_lock = threading.Lock()
+
+    # The other json modules referenced by each loaded json module
+    _dependencies = {}
+
+    # Modules parsed, generated & compiled by preload - not yet executed
+    _prebuilt = {}
+
+    # The entries of each directory searched - keyed by directory, with
+    # values of (modification time, entries)
+    _listings = {}
+
+    @staticmethod
+    def _root_search(fullname, path):
+        """Identify whether the module is within a registered root
+
+           :return None : If the module isn't within a registered root, or a
+                         tuple of (is_package, the directories to search)
+        """
+        package_dirs, is_package, search = [], False, None
+
+        for prefix, root in JSONLoader._roots:
+            if not prefix:
+                if "." not in fullname:
+                    search = (search or []) + [root]
+            elif fullname == prefix:
+                is_package = True
+                package_dirs.append(root)
+            elif prefix.startswith(fullname + "."):
+                # An ancestor of a registered prefix - a package in its own
+                # right, without any directories of its own.
+                is_package = True
+            elif fullname.startswith(prefix + "."):
+                search = path or []
+
+        if is_package:
+            return True, package_dirs
+
+        return None if search is None else (False, search)
+
     @staticmethod
     def _getjsonpaths(fullname, path):
         """Generator for all possible json file names for this module
@@ -87,18 +464,105 @@ class JSONLoader(object):
            :return None : If the module isn't a json file, or a JSONLoader
                          instance if it is
         """
-        # Is this module a json file (i.e is there a json file which exists
-        # of the same name and with a json suffix)
-        for json_path in self._getjsonpaths(fullname, path):
-            if os.path.exists(json_path):
-                JSONLoader._found_modules[fullname] = json_path
+        if JSONLoader._roots:
+            found = self._root_search(fullname, path)
+            if found is not None:
+                is_package, search = found
+                if is_package:
+                    JSONLoader._packages[fullname] = search
+                    return self
+
+                # Top level modules can still be found by the global search
+                loader = self._find_json(fullname, search)
+                if loader is not None or "." in fullname:
+                    return loader
+
+        if not get_configure("GlobalSearch"):
+            return None
+
+        return self._find_json(fullname, path)
+
+    def _find_json(self, fullname, path):
+        """Search the path for a json package or json file for this module
+
+           As with python packages, within each directory a package takes
+           precedence over a json file.
+        """
+        if path is not None and not path:
+            return None
+
+        mod_name = fullname.rpartition(".")[2]
+        suffixes = get_configure("JSONSuffixes", default=[".json"])
+        for directory in (path if path else sys.path):
+            # Is this module a json file (i.e is there a json file which
+            # exists of the same name and with a json suffix)
+            listing = _listing(directory)
+            if listing is not None:
+                # Most directories don't hold the module - nothing to join
+                names = [mod_name + suff for suff in suffixes
+                         if mod_name + suff in listing]
+                if not names:
+                    continue
+                JSONLoader._found_modules[fullname] = os.path.join(
+                    directory, names[0])
                 return self
+
+            for json_path in self._getjsonpaths(fullname, [directory]):
+                if _json_exists(json_path):
+                    JSONLoader._found_modules[fullname] = json_path
+                    return self
+
+        # Allow a different finder to try to deal with this file
+        return None
+
+    @staticmethod
+    def _find_package(fullname, directory):
+        """Whether the directory is a json package
+
+           A json package is a directory with an __init__ json file, or an
+           empty __jsonpackage__ marker file. The directory listing is also
+           used to find the submodules.
+        """
+        parent = _listing(os.path.dirname(directory))
+        if parent is None or os.path.basename(directory) not in parent:
+            return False
+
+        entries = _listing(directory)
+        if entries is None:
+            return False
+
+        init_files = [_package_marker] + [
+            "__init__" + suff for suff in
+            get_configure("JSONSuffixes", default=[".json"])]
+        init_file = next((name for name in init_files if name in entries),
+                         None)
+        if init_file is None:
+            return False
+
+        JSONLoader._packages[fullname] = [directory]
+        if init_file != _package_marker:
+            JSONLoader._found_modules[fullname] = os.path.join(directory,
+                                                               init_file)
         else:
-            # Allow a different finder to try to deal with this file
-            return None
+            JSONLoader._found_modules.pop(fullname, None)
+        return True
+
+    def invalidate_caches(self):
+        """Forget any cached zip archive indexes and directory listings
+
+           Called by importlib.invalidate_caches()
+        """
+        ZipIndex.invalidate()
+        JSONLoader._listings.clear()
 
     def is_package(self, mod_name):
-        """Returns False in all cases, unless the module is unknown"""
+        """Whether the module is a package
+
+           i.e a registered prefix, or a directory of json files
+        """
+        if mod_name in self.__class__._packages:
+            return True
+
         if mod_name not in self.__class__._found_modules:
             raise ImportError("Unable to import : Cannot find module")
 
@@ -106,81 +570,907 @@ class JSONLoader(object):
 
     def get_code(self, mod_name):
         """Returns the executable code for a given module once loaded."""
-        if mod_name not in JSONLoader._found_modules:
-            raise ImportError("Unable to import : Cannot find module")
-
-        return compile(self.get_source(mod_name),
-                       JSONLoader._found_modules[mod_name], "exec",
-                       dont_inherit=True)
+        json_dict, code = self._build(mod_name)
+        if code is None:
+            # A data module is bound directly when imported - compile the
+            # equivalent source
+            code = compile(self.get_source(mod_name),
+                           JSONLoader._found_modules[mod_name], "exec",
+                           dont_inherit=True)
+        return code
 
     def get_source(self, mod_name=""):
         """Generate the source code for the module"""
-        if mod_name not in JSONLoader._found_modules:
-            raise ImportError("Unable to import : Cannot find module")
+        return self._build(mod_name, compiled=False)[1]
 
-        try:
-            with open(JSONLoader._found_modules[mod_name]) as fp:
-                json_dict = json.load(fp, encoding="ascii",
-                                      object_pairs_hook=OrderedDict)
+    def _generate(self, mod_name, json_dict, cache=None, key=None,
+                  json_file=None, limits=None, standalone=False):
+        """Generate the source code for the module
 
-        except IOError as e:
-            raise ImportError("Unable to import : Cannot open {} : {}".format(
-                JSONLoader._found_modules[mod_name], e))
-        except ValueError as e:
-            raise ImportError(
-                "Unable to import : Invalid json file {} : {}".format(
-                    JSONLoader._found_modules[mod_name], e))
+           If a cache is given, the source is fetched from or added to it.
+           A data module (with a __schema__) generates source which imports
+           the classes from the schema module. Standalone source (which can
+           be imported without importjson) always uses class factories.
+        """
+        if cache is not None:
+            source = cache.get_source(key)
+            if source is not None:
+                return source
 
-        if not isinstance(json_dict, dict):
-            raise ImportError(
-                "Unable to import : "
-                "Top Level of Json file must be a dictionary")
+        from .internal import Module, DataModule
 
-        # Special module level attribute - the loaded json
-        sys.modules[
-            mod_name].__json__ = json_dict
+        reproducible = cache is not None or get_configure("Reproducible")
+        if "__schema__" in json_dict:
+            schema = _schema_module(json_dict)
+            module = DataModule(module_naame=mod_name,
+                                json_dict=json_dict,
+                                loader=self,
+                                schema_classes=[cls.name for cls in
+                                                schema.get_classes()],
+                                json_file=json_file,
+                                reproducible=reproducible)
+        else:
+            backend = "code" if standalone else get_configure("ClassBackend")
+            if backend not in ("code", "tables"):
+                raise ValueError("Unknown ClassBackend : {!r}".format(backend))
 
-        module = Module(module_naame=mod_name,
-                        json_dict=json_dict,
-                        loader=self)
+            module = Module(module_naame=mod_name,
+                            json_dict=json_dict,
+                            loader=self,
+                            json_file=json_file,
+                            reproducible=reproducible,
+                            numeric_arrays=get_configure("NumericArrays"),
+                            workers=get_configure("GenerateWorkers"),
+                            limits=limits,
+                            shared_defaults=get_configure("SharedDefaults"),
+                            plain_attributes=get_configure("PlainAttributes"),
+                            class_tables=(backend == "tables"),
+                            standalone=standalone)
 
         mod_code = module.generate()
 
+        if cache is not None:
+            cache.put_source(key, mod_code)
+
         return mod_code
 
+    def _build(self, mod_name, compiled=True):
+        """Read, parse, generate and optionally compile the module
+
+           :return : A tuple of the parsed json, and the compiled code (or
+                     the source if compiled is False)
+        """
+        if mod_name not in JSONLoader._found_modules:
+            raise ImportError("Unable to import : Cannot find module")
+
+        prebuilt = JSONLoader._prebuilt.pop(mod_name, None)
+        if compiled and prebuilt is not None:
+            return prebuilt
+
+        file_name = JSONLoader._found_modules[mod_name]
+
+        from .limits import ImportLimits
+        limits = ImportLimits.configured(file_name)
+        raw = _read_bytes(file_name, limits)
+
+        cache, key = _code_cache(), None
+        if cache is not None:
+            key = cache.key(raw, mod_name, os.path.basename(file_name),
+                            _generation_options())
+
+        json_dict = _parse_records(raw, file_name, cache, key, limits)
+
+        # A data module has no code of its own - the classes are in the schema
+        if compiled and "__schema__" in json_dict:
+            return json_dict, None
+
+        if compiled and cache is not None:
+            code = cache.get_code(key, file_name)
+            if code is not None:
+                return json_dict, _share_factories(
+                    code, mod_name, lambda: cache.get_source(key))
+
+        source = self._generate(mod_name, json_dict, cache, key,
+                                limits=limits)
+        if not compiled:
+            return json_dict, source
+
+        code = _compile(source, file_name)
+        if limits is not None:
+            limits.check_time()
+
+        if cache is not None:
+            cache.put_code(key, code)
+
+        return json_dict, _share_factories(code, mod_name, lambda: source)
+
+    @staticmethod
+    def _module_lock(fullname):
+        """The lock which serialises loading of a given module"""
+        with JSONLoader._locks_lock:
+            return JSONLoader._locks.setdefault(fullname, threading.RLock())
 
     def load_module(self, fullname):
-        """Load the module - using the json file already found"""
+        """Load the module - using the json file already found
+
+           Concurrent first loads of the same module share a single parse,
+           generate & execute; the other threads wait for it to complete.
+        """
 
         # Not sure this could ever be true - why would this loader be invoked
         # to reload a module which it hasn't loaded
-        if fullname not in JSONLoader._found_modules:
+        if (fullname not in JSONLoader._found_modules and
+                fullname not in JSONLoader._packages):
             raise ImportError("Unable to import : Cannot find module")
 
+        loaded = JSONLoader._load_count.get(fullname, 0)
+        with self._module_lock(fullname):
+            # Another thread loaded the module while this one was waiting
+            if (JSONLoader._load_count.get(fullname, 0) != loaded and
+                    fullname in sys.modules):
+                return sys.modules[fullname]
+
+            # Loaded by aload while this thread was waiting - not yet
+            # installed by the event loop
+            mod = JSONLoader._detached.pop(fullname, None)
+            if mod is not None and fullname not in sys.modules:
+                sys.modules[fullname] = mod
+                JSONLoader._record_load(fullname)
+                return mod
+
+            # The lock is re-entrant - a module which (indirectly) imports
+            # itself while executing would otherwise be loaded afresh, forever
+            loading = JSONLoader._loading.__dict__.setdefault("names", [])
+            if fullname in loading:
+                raise ImportError(
+                    "Unable to import : circular import of json modules : "
+                    "{}".format(" -> ".join(
+                        loading[loading.index(fullname):] + [fullname])))
+
+            loading.append(fullname)
+            try:
+                mod = self._exec_module(fullname)
+            finally:
+                loading.pop()
+
+            sys.modules[fullname] = mod
+            JSONLoader._record_load(fullname)
+
+        # Evict outside the module lock - unload takes each module's lock
+        _evict(fullname)
+
+        return mod
+
+    @staticmethod
+    def _record_load(fullname):
+        """Record that the module is loaded - the most recently loaded"""
+        JSONLoader._load_count[fullname] = (
+            JSONLoader._load_count.get(fullname, 0) + 1)
+
+        if fullname in JSONLoader._found_modules:
+            _touch(fullname)
+
+    def _exec_module(self, fullname):
+        """Create & execute the module - reusing the module if reloading
+
+           A new module is not put into sys.modules, so that other threads
+           cannot see a partially executed module; the thread loading the
+           module cannot import it again until it is loaded (see load_module).
+        """
         # Check whether module is already installed - and reload
-        if fullname in sys.modules:
+        reload_ = fullname in sys.modules
+        if reload_:
             mod = sys.modules[fullname]
             mod.__name__ = fullname
         else:
-            mod = imp.new_module(fullname)
+            mod = types.ModuleType(fullname)
 
-        mod.__file__ = JSONLoader._found_modules[fullname]
         mod.__loader__ = self
-        mod.__package__ = ''
-        sys.modules[fullname] = mod
+        if fullname in JSONLoader._packages:
+            mod.__path__ = list(JSONLoader._packages[fullname])
+            mod.__package__ = fullname
+        else:
+            mod.__package__ = fullname.rpartition(".")[0]
+
+        # A package without any json content of its own
+        if fullname not in JSONLoader._found_modules:
+            _module_getattr(mod, package=True)
+            return mod
+
+        mod.__file__ = JSONLoader._found_modules[fullname]
+
+        held = get_configure("ModuleJSON")
+        if held not in ("eager", "none", "lazy"):
+            raise ValueError("Unknown ModuleJSON : {!r}".format(held))
+        if held == "lazy" and sys.version_info < (3, 7):
+            held = "eager"
 
         # noinspection PyUnusedLocal
         try:
-            mod_code = self.get_source(mod.__name__)
+            json_dict, mod_code = self._build(mod.__name__)
 
-            # noinspection PyCompatibility
-            exec(mod_code, mod.__dict__)  # Compile the code into the modules
+            # Special module level attribute - the loaded json
+            mod.__json__ = json_dict
+            JSONLoader._dependencies[fullname] = _references(json_dict)
+
+            if mod_code is None:
+                _bind_data(mod, json_dict)
+            else:
+                # noinspection PyCompatibility
+                exec(mod_code, mod.__dict__)  # Execute the code into the module
 
         except BaseException:
-            del sys.modules[fullname]
+            import traceback as tr
+
+            _release_factories(fullname)
+            if reload_:
+                del sys.modules[fullname]
             raise ImportError("Error Importing {}"
                               ": {}".format(fullname, tr.format_exc()))
 
+        # The values are already module & class attributes - the json need
+        # not be kept as well
+        if held in ("none", "lazy"):
+            del mod.__json__
+
+        _module_getattr(mod, package=fullname in JSONLoader._packages,
+                        json_file=mod.__file__ if held == "lazy" else None)
         return mod
 
+
+class JSONPackageFinder(JSONLoader):
+    """Finder for directories of json files - json packages
+
+       Python would import a directory without an __init__.py as a namespace
+       package, so json packages must be found before the python path finder.
+    """
+
+    @staticmethod
+    def _directories(fullname, path):
+        """The directories which could hold the json package
+
+           :return : A list of (directory, searched) - searched is whether
+                     the python path finder also searches the directory
+        """
+        parent = fullname.rpartition(".")[0]
+        roots = []
+        if path:
+            # Only a json package has json sub packages if global search
+            # is disabled
+            if not get_configure("GlobalSearch") and (
+                    parent not in JSONLoader._packages):
+                return []
+        elif parent:
+            return []
+        else:
+            roots = [root for prefix, root in JSONLoader._roots if not prefix]
+            path = sys.path if get_configure("GlobalSearch") else []
+
+        return ([(root, False) for root in roots] +
+                [(directory, True) for directory in path])
+
+    def find_module(self, fullname, path=None):
+        """Identify if the module is a json package
+           :param fullname : the dotted module name of module being imported
+           :param path : The path of the parent module
+           :return None : If the module isn't a json package, or a loader
+        """
+        mod_name = fullname.rpartition(".")[2]
+        for directory, searched in self._directories(fullname, path):
+            if self._find_package(fullname, os.path.join(directory, mod_name)):
+                return self
+
+        return None
+
+    def find_spec(self, fullname, path=None, target=None):
+        """Python 3.4 onwards - the spec for a json package
+
+           Every import is offered to this finder before the python path
+           finder, so it only answers for a directory which holds json : the
+           cached listings show whether the name is a directory in each
+           directory of the path - a python module or package found first is
+           left to the python path finder. Only the directories which would
+           be namespace packages, and the registered roots, can be json
+           packages.
+        """
+        from importlib.machinery import ModuleSpec, all_suffixes
+
+        mod_name = fullname.rpartition(".")[2]
+        suffixes = all_suffixes()
+        modules = set(mod_name + suffix for suffix in suffixes)
+        for directory, searched in self._directories(fullname, path):
+            if searched:
+                listing = _listing(directory)
+                if listing is None:
+                    continue
+                if not listing.isdisjoint(modules):
+                    return None
+                if mod_name not in listing:
+                    continue
+                entries = _listing(os.path.join(directory, mod_name))
+                if entries is not None and any(
+                        "__init__" + suffix in entries for suffix in suffixes):
+                    return None
+            if self._find_package(fullname, os.path.join(directory, mod_name)):
+                return ModuleSpec(fullname, self, is_package=True)
+
+        return None
+
+    def create_module(self, spec):
+        """The package is created as any other module"""
+        return None
+
+    def exec_module(self, module):
+        """Execute the json package - already in sys.modules"""
+        self.load_module(module.__name__)
+
+
+# A name which can be imported
+_identifier = re.compile(r"[A-Za-z_][A-Za-z0-9_]*\Z")
+
+
+def _listing(directory):
+    """The entries within a directory - None if it isn't a directory
+
+       The directory is listed once, and listed again if it is modified.
+    """
+    try:
+        mtime = os.stat(directory).st_mtime
+    except (IOError, OSError, TypeError):
+        return None
+
+    cached = JSONLoader._listings.get(directory)
+    if cached is None or cached[0] != mtime:
+        try:
+            entries = set(os.listdir(directory))
+        except (IOError, OSError):
+            entries = None
+        cached = JSONLoader._listings[directory] = (mtime, entries)
+
+    return cached[1]
+
+
+def _submodules(fullname):
+    """The names of the json submodules and sub packages of a package
+
+       Only names which can be imported - e.g. not __pycache__ - are included.
+    """
+    names = set()
+    for directory in JSONLoader._packages.get(fullname, ()):
+        for entry in _listing(directory) or ():
+            name = _module_name(entry)
+            if (name is None and _identifier.match(entry) and
+                    os.path.isdir(os.path.join(directory, entry))):
+                name = entry
+            if (name is not None and _identifier.match(name) and
+                    not (name.startswith("__") and name.endswith("__"))):
+                names.add(name)
+    return names
+
+
+def _module_getattr(mod, package=False, json_file=None):
+    """Attributes of a json module which are only created on access
+
+       Uses module level __getattr__ & __dir__ (python 3.7 onwards) :
+        - The submodules of a json package are imported on first access, so
+          importing a package doesn't import the json files within it.
+        - If json_file is given, __json__ is parsed from the file each time
+          it is accessed, and isn't kept by the module.
+    """
+    if not package and json_file is None:
+        mod.__dict__.pop("__getattr__", None)
+        mod.__dict__.pop("__dir__", None)
+        return
+
+    children = {}
+
+    def submodules():
+        """The submodule names - found once"""
+        if "names" not in children:
+            children["names"] = _submodules(mod.__name__) if package else set()
+        return children["names"]
+
+    def __getattr__(name):
+        """Rebuild the json, or import the submodule of the same name"""
+        if name == "__json__" and json_file is not None:
+            return _read_json(json_file)
+
+        if name in submodules():
+            try:
+                return importlib.import_module(mod.__name__ + "." + name)
+            except ImportError as e:
+                raise AttributeError(
+                    "module {!r} has no attribute {!r} : {}".format(
+                        mod.__name__, name, e))
+
+        raise AttributeError("module {!r} has no attribute {!r}".format(
+            mod.__name__, name))
+
+    def __dir__():
+        """The module attributes & the submodules"""
+        return sorted(set(mod.__dict__) | submodules() |
+                      set(["__json__"] if json_file is not None else []))
+
+    mod.__getattr__ = __getattr__
+    mod.__dir__ = __dir__
+
+
+# The code of the class factories - shared between all json modules - and
+# the json modules which use each class factory
+_factory_code = {}
+_factory_users = {}
+_factory_lock = threading.Lock()
+
+
+def _factory_file(name):
+    """The file name of the shared code of a class factory"""
+    return "<class factory {}>".format(name)
+
+
+def _relocate(code, file_name, offset):
+    """The code (and nested code) moved to a file & earlier line numbers"""
+    consts = tuple(_relocate(const, file_name, offset)
+                   if isinstance(const, types.CodeType) else const
+                   for const in code.co_consts)
+    return code.replace(co_filename=file_name,
+                        co_firstlineno=code.co_firstlineno - offset,
+                        co_consts=consts)
+
+
+def _factory_lines(source, code):
+    """The lines of the module source which define a class factory"""
+    lines = source.splitlines(True)
+    start = end = code.co_firstlineno - 1
+    for end in range(start + 1, len(lines) + 1):
+        if end == len(lines) or lines[end][:1] not in (" ", "\n"):
+            break
+    return lines[start:end]
+
+
+def _share_factories(code, mod_name, source=None):
+    """Use the shared code for the class factories within the module code
+
+       Structurally identical classes have identically named factories, so
+       only the first compiled copy of each factory is kept. The shared code
+       doesn't belong to any one json module - it is moved to a file of its
+       own (whose lines are the class factory), and is kept until every
+       module which uses it is unloaded.
+
+       :param code : The compiled module
+       :param mod_name : The module name
+       :param source : A callable returning the module source (or None) -
+                       only called for class factories not yet shared
+    """
+    # Code objects can't be rebuilt before python 3.8
+    if not hasattr(code, "replace"):
+        return code
+
+    import linecache
+
+    names = set(const.co_name for const in code.co_consts
+                if isinstance(const, types.CodeType))
+    consts = []
+    with _factory_lock:
+        # A reloaded module may no longer use its previous class factories
+        _discard_factory_user(mod_name, keep=names)
+        for const in code.co_consts:
+            if (isinstance(const, types.CodeType) and
+                    const.co_name.startswith("_class_factory_")):
+                name = const.co_name
+                if name not in _factory_code:
+                    text = source() if source is not None else None
+                    file_name = _factory_file(name)
+                    _factory_code[name] = _relocate(
+                        const, file_name, const.co_firstlineno - 1)
+                    if text is not None:
+                        lines = _factory_lines(text, const)
+                        linecache.cache[file_name] = (
+                            len("".join(lines)), None, lines, file_name)
+                _factory_users.setdefault(name, set()).add(mod_name)
+                const = _factory_code[name]
+            consts.append(const)
+    return code.replace(co_consts=tuple(consts))
+
+
+def _discard_factory_user(mod_name, keep=()):
+    """The module no longer uses the class factories (other than those to
+       keep) - the code of a class factory no module uses is forgotten"""
+    import linecache
+
+    for name, users in list(_factory_users.items()):
+        if name in keep:
+            continue
+        users.discard(mod_name)
+        if not users:
+            del _factory_users[name]
+            _factory_code.pop(name, None)
+            linecache.cache.pop(_factory_file(name), None)
+
+
+def _release_factories(mod_name):
+    """Forget the class factories which only the module uses - the module
+       is unloaded, or failed to load"""
+    with _factory_lock:
+        _discard_factory_user(mod_name)
+
+    internal = sys.modules.get("importjson.internal")
+    if internal is not None:
+        internal.release_module(mod_name)
+
+
+def _references(json_dict):
+    """The names of the other modules whose classes the json references
+
+       Classes are referenced by a dotted __parent__ or constraint type (for
+       instance "base_types.Entity"); a data module references its schema.
+    """
+    import six
+
+    if "__schema__" in json_dict:
+        schema = json_dict["__schema__"]
+        return set([schema]) if isinstance(schema, six.string_types) else set()
+
+    classes = json_dict.get("__classes__", json_dict)
+    if not isinstance(classes, dict):
+        return set()
+
+    names = []
+    for segment in classes.values():
+        if not isinstance(segment, dict):
+            continue
+        names.append(segment.get("__parent__"))
+
+        constraints = segment.get("__constraints__")
+        if isinstance(constraints, dict):
+            names.extend(constraint.get("type")
+                         for constraint in constraints.values()
+                         if isinstance(constraint, dict))
+
+    return set(name.rpartition(".")[0] for name in names
+               if isinstance(name, six.string_types) and "." in name)
+
+
+def _schema_module(json_dict):
+    """Import the schema module named by a data module"""
+    import six
+
+    schema_name = json_dict["__schema__"]
+    if not isinstance(schema_name, six.string_types):
+        raise ImportError("Unable to import : __schema__ must be a "
+                          "module name : {!r}".format(schema_name))
+
+    schema = importlib.import_module(schema_name)
+    if not hasattr(schema, "get_classes"):
+        raise ImportError("Unable to import : {} is not a json "
+                          "schema module".format(schema_name))
+    return schema
+
+
+def _bind_data(mod, json_dict):
+    """Bind a data module to the classes of its schema module
+
+       No code is generated for a data module; the classes of the schema are
+       bound into the module and the json values become module attributes.
+    """
+    from collections import namedtuple
+
+    schema = _schema_module(json_dict)
+    for cls in schema.get_classes():
+        setattr(mod, cls.name, cls.cls_)
+    mod.get_classes = schema.get_classes
+
+    mod.__doc__ = json_dict.get(
+        "__doc__", "Module {} - Data for schema {}".format(
+            mod.__name__, json_dict["__schema__"]))
+
+    attributes = [(key, value) for key, value in json_dict.items()
+                  if key not in ("__doc__", "__schema__", "__records__")]
+    for key, value in attributes:
+        setattr(mod, key, value)
+
+    ModuleAttributeInfo = namedtuple('ModuleAttributeInfo',
+                                     ['name', 'default'])
+
+    def get_attributes():
+        """Generator yielding information on module level attributes"""
+        for name, default in attributes:
+            yield ModuleAttributeInfo(name=name, default=default)
+
+    mod.get_attributes = get_attributes
+
+
+def _touch(fullname):
+    """Mark the json module as the most recently loaded
+
+       Python doesn't consult the finders for a module which is already in
+       sys.modules, so only loads, reloads & aload requests are seen.
+    """
+    with JSONLoader._loaded_lock:
+        JSONLoader._loaded.pop(fullname, None)
+        JSONLoader._loaded[fullname] = None
+
+
+_eviction_hooks = []
+
+
+def add_eviction_hook(hook):
+    """Register a callable to be told when a module is evicted
+
+       The hook is called as hook(name, module) once the module has been
+       removed because more than MaxModules json modules are loaded - or
+       because it depends on a module which was removed for that reason.
+    """
+    _eviction_hooks.append(hook)
+
+
+def remove_eviction_hook(hook):
+    """Remove a callable registered with add_eviction_hook"""
+    _eviction_hooks.remove(hook)
+
+
+def _evict(loaded):
+    """Unload the least recently loaded json modules above MaxModules
+
+       The module just loaded, the modules still being loaded by this thread
+       and the modules they reference are never evicted - nor is a module
+       whose dependents include one of them.
+    """
+    capacity = get_configure("MaxModules")
+    if capacity is None:
+        return
+
+    kept = set([loaded] + getattr(JSONLoader._loading, "names", []))
+    pending = list(kept)
+    while pending:
+        for name in JSONLoader._dependencies.get(pending.pop(), ()):
+            if name not in kept:
+                kept.add(name)
+                pending.append(name)
+
+    while True:
+        with JSONLoader._loaded_lock:
+            if len(JSONLoader._loaded) <= capacity:
+                return
+            candidates = [name for name in JSONLoader._loaded
+                          if name not in kept]
+
+        for fullname in candidates:
+            names = dependents(fullname) + [fullname]
+            if kept.isdisjoint(names):
+                break
+        else:
+            # Everything loaded is still needed - exceed MaxModules for now
+            return
+
+        # The dependents are unloaded as well - and reported
+        modules = [(name, sys.modules.get(name)) for name in names]
+        unload(fullname)
+
+        # Modules already removed from sys.modules aren't reported
+        for name, mod in modules:
+            if mod is None:
+                continue
+            for hook in list(_eviction_hooks):
+                hook(name, mod)
+
+
+def dependents(fullname):
+    """The loaded json modules which depend on a module
+
+       i.e. the modules whose classes are derived from (or constrained to)
+       classes in the module - directly or indirectly.
+    """
+    found, pending = [], [fullname]
+    while pending:
+        name = pending.pop()
+        for other, references in list(JSONLoader._dependencies.items()):
+            if name in references and other not in found and other != fullname:
+                found.append(other)
+                pending.append(other)
+    return found
+
+
+def unload(fullname):
+    """Unload a json module - and the json modules which depend on it
+
+       The module is removed from sys.modules (and from its parent package),
+       and the loader forgets everything it knows about the module - a
+       subsequent import will search for, parse and generate the module again.
+       The classes of dependent modules are derived from the classes of this
+       module, so the dependent modules are also unloaded; other modules are
+       unaffected.
+    """
+    if (fullname not in JSONLoader._found_modules and
+            fullname not in JSONLoader._packages):
+        raise ValueError("Unknown json module : {}".format(fullname))
+
+    for name in dependents(fullname):
+        _unload(name)
+    _unload(fullname)
+
+
+def _unload(fullname):
+    """Remove a single module - and forget everything about it"""
+    with JSONLoader._module_lock(fullname):
+        mod = sys.modules.pop(fullname, None)
+
+        # The index of the module's records - and the open json file
+        records = sys.modules.get("importjson.records")
+        if records is not None and fullname in JSONLoader._found_modules:
+            records.release(JSONLoader._found_modules[fullname])
+
+        parent, _, child = fullname.rpartition(".")
+        if (mod is not None and parent in sys.modules and
+                getattr(sys.modules[parent], child, None) is mod):
+            delattr(sys.modules[parent], child)
+
+        JSONLoader._found_modules.pop(fullname, None)
+        JSONLoader._packages.pop(fullname, None)
+        JSONLoader._load_count.pop(fullname, None)
+        JSONLoader._dependencies.pop(fullname, None)
+        JSONLoader._detached.pop(fullname, None)
+        _release_factories(fullname)
+
+        with JSONLoader._loaded_lock:
+            JSONLoader._loaded.pop(fullname, None)
+
+    with JSONLoader._locks_lock:
+        JSONLoader._locks.pop(fullname, None)
+
+
+def _find_module(mod_name):
+    """Find the json file for a module - importing its parent package
+
+       :return : True if the json file was found
+    """
+    parent = mod_name.rpartition('.')[0]
+    path = importlib.import_module(parent).__path__ if parent else None
+    return JSONLoader().find_module(mod_name, path) is not None
+
+
+def _map(function, items, max_workers):
+    """Apply the function to each item - within a thread pool if possible
+
+       The threads only overlap the reading of the json files (and of the
+       code cache) - parsing, generation & compilation hold the GIL. A
+       single item is built by the calling thread, since a module is only
+       generated by a pool of processes (see GenerateWorkers) when no other
+       thread is running.
+    """
+    if len(items) < 2:
+        return [function(item) for item in items]
+
+    try:
+        from concurrent.futures import ThreadPoolExecutor
+    except ImportError:
+        return [function(item) for item in items]
+
+    with ThreadPoolExecutor(max_workers=max_workers) as pool:
+        return list(pool.map(function, items))
+
+
+def preload(names, max_workers=None):
+    """Import many json modules - building independent modules in parallel
+
+       The dependency graph between the modules (and the json modules whose
+       classes they reference) is built up front; every json module in the
+       graph is read, parsed, generated and compiled in a thread pool, and
+       the modules are then executed in dependency order. Only the reading
+       of the json files is overlapped - the rest of the build is bound by
+       the cpu (and the GIL).
+
+       :param names : The dotted module names
+       :param max_workers : The maximum number of threads to use
+       :return : The list of modules - in the same order as names
+    """
+    loader, graph = JSONLoader(), OrderedDict()
+
+    def build(mod_name):
+        """Build a module - the result is used when it is imported"""
+        JSONLoader._prebuilt[mod_name] = result = loader._build(mod_name)
+        return _references(result[0])
+
+    try:
+        pending = list(OrderedDict.fromkeys(names))
+        while pending:
+            # Modules which are loaded, or aren't json modules, are leaves
+            wave = [name for name in pending
+                    if name not in sys.modules and _find_module(name)]
+            for name in pending:
+                graph.setdefault(name, set())
+
+            for name, references in zip(wave, _map(build, wave, max_workers)):
+                graph[name] = references
+
+            pending = list(OrderedDict.fromkeys(
+                reference for name in wave for reference in graph[name]
+                if reference not in graph))
+
+        for name in _dependency_order(graph):
+            importlib.import_module(name)
+    finally:
+        for name in graph:
+            JSONLoader._prebuilt.pop(name, None)
+
+    return [sys.modules[name] for name in names]
+
+
+def _dependency_order(graph):
+    """The modules in the graph - each after the modules it depends on
+
+       A module can't depend (indirectly) on itself - its classes would
+       need to exist before they were created.
+    """
+    ordered, visited, path = [], set(), []
+
+    def visit(name):
+        """Depth first visit of the graph"""
+        if name in path:
+            raise ImportError(
+                "Unable to import : circular import of json modules : "
+                "{}".format(" -> ".join(path[path.index(name):] + [name])))
+        if name in visited:
+            return
+        path.append(name)
+        for reference in sorted(graph.get(name, ())):
+            visit(reference)
+        path.pop()
+        visited.add(name)
+        ordered.append(name)
+
+    for name in graph:
+        visit(name)
+    return ordered
+
+
+def aload(name_or_path):
+    """Load a json module without blocking the asyncio event loop
+
+       Use as `module = await importjson.aload('config.settings')`; a json
+       file name can be given rather than a module name. Concurrent loads of
+       the same module share a single load. Python 3 only.
+
+       :param name_or_path : The dotted module name, or the json file name
+       :return : A coroutine - the module
+    """
+    from .asyncload import aload as _aload
+    return _aload(name_or_path)
+
+
+def aload_many(names_or_paths):
+    """Load many json modules without blocking the asyncio event loop
+
+       Use as `modules = await importjson.aload_many([...])`. Python 3 only.
+
+       :param names_or_paths : The dotted module names, or json file names
+       :return : A coroutine - the list of modules, in the same order
+    """
+    from .asyncload import aload_many as _aload_many
+    return _aload_many(names_or_paths)
+
+
+def add_bundle(file_name):
+    """Serve imports from a precompiled bundle of json modules
+
+       The bundle finder is inserted ahead of the json finder, so the modules
+       within the bundle are imported without searching for, parsing or
+       generating code for the json files.
+
+       :param file_name : The bundle file created by `python -m importjson bundle`
+       :return : The finder for the bundle
+    """
+    from .bundle import BundleFinder
+
+    finder = BundleFinder(file_name)
+    sys.meta_path.insert(0, finder)
+    return finder
+
+
+# Json packages are found before python finds the directory as a namespace
+# package; json modules are found after any python module of the same name
+sys.meta_path.insert(
+    next((index for index, finder in enumerate(sys.meta_path)
+          if getattr(finder, "__name__", None) == "PathFinder"),
+         len(sys.meta_path)),
+    JSONPackageFinder())
 sys.meta_path.append(JSONLoader())
@@ -13,11 +13,17 @@ Testable Statements :
     ....
 """
 from collections import OrderedDict as OrderedDict
+import base64
 import datetime
+import hashlib
+import json
 import time
 import six
 import templatelite
 import os.path
+import struct
+
+from .records import RecordList
 
 TemplateDirectory = os.path.join(os.path.dirname(__file__), 'templates')
 
@@ -39,6 +45,31 @@ from . import version
 __author__ = 'Tony Flury : anthony.flury@btinternet.com'
 __created__ = '02 Feb 2018'
 
+# The rendered class factories - keyed by the factory name - and the modules
+# each class factory was rendered for
+_factory_sources = {}
+_factory_modules = {}
+
+
+def _factory_name(key):
+    """The name of the class factory for a structural key"""
+    return '_class_factory_{}'.format(key[:16])
+
+
+def release_module(module_name):
+    """Forget the class factories rendered only for the module"""
+    for name, modules in list(_factory_modules.items()):
+        modules.discard(module_name)
+        if not modules:
+            _factory_modules.pop(name, None)
+            _factory_sources.pop(name, None)
+
+
+def factory_sources():
+    """The rendered class factories - keyed by the factory name"""
+    return dict(_factory_sources)
+
+
 class ClassAttribute(object):
     """A data holder for class attributes"""
     def __init__(self, name, default, parent):
@@ -74,10 +105,67 @@ class InstanceAttribute(object):
         """The actual default as given in the json file"""
         return self._default
 
+    @property
+    def default_literal(self):
+        """The python literal for the default"""
+        return recursive_repr(self._default)
+
     def mutable_default(self):
         """Whether the default type is mutable (i.e. a list or dict"""
         return isinstance(self._default, (list, dict))
 
+    def shared_default(self):
+        """Whether the mutable default is built once and shared by every
+           instance until it is changed - see SharedDefaults"""
+        return self.mutable_default() and self._parent.shares_defaults()
+
+    @property
+    def default_copy(self):
+        """The expression for the instance's own copy of a shared default
+
+           A default without lists or dictionaries within it is copied by
+           a single shallow copy - its values are immutable.
+        """
+        values = (self._default.values() if isinstance(self._default, dict)
+                  else self._default)
+        if any(isinstance(value, (list, dict)) for value in values):
+            function = '_copy_default'
+        else:
+            function = 'dict' if isinstance(self._default, dict) else 'list'
+        return '{}(cls_._default_{})'.format(function, self._name)
+
+    def is_plain(self):
+        """Whether the attribute is stored directly in the instance - see
+           PlainAttributes
+
+           Only an attribute with nothing to check (and without a shared
+           default) is plain.
+        """
+        return (self._parent.plain_attributes() and
+                not self.shared_default() and not self.is_checked())
+
+    def is_checked(self):
+        """Whether any constraint (or read only rule) is defined"""
+        return not all(value is False for value in self._constraints.values())
+
+    def has_accessors(self):
+        """Whether the attribute has a property, setter & constrain method"""
+        return not self.is_plain()
+
+    @property
+    def stored_name(self):
+        """The name of the instance attribute holding the value"""
+        return self._name if self.is_plain() else '_' + self._name
+
+    @property
+    def initial_assignment(self):
+        """The statement which sets the initial value within the
+           initializer"""
+        if self.is_plain():
+            return 'self.{} = {}'.format(self._name, self.initial_value)
+        return 'self._{name} = self._constrain_{name}( {value} )'.format(
+            name=self._name, value=self.initial_value)
+
     @property
     def parameterised_default(self):
         """The parameter string for this attribute
@@ -85,6 +173,21 @@ class InstanceAttribute(object):
         """
         return '{} = {!r}'.format( self.name, self.default if not self.mutable_default() else None)
 
+    @property
+    def initial_value(self):
+        """The expression for the initial value within the initializer
+
+           A mutable default is created afresh for each instance - unless a
+           value is given.
+        """
+        if not self.mutable_default():
+            return self.name
+
+        default = ('cls_._default_{}'.format(self.name)
+                   if self.shared_default() else self.default_literal)
+        return '{name} if {name} is not None else {default}'.format(
+            name=self.name, default=default)
+
     @property
     def default_repr_format(self):
         """Argument string for default repr"""
@@ -102,15 +205,109 @@ class InstanceAttribute(object):
 
     def allowed_type(self):
         """The types that are allowed for this attribute"""
-        if self._constraints["type"] in self._parent.module.class_name_list:
-            return self._constraints["type"]
+        return self._type_expression(self._constraints["type"])
+
+    def _type_expression(self, type_name):
+        """The expression for the types allowed by a type constraint"""
+        if type_name in self._parent.module.class_name_list:
+            return type_name
+
+        # A class in a different json module - i.e. "base_types.Entity"
+        if "." in type_name:
+            return type_name
 
         return {"bool": "(bool,int)",
-                        "str": "six.string_types",
+                        "str": self._parent.module.string_types,
                         "list": "list",
                         "int": "int",
                         "float": "(float,int)",
-                        "dict": "dict"}[self._constraints["type"]]
+                        "dict": "dict"}[type_name]
+
+    def has_item_constraints(self):
+        """Whether the list elements (or the list length) are constrained"""
+        return any(key in self._constraints for key in
+                   ("items", "min_length", "max_length", "storage"))
+
+    def checks_type(self):
+        """Whether the type constraint is applied by the attribute itself
+
+           A list with element constraints is checked (and may be an array)
+           by the element constraints.
+        """
+        return "type" in self._constraints and not self.has_item_constraints()
+
+    def _item_arguments(self):
+        """The arguments for the element constraints of a list - the item
+           types are a python expression"""
+        items = self._constraints.get("items", {})
+        if not isinstance(items, dict):
+            raise ImportError("Unable to Import : items constraint must be a "
+                              "dictionary for {} attribute".format(self._name))
+
+        storage = self._constraints.get("storage")
+        typecode = None
+        if storage is not None:
+            typecode = {"int": "q", "float": "d"}.get(items.get("type"))
+            if storage != "array" or typecode is None:
+                raise ImportError(
+                    "Unable to Import : array storage requires int or float "
+                    "items for {} attribute".format(self._name))
+
+        return [("item_types", self._type_expression(items["type"])
+                 if "type" in items else None),
+                ("minimum", items.get("min")),
+                ("maximum", items.get("max")),
+                ("min_length", self._constraints.get("min_length")),
+                ("max_length", self._constraints.get("max_length")),
+                ("typecode", typecode)]
+
+    def nested_type(self):
+        """The class of the attribute (or of its items) as a python
+           expression, whether it is a list, and whether the class is the
+           only constraint - None if the type isn't a class"""
+        items = self._constraints.get("items")
+        if self.has_item_constraints() and isinstance(items, dict):
+            type_name, many = items.get("type"), True
+            exact = (set(items) == {"type"} and
+                     set(self._constraints) <= {"type", "items", "not_none",
+                                                "read_only"})
+        else:
+            type_name, many = self._constraints.get("type"), False
+            exact = set(self._constraints) <= {"type", "not_none",
+                                               "read_only"}
+
+        if type_name is None or not (
+                self._parent.module.is_class_name(type_name) or
+                "." in type_name):
+            return None
+        return self._type_expression(type_name), many, exact
+
+    def item_constraints(self):
+        """The arguments for the element constraints of a list"""
+        arguments = self._item_arguments()
+        return ", ".join(
+            "{}={}".format(key, value if key == "item_types" and
+                           value is not None else repr(value))
+            for key, value in arguments)
+
+    @property
+    def table_row(self):
+        """The row of the class table for this attribute - see runtime.py
+
+           The checks are only the constraints which are applied, with the
+           type as a python expression.
+        """
+        checks = []
+        if self.has_item_constraints():
+            checks.append(("items", tuple(self._item_arguments())))
+        elif self.checks_type():
+            checks.append(("type", self.allowed_type()))
+        checks.extend((key, self._constraints[key])
+                      for key in ("min", "max", "not_none", "read_only")
+                      if key in self._constraints)
+        return "({!r}, {}, {!r}, {!r}, {!r})".format(
+            self._name, self.default_literal, tuple(checks), self.is_plain(),
+            self.shared_default())
 
 
 class ClassInfo():
@@ -126,6 +323,7 @@ class ClassInfo():
         self._base = self._json_segment.get('__parent__', 'object')
         self._attributes = []
         self._class_attributes = []
+        self._structural_key = None
         self._identify_instance_attributes()
         self._identify_class_attributes()
 
@@ -144,11 +342,115 @@ class ClassInfo():
         """"Association back to the moduleInfo object"""
         return self._parent
 
+    def has_decoding(self):
+        """Whether the class has the loads & load_many class methods - they
+           are inherited by subclasses, and omitted from standalone source
+           since the decoder is part of importjson"""
+        return self.base == 'object' and not self._parent.standalone()
+
     @property
     def doc_string(self):
         """The docstring for this class"""
         return self._json_segment.get("__doc__", '')
 
+    def structural_key(self):
+        """Hash of everything in the definition which affects the class code
+
+           The class name, module and the name of the base class are not
+           included - they are arguments of the class factory. The order of
+           the attributes is included - it is the order of the parameters.
+        """
+        if self._structural_key is None:
+            segment = [[key, value]
+                       for key, value in self._json_segment.items()
+                       if key != '__parent__']
+            type_names = [attr.constraints().get('type')
+                          for attr in self._attributes]
+            type_names.extend(
+                attr.constraints()['items'].get('type')
+                for attr in self._attributes
+                if isinstance(attr.constraints().get('items'), dict))
+            class_types = sorted(set(
+                name for name in type_names
+                if self.module.is_class_name(name)))
+
+            parts = [segment, self.base == 'object', class_types]
+            if self.shares_defaults():
+                parts.append('shared defaults')
+            if self.plain_attributes():
+                parts.append('plain attributes')
+            text = json.dumps(parts)
+            self._structural_key = hashlib.sha1(
+                text.encode('utf-8')).hexdigest()
+
+        return self._structural_key
+
+    def factory_name(self):
+        """The name of the class factory for this class"""
+        return _factory_name(self.structural_key())
+
+    def factory_source(self):
+        """The source of the class factory
+
+           Rendered once for each distinct class definition.
+        """
+        name = self.factory_name()
+        _factory_modules.setdefault(name, set()).add(self.module.name)
+        try:
+            return _factory_sources[name]
+        except KeyError:
+            source = _factory_sources.setdefault(
+                name, render_template('class_factory.tmpl', cls=self))
+            return source
+
+    def shares_defaults(self):
+        """Whether mutable defaults are shared by the instances"""
+        return self.module.shared_defaults()
+
+    def plain_attributes(self):
+        """Whether unconstrained attributes are stored directly"""
+        return self.module.plain_attributes()
+
+    def has_json_checks(self):
+        """Whether any attribute is checked - see decoder.py"""
+        return any(attr.is_checked() for attr in self._attributes)
+
+    def json_checks(self):
+        """The attributes which are checked when decoded from json - with
+           the class of each attribute which is an instance (or a list of
+           instances) of a class - as a python literal"""
+        return "{" + ", ".join(
+            "{!r}: {!r}".format(attr.name, attr.nested_type())
+            for attr in self._attributes if attr.is_checked()) + "}"
+
+    @property
+    def table(self):
+        """The keyword arguments of runtime.build_class - the table for this
+           class"""
+        rows = "".join("\n        {},".format(attr.table_row)
+                       for attr in self._attributes)
+        return ("doc={doc!r},\n"
+                "    class_attributes=({class_attributes}),\n"
+                "    instance_attributes=({rows}),\n"
+                "    repr_format={repr!r}, str_format={str!r}{checks}").format(
+            doc=self.doc_string,
+            class_attributes="".join(
+                "({!r}, {}),".format(attr.name, attr.default)
+                for attr in self._class_attributes).replace("),(", "), ("),
+            rows=rows + "\n    " if rows else "",
+            repr=(self.dunder_repr_format()
+                  if self.dunder_repr_overriden() else None),
+            str=(self.dunder_str_format()
+                 if self.dunder_str_overriden() else None),
+            checks=(",\n    json_checks=" + self.json_checks()
+                    if self.has_json_checks() else ""))
+
+    def set_factory_source(self, source):
+        """Keep the class factory rendered elsewhere - see parallel.py"""
+        name = self.factory_name()
+        _factory_modules.setdefault(name, set()).add(self.module.name)
+        _factory_sources.setdefault(name, source)
+
     def has_instance_attributes(self):
         """Boolean if class has instance attributes"""
         return self._attributes and True
@@ -239,31 +541,69 @@ class ClassInfo():
 
 class ModuleAttribute(object):
     """Data holder for the module attribute"""
-    def __init__(self, json_segment, attr_name, parent):
+    def __init__(self, json_segment, attr_name, parent, as_array=False):
         self._segment = json_segment
         self._attr_name = attr_name
         self._parent = parent
+        self._array = numeric_array(json_segment) if as_array else None
 
     @property
     def name(self):
         """The name of the attribute"""
         return self._attr_name
 
+    def is_array(self):
+        """Whether the value is created as a numeric array"""
+        return self._array is not None
+
+    def is_records(self):
+        """Whether the value is a lazily decoded list of records"""
+        return isinstance(self._segment, RecordList)
+
     @property
     def default(self):
-        """The repr of the value"""
+        """The repr of the value - or the expression for a numeric array or
+           a list of records"""
+        if self.is_records():
+            return "_record_list({!r})".format(self._attr_name)
+        if self._array is not None:
+            typecode, data, rows = self._array
+            return "_numeric_array({!r}, {!r}, {!r})".format(typecode, data,
+                                                             rows)
         return recursive_repr(self._segment)
 
 
+# The string types for standalone source - in place of six.string_types
+_STRING_TYPES = """try:
+    _string_types = (basestring,)
+except NameError:
+    _string_types = (str,)"""
+
+
 class Module():
     """Data holder of the module itself"""
-    def __init__(self, module_naame, json_dict, loader):
+    def __init__(self, module_naame, json_dict, loader, json_file=None,
+                 reproducible=False, numeric_arrays=None, workers=None,
+                 limits=None, shared_defaults=False, plain_attributes=False,
+                 class_tables=False, standalone=False):
         self._module_attributes = []
         self._module_name = module_naame
         self._json_dict = json_dict
         self._loader = loader
-        self._imports = ['import six','from collections import namedtuple as namedtuple']
+        self._json_file = json_file
+        self._reproducible = reproducible
+        self._numeric_arrays = numeric_arrays
+        self._workers = workers
+        self._limits = limits
+        self._shared_defaults = shared_defaults
+        self._plain_attributes = plain_attributes
+        self._class_tables = class_tables
+        self._standalone = standalone
+        self._attribute_count = 0
+        self._imports = [_STRING_TYPES if standalone else 'import six',
+                         'from collections import namedtuple as namedtuple']
         self._class_name_list = []
+        self._class_names = frozenset()
         self._classes = []
         self._module_attributes = []
 
@@ -272,25 +612,114 @@ class Module():
         """The name of the module"""
         return self._module_name
 
+    def standalone(self):
+        """Whether the source is imported without importjson"""
+        return bool(self._standalone)
+
+    @property
+    def string_types(self):
+        """The expression for the string types - standalone source can't
+           rely on six being installed"""
+        return "_string_types" if self._standalone else "six.string_types"
+
     @property
     def class_name_list(self):
         """The name of the classes"""
         return self._class_name_list
 
+    def is_class_name(self, name):
+        """Whether the name is a class within this module"""
+        return name in self._class_names
+
     def has_classes(self):
         """Boolean if this module has classes"""
         return self._classes and True
 
+    @property
+    def factories(self):
+        """A class for each distinct class factory within this module - none
+           if the classes are built from tables"""
+        if self._class_tables:
+            return
+        seen = set()
+        for cls in self._classes:
+            if cls.factory_name() not in seen:
+                seen.add(cls.factory_name())
+                yield cls
+
     def has_attributes(self):
         """Boolean if this module has attributes"""
         return self._module_attributes and True
 
+    def has_item_constraints(self):
+        """Boolean if any class attribute has element constraints"""
+        return any(attr.has_item_constraints() for cls in self._classes
+                   for attr in cls.instance_attributes())
+
+    def shared_defaults(self):
+        """Whether mutable defaults are shared by the instances of classes"""
+        return bool(self._shared_defaults)
+
+    def plain_attributes(self):
+        """Whether unconstrained attributes are stored directly in instances"""
+        return bool(self._plain_attributes)
+
+    def class_tables(self):
+        """Whether the classes are built from tables - see runtime.py"""
+        return bool(self._class_tables)
+
+    def has_shared_defaults(self):
+        """Boolean if the classes need the shared default helpers"""
+        return self.shared_defaults() and bool(self._classes)
+
+    def has_arrays(self):
+        """Boolean if any module attribute is a numeric array"""
+        return any(attr.is_array() for attr in self._module_attributes)
+
+    def has_records(self):
+        """Boolean if any module attribute is a list of records"""
+        return any(attr.is_records() for attr in self._module_attributes)
+
+    def numpy_arrays(self):
+        """Whether numeric arrays are numpy arrays when numpy is available"""
+        return self._numeric_arrays == "numpy"
+
+    def _as_array(self, attr_name):
+        """Whether the module attribute is created as an array if possible
+
+           Either all attributes (the NumericArrays configuration) or the
+           attributes named in the __arrays__ list.
+        """
+        if self._numeric_arrays not in (None, False, "array", "numpy"):
+            raise ImportError("Unable to Import : Unknown NumericArrays "
+                              "configuration : {!r}".format(
+                                  self._numeric_arrays))
+
+        arrays = self._json_dict.get("__arrays__", [])
+        if (not isinstance(arrays, list) or
+                not all(isinstance(name, six.string_types)
+                        for name in arrays)):
+            raise ImportError("Unable to Import : __arrays__ must be a list "
+                              "of attribute names {}".format(self.json_file()))
+
+        return bool(self._numeric_arrays) or attr_name in arrays
+
     @property
     def classes(self):
         """The classInfo objects for this module"""
         for cls in self._classes:
             yield cls
 
+    @property
+    def ordered_classes(self):
+        """The classInfo objects - each after the class it inherits from"""
+        from .importjson import _dependency_order
+
+        by_name = dict((cls.name, cls) for cls in self._classes)
+        return [by_name[name] for name in _dependency_order(OrderedDict(
+            (cls.name, [cls.base] if cls.base in by_name else [])
+            for cls in self._classes))]
+
     @property
     def attributes(self):
         """The module attributes"""
@@ -307,11 +736,21 @@ class Module():
         return self._json_dict.get('__doc__','')
 
     def generated_date(self):
-        """The datetime now for the generation"""
+        """The datetime now for the generation
+
+           Reproducible generation uses SOURCE_DATE_EPOCH (default 0) as UTC
+        """
+        if self._reproducible:
+            epoch = int(os.environ.get("SOURCE_DATE_EPOCH", 0))
+            return (datetime.datetime(1970, 1, 1) +
+                    datetime.timedelta(seconds=epoch)).strftime(
+                "%a %d %b %Y %H:%M:%S")
         return format(datetime.datetime.now().strftime("%a %d %b %Y %H:%M:%S"))
 
     def timez(self):
         """Nicely structured time zone"""
+        if self._reproducible:
+            return "UTC (UTC +0000)"
         return time.strftime("%Z (UTC %z)")
 
     def loader(self):
@@ -320,8 +759,20 @@ class Module():
 
     def json_file(self):
         """The name of the json file"""
+        if self._json_file is not None:
+            return self._json_file
         return self._loader._found_modules[self._module_name]
 
+    def json_file_reference(self):
+        """The json file name as documented in the generated code
+
+           Reproducible generation only uses the base name, so the same json
+           file in different directories (or hosts) generates the same code.
+        """
+        if self._reproducible:
+            return os.path.basename(self.json_file())
+        return self.json_file()
+
     def loader_version(self):
         """"The version of the json loader"""
         return self._loader.__class__.__name__
@@ -344,11 +795,14 @@ class Module():
             self._class_name_list = [key for key in self._json_dict["__classes__"] if
                         isinstance(self._json_dict["__classes__"][key], dict)]
 
+        self._class_names = frozenset(self._class_name_list)
+
         # Scan through the dictionary - taking specials into account
         for key in self._json_dict:
 
-            # Ignore the __doc__ key - as it has already been consumed
-            if key == "__doc__":
+            # Ignore the __doc__, __arrays__ & __records__ keys - they are
+            # not attributes
+            if key in ("__doc__", "__arrays__", "__records__"):
                 continue
 
             if not implicit:
@@ -359,33 +813,160 @@ class Module():
                                                json_segment=cls_dict,
                                                parent=self)
                                 self._classes.append(ci)
+                                self._check_limits(ci)
                         else:
                             raise ImportError("Unable to Import : "
                                               "classes must be defined "
                                               "as json dictionaries {}".format(
-                                    self._loader.__class__.
-                                        _found_modules[self._module_name]))
+                                                  self.json_file()))
                 else:
-                    ma = ModuleAttribute(self._json_dict[key], key, parent=self)
+                    ma = ModuleAttribute(self._json_dict[key], key, parent=self,
+                                         as_array=self._as_array(key))
                     self._module_attributes.append(ma)
+                    self._check_limits()
             else:
                 if isinstance(self._json_dict[key], dict):
                     ci = ClassInfo(name=key, json_segment=self._json_dict[key],
                                    parent=self)
                     self._classes.append(ci)
+                    self._check_limits(ci)
  #                   ci.generate()
                 else:
                     # Everything else is treated as a module level attribute
-                    ma = ModuleAttribute(self._json_dict[key], key, parent=self)
+                    ma = ModuleAttribute(self._json_dict[key], key, parent=self,
+                                         as_array=self._as_array(key))
                     self._module_attributes.append(ma)
+                    self._check_limits()
+
+        # The modules whose classes are referenced by the classes
+        from .importjson import _references
+        for module_name in sorted(_references(self._json_dict)):
+            self.add_to_import('import {}'.format(module_name))
+
+        # The class factories of a huge module are rendered by many processes
+        if self._workers is not None:
+            from .parallel import render_factories
+            render_factories(list(self.factories), self._workers)
+
+        if self._class_tables:
+            self.add_to_import(
+                'from importjson.runtime import build_class as _build_class')
+
+        # The class factories (or tables) are most of the source - check the
+        # limits as each one is rendered
+        if self._limits is not None:
+            size = 0
+            sources = ((cls.table for cls in self._classes)
+                       if self._class_tables else
+                       (cls.factory_source() for cls in self.factories))
+            for source in sources:
+                size += len(source)
+                self._limits.check_source_size(size)
+                self._limits.check_time()
 
         mod_code = render_template('module_general.tmpl', module=self)
 
+        if self._limits is not None:
+            self._limits.check_source_size(len(mod_code))
+            self._limits.check_time()
+
         return mod_code
 
+    def _check_limits(self, cls=None):
+        """Apply the resource limits as each class & attribute is created"""
+        if self._limits is None:
+            return
+
+        if cls is None:
+            self._attribute_count += 1
+        else:
+            self._attribute_count += (len(list(cls.instance_attributes())) +
+                                      len(list(cls.class_attributes())))
+            self._limits.check_classes(len(self._classes))
+
+        self._limits.check_attributes(self._attribute_count)
+        self._limits.check_time()
+
     def add_to_import(self, module_name):
         "Add something to the import list"
-        self._imports.append(module_name)
+        if module_name not in self._imports:
+            self._imports.append(module_name)
+
+
+class DataModule(Module):
+    """Data holder for a data module - whose classes are in a schema module
+
+       Only used to present the source for a data module; when a data module
+       is imported the json values are bound directly without generating code.
+    """
+    def __init__(self, module_naame, json_dict, loader, schema_classes,
+                 json_file=None, reproducible=False):
+        Module.__init__(self, module_naame=module_naame,
+                        json_dict=json_dict, loader=loader,
+                        json_file=json_file, reproducible=reproducible)
+        self._schema_classes = schema_classes
+
+    @property
+    def schema(self):
+        """The dotted name of the schema module"""
+        return self._json_dict["__schema__"]
+
+    @property
+    def schema_classes(self):
+        """The names of the classes within the schema module"""
+        for name in self._schema_classes:
+            yield name
+
+    def generate(self):
+        """Generate the code for the data module - called by get_source"""
+        self._module_attributes = [
+            ModuleAttribute(value, key, parent=self)
+            for key, value in self._json_dict.items()
+            if key not in ("__doc__", "__schema__")]
+
+        return render_template('schema_data.tmpl', module=self)
+
+
+def numeric_array(value):
+    """The data for a numeric array - None if the value isn't numeric
+
+       The value must be a list of numbers, or a list of equal length lists
+       of numbers (which are flattened). Integers are 64 bit, and any float
+       makes every value a float - unless an integer can't be held exactly
+       by a float (beyond 2 ** 53), when the value isn't an array.
+
+       :return : A tuple of the array typecode, the little endian data as
+                 base64, and the number of rows (None if not a list of lists)
+    """
+    if not isinstance(value, list) or not value:
+        return None
+
+    rows = None
+    if all(isinstance(row, list) for row in value):
+        if len(set(len(row) for row in value)) != 1:
+            return None
+        rows, value = len(value), [item for row in value for item in row]
+        if not value:
+            return None
+
+    if any(isinstance(item, bool) or
+           not isinstance(item, six.integer_types + (float,))
+           for item in value):
+        return None
+
+    if any(isinstance(item, float) for item in value):
+        if not all(isinstance(item, float) or -2 ** 53 <= item <= 2 ** 53
+                   for item in value):
+            return None
+        typecode = 'd'
+    elif all(-2 ** 63 <= item < 2 ** 63 for item in value):
+        typecode = 'q'
+    else:
+        return None
+
+    data = struct.pack('<{}{}'.format(len(value), typecode), *value)
+    return typecode, base64.b64encode(data).decode('ascii'), rows
+
 
 def recursive_repr(value):
     """Generate a recursive repr for nested and complex data items"""
@@ -0,0 +1,165 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+# importjson : Implementation of limits.py
+
+Summary :
+    Resource limits applied while a json module is imported
+Use Case :
+    As a Developer I want the import of a malformed or unexpectedly huge json
+    file to be abandoned as soon as a limit is exceeded So that a worker
+    isn't stalled, or its memory exhausted, by a single import
+
+Testable Statements :
+    Is a json file larger than the limit rejected before it is parsed
+    Is json nested deeper than the limit rejected before it is parsed
+    Is generation abandoned once there are too many classes or attributes
+    Is generation abandoned once the generated source is too large
+    Is the import abandoned once it has taken too long
+"""
+import array
+import itertools
+import re
+import time
+
+__author__ = 'Tony Flury : anthony.flury@btinternet.com'
+__created__ = '19 Oct 2026'
+
+try:
+    from itertools import accumulate
+except ImportError:
+    def accumulate(values):
+        """Running totals of the values"""
+        total = 0
+        for value in values:
+            total += value
+            yield total
+
+# Strings are removed before the nesting is measured, so that brackets
+# within strings are ignored
+_string_re = re.compile(br'"[^"\\]*(?:\\.[^"\\]*)*"')
+
+# Every other character except the brackets is deleted, and the brackets
+# become +1 & -1 (as signed bytes)
+_not_brackets = bytes(bytearray(
+    code for code in range(256) if code not in bytearray(b'[]{}')))
+_brackets = bytes(bytearray(
+    {ord('['): 1, ord('{'): 1, ord(']'): 255, ord('}'): 255}.get(code, 0)
+    for code in range(256)))
+
+# While parsing, the import time is checked once for this many numbers
+_numbers_per_check = 4096
+
+# The configuration items & the description of each limit
+_limits = [("MaxFileSize", "file size"),
+           ("MaxDepth", "nesting depth"),
+           ("MaxClasses", "number of classes"),
+           ("MaxAttributes", "number of attributes"),
+           ("MaxSourceSize", "generated source size"),
+           ("MaxImportSeconds", "import time")]
+
+
+class ImportLimits(object):
+    """The resource limits for a single import of a json file
+
+       Every limit is optional; the clock for the import time starts when
+       the limits are created.
+    """
+
+    def __init__(self, file_name, max_file_size=None, max_depth=None,
+                 max_classes=None, max_attributes=None, max_source_size=None,
+                 max_seconds=None):
+        self._file_name = file_name
+        self.max_file_size = max_file_size
+        self.max_depth = max_depth
+        self.max_classes = max_classes
+        self.max_attributes = max_attributes
+        self.max_source_size = max_source_size
+        self.max_seconds = max_seconds
+        self._deadline = (time.time() + max_seconds
+                          if max_seconds is not None else None)
+
+    @classmethod
+    def configured(cls, file_name):
+        """The limits set by the module configuration - None if there are
+           no limits"""
+        from .importjson import get_configure
+
+        values = [get_configure(key) for key, _ in _limits]
+        if all(value is None for value in values):
+            return None
+        return cls(file_name, *values)
+
+    def _exceeded(self, limit, value, maximum):
+        """Abandon the import"""
+        raise ImportError(
+            "Unable to import : {} exceeds the {} limit : {} > {}".format(
+                self._file_name, limit, value, maximum))
+
+    def check_file_size(self, size):
+        """Check the size of the (decompressed) json content"""
+        if self.max_file_size is not None and size > self.max_file_size:
+            self._exceeded("file size", size, self.max_file_size)
+
+    def check_depth(self, raw):
+        """Check the nesting depth of the json content - before parsing"""
+        if self.max_depth is None:
+            return
+
+        marks = _string_re.sub(b'', raw).translate(_brackets, _not_brackets)
+        depth = max(accumulate(array.array('b', marks))) if marks else 0
+        if depth > self.max_depth:
+            self._exceeded("nesting depth", depth, self.max_depth)
+
+    def check_classes(self, count):
+        """Check the number of classes generated so far"""
+        if self.max_classes is not None and count > self.max_classes:
+            self._exceeded("number of classes", count, self.max_classes)
+
+    def check_attributes(self, count):
+        """Check the number of attributes generated so far"""
+        if self.max_attributes is not None and count > self.max_attributes:
+            self._exceeded("number of attributes", count,
+                           self.max_attributes)
+
+    def check_source_size(self, size):
+        """Check the size of the source generated so far"""
+        if self.max_source_size is not None and size > self.max_source_size:
+            self._exceeded("generated source size", size,
+                           self.max_source_size)
+
+    def check_time(self):
+        """Check the time taken so far"""
+        if self._deadline is not None and time.time() > self._deadline:
+            self._exceeded("import time", "{:.1f}s".format(
+                time.time() - self._deadline + self.max_seconds),
+                "{}s".format(self.max_seconds))
+
+    def parser_hooks(self, hook):
+        """Wrap the parser's hooks so the import time is checked while the
+           json is parsed - as each dictionary is parsed, and once for every
+           few thousand numbers, so that long lists are interrupted too
+
+           :return : The hook keyword arguments for json.loads
+        """
+        if self._deadline is None:
+            return dict(object_pairs_hook=hook)
+
+        def checked(pairs):
+            """Check the time as each dictionary is parsed"""
+            self.check_time()
+            return hook(pairs)
+
+        counter = itertools.count(1)
+
+        def number(convert):
+            """Check the time once in a while as numbers are parsed"""
+            def parse(text):
+                """Convert the number"""
+                if not next(counter) % _numbers_per_check:
+                    self.check_time()
+                return convert(text)
+            return parse
+
+        return dict(object_pairs_hook=checked, parse_int=number(int),
+                    parse_float=number(float))
@@ -0,0 +1,175 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+# importjson : Implementation of parallel.py
+
+Summary :
+    Generation & compilation of the code for a json file by a pool of
+    processes
+Use Case :
+    As a Developer I want a json file with thousands of classes to be
+    imported using every core So that a single huge json file imports in a
+    fraction of the time
+
+Testable Statements :
+    Is the generated source identical to the source generated serially
+    Is the compiled code equivalent to the code compiled serially
+    Are the line numbers within the class factories unchanged
+    Is a small json file generated & compiled serially
+    Is the code generated serially when other threads are running
+"""
+import marshal
+import multiprocessing
+import re
+import threading
+import types
+
+__author__ = 'Tony Flury : anthony.flury@btinternet.com'
+__created__ = '19 Oct 2026'
+
+# The fewest class factories worth sending to each process
+_chunk_size = 64
+
+_factory_re = re.compile(r'^def (_class_factory_[0-9a-f]+)\(', re.M)
+
+# The class factories to render - inherited by the forked processes
+_factories = []
+
+
+def _workers(workers, tasks):
+    """The number of processes to use - 0 if it isn't worth using a pool"""
+    if workers is None or workers == 1 or tasks < 2 * _chunk_size:
+        return 0
+
+    workers = workers or multiprocessing.cpu_count()
+    return min(workers, tasks // _chunk_size) if workers > 1 else 0
+
+
+def _pool(workers):
+    """A pool of forked processes - None if processes can't be forked
+
+       The classes are inherited by the processes rather than pickled, so
+       only platforms which can fork are supported. A process running other
+       threads (for instance one importing in the background) is never
+       forked - a lock held by another thread would never be released in
+       the forked process.
+    """
+    if threading.active_count() > 1:
+        return None
+
+    try:
+        from concurrent.futures import ProcessPoolExecutor
+        context = multiprocessing.get_context("fork")
+    except (ImportError, AttributeError, ValueError):
+        return None
+
+    return ProcessPoolExecutor(max_workers=workers, mp_context=context)
+
+
+def _chunks(items, workers):
+    """Split the items into a few chunks for each process"""
+    size = max(_chunk_size, -(-len(items) // (workers * 4)))
+    return [items[start:start + size] for start in range(0, len(items), size)]
+
+
+def _render(start, stop):
+    """Render a range of the class factories - executed in a process"""
+    return [cls.factory_source() for cls in _factories[start:stop]]
+
+
+def render_factories(classes, workers):
+    """Render the source of the class factories using a pool of processes
+
+       The rendered source is kept by each class (see
+       ClassInfo.factory_source) so the module is then rendered as normal.
+
+       :param classes : The ClassInfo for each distinct class factory
+       :param workers : The number of processes - 0 for one per cpu
+    """
+    workers = _workers(workers, len(classes))
+    pool = _pool(workers) if workers else None
+    if pool is None:
+        return
+
+    _factories[:] = classes
+    try:
+        with pool:
+            ranges = [(chunk[0], chunk[-1] + 1) for chunk in
+                      _chunks(list(range(len(classes))), workers)]
+            futures = [pool.submit(_render, start, stop)
+                       for start, stop in ranges]
+            for (start, stop), future in zip(ranges, futures):
+                for cls, source in zip(classes[start:stop], future.result()):
+                    cls.set_factory_source(source)
+    finally:
+        del _factories[:]
+
+
+def _compile(source, file_name):
+    """Compile source into marshalled code - executed in a process"""
+    return marshal.dumps(compile(source, file_name, "exec",
+                                 dont_inherit=True))
+
+
+def compile_source(source, file_name, workers, factory_sources):
+    """Compile the generated source using a pool of processes
+
+       The class factories are compiled by the processes - each at the same
+       line as in the source; the rest of the module is compiled with an
+       empty function in place of each class factory, which is then
+       replaced by the compiled class factory.
+
+       :param source : The generated source of the module
+       :param file_name : The file name for the compiled code
+       :param workers : The number of processes - 0 for one per cpu
+       :param factory_sources : The source of each class factory - keyed by
+                                the factory name
+       :return : The code - or None if the source should be compiled serially
+    """
+    # Code objects can't be rebuilt before python 3.8
+    if not hasattr(types.CodeType, "replace"):
+        return None
+
+    blocks = []
+    for match in _factory_re.finditer(source):
+        text = factory_sources.get(match.group(1))
+        if text is None or not source.startswith(text, match.start()):
+            return None
+        blocks.append((match.start(), match.group(1), text))
+
+    workers = _workers(workers, len(blocks))
+    pool = _pool(workers) if workers else None
+    if pool is None:
+        return None
+
+    pieces, position, line = [], 0, 1
+    chunk_sources = []
+    for chunk in _chunks(blocks, workers):
+        chunk_lines, chunk_pieces = 1, []
+        for start, name, text in chunk:
+            pieces.append(source[position:start])
+            line += source.count('\n', position, start)
+            pieces.append('def {}(cls_name, module_name, base): pass'.format(
+                name) + '\n' * text.count('\n'))
+
+            chunk_pieces.append('\n' * (line - chunk_lines) + text)
+            chunk_lines = line + text.count('\n')
+            line, position = chunk_lines, start + len(text)
+        chunk_sources.append(''.join(chunk_pieces))
+    pieces.append(source[position:])
+
+    with pool:
+        futures = [pool.submit(_compile, chunk_source, file_name)
+                   for chunk_source in chunk_sources]
+        code = compile(''.join(pieces), file_name, "exec", dont_inherit=True)
+
+        factories = {}
+        for future in futures:
+            for const in marshal.loads(future.result()).co_consts:
+                if isinstance(const, types.CodeType):
+                    factories[const.co_name] = const
+
+    return code.replace(co_consts=tuple(
+        factories.get(const.co_name, const)
+        if isinstance(const, types.CodeType) else const
+        for const in code.co_consts))
@@ -0,0 +1,300 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+# importjson : Implementation of records.py
+
+Summary :
+    Lazily decoded lists of records within a json file
+Use Case :
+    As a Developer I want module attributes which are very long lists of
+    records to be decoded only when they are accessed So that importing the
+    json module is fast and uses little memory
+
+Testable Statements :
+    Is the start & end of every record found - in a single pass
+    Is a record decoded only when it is accessed
+    Are indexing, slicing & iteration supported
+    Is the index kept in the code cache
+"""
+import array
+import codecs
+import json
+import json.scanner
+import marshal
+import mmap
+import os
+import re
+import sys
+from collections import OrderedDict
+
+import six
+
+try:
+    from collections.abc import Sequence
+except ImportError:
+    from collections import Sequence
+
+from . import importjson as _importjson
+from .archive import ZipIndex
+
+__author__ = 'Tony Flury : anthony.flury@btinternet.com'
+__created__ = '19 Oct 2026'
+
+# Skips the white space between json values
+_white_space = re.compile(r'[ \t\n\r]*')
+
+# The index of each json file - keyed by file name
+# The values are the file signature, the index (see index_records) and the
+# buffer of the file content once it has been opened
+_indexes = {}
+
+
+def index_records(buffer, names=None, check_time=None):
+    """Find the start & end of every record in the named top level lists
+
+       A single pass over the json using the json module's own scanner. The
+       content is decoded as latin-1 so that positions within the text are
+       positions within the buffer - the json syntax is ascii, so utf-8
+       encoded strings only change the content of strings.
+
+       :param buffer : The bytes (or memory map) of the json file
+       :param names : The names of the top level lists - if None, the names
+                      in the top level __records__ list, which are found in
+                      the same pass
+       :param check_time : Called once for every few thousand records - to
+                           abandon an import which is taking too long
+       :return : A dictionary of name : (start, end, offsets) - the span of
+                 the list within the buffer, and an array of the start & end
+                 of each record
+       :raises ValueError : If the json is invalid
+    """
+    text = codecs.latin_1_decode(buffer)[0]
+    try:
+        return _index(text, names, check_time)
+    except StopIteration as e:
+        raise ValueError("Invalid json at {}".format(e.args[0]))
+    except IndexError:
+        raise ValueError("Invalid json at {}".format(len(text)))
+
+
+def _utf8(text):
+    """The text of a latin-1 decoded string"""
+    return text.encode('latin-1').decode('utf-8')
+
+
+def _index(text, names, check_time):
+    """Index the records of the latin-1 decoded json text"""
+    scan_once = json.scanner.make_scanner(json.JSONDecoder())
+    skip = _white_space.match
+
+    def expect(position, characters):
+        """The position after the expected character"""
+        position = skip(text, position).end()
+        if text[position:position + 1] not in characters:
+            raise ValueError("Invalid json at {}".format(position))
+        return position + 1
+
+    # Until the __records__ list is found, every top level list is indexed
+    records = names
+    index = {}
+    position = expect(0, '{')
+    if text[skip(text, position).end()] == '}':
+        return index
+
+    while True:
+        position = skip(text, position).end()
+        key, position = scan_once(text, position)
+        key = _utf8(key)
+        position = skip(text, expect(position, ':')).end()
+
+        if names is None and key == '__records__':
+            records, position = scan_once(text, position)
+            if not isinstance(records, list):
+                records = []
+            records = [_utf8(name) for name in records
+                       if isinstance(name, six.string_types)]
+        elif (records is not None and key not in records or
+                text[position] != '['):
+            position = scan_once(text, position)[1]
+        else:
+            list_start, offsets = position, array.array('Q')
+            position = skip(text, position + 1).end()
+            if text[position] == ']':
+                position += 1
+            else:
+                while True:
+                    record_start = position
+                    position = scan_once(text, skip(text, position).end())[1]
+                    offsets.extend((skip(text, record_start).end(), position))
+                    if check_time is not None and not len(offsets) % 8192:
+                        check_time()
+                    position = expect(position, ',]')
+                    if text[position - 1] == ']':
+                        break
+            index[key] = (list_start, position, offsets)
+
+        position = expect(position, ',}')
+        if text[position - 1] == '}':
+            records = records or []
+            return dict((key, value) for key, value in index.items()
+                        if key in records)
+
+
+def without_records(raw, index):
+    """The json with the indexed lists emptied - so they aren't decoded"""
+    pieces, position = [], 0
+    for start, end, _ in sorted(index.values()):
+        pieces.extend((raw[position:start], b'[]'))
+        position = end
+    pieces.append(raw[position:])
+    return b''.join(pieces)
+
+
+def dumps(index):
+    """Serialise an index - the offsets are little endian"""
+    entries = {}
+    for name, (start, end, offsets) in index.items():
+        offsets = array.array('Q', offsets)
+        if sys.byteorder == 'big':
+            offsets.byteswap()
+        entries[name] = (start, end, offsets.tobytes())
+    return marshal.dumps(entries)
+
+
+def loads(data):
+    """Deserialise an index - None if the data is invalid"""
+    try:
+        entries = marshal.loads(data)
+    except (ValueError, EOFError, TypeError):
+        return None
+
+    index = {}
+    for name, (start, end, raw_offsets) in entries.items():
+        offsets = array.array('Q')
+        offsets.frombytes(raw_offsets)
+        if sys.byteorder == 'big':
+            offsets.byteswap()
+        index[name] = (start, end, offsets)
+    return index
+
+
+def _signature(file_name):
+    """The size & modification time of the file - None within an archive"""
+    try:
+        stat = os.stat(file_name)
+    except OSError:
+        return None
+    return stat.st_size, stat.st_mtime
+
+
+def register(file_name, index):
+    """Record the index built (or read from the cache) when importing"""
+    _indexes[file_name] = [_signature(file_name), index, None]
+
+
+def release(file_name):
+    """Forget the index of a json file, and close its memory mapped content
+
+       Called when the module is unloaded - its record lists can no longer
+       be read.
+    """
+    entry = _indexes.pop(file_name, None)
+    if entry is not None and isinstance(entry[2], mmap.mmap):
+        entry[2].close()
+
+
+def _buffer(file_name):
+    """The content of the json file - memory mapped if possible
+
+       A compressed json file, or a json file within a zip archive, is read
+       into memory.
+    """
+    archive, _ = ZipIndex.split(file_name)
+    if (archive is not None or
+            os.path.splitext(file_name)[1] in _importjson._decompressors):
+        return _importjson._read_bytes(file_name)
+
+    with open(file_name, 'rb') as fp:
+        return mmap.mmap(fp.fileno(), 0, access=mmap.ACCESS_READ)
+
+
+class RecordList(Sequence):
+    """A read only list of the records within a json file
+
+       The json file is memory mapped, and only the start & end of each
+       record is held; a record is decoded each time it is accessed.
+    """
+
+    def __init__(self, buffer, offsets, object_pairs_hook=None):
+        self._buffer = buffer
+        self._offsets = offsets
+        self._hook = object_pairs_hook
+
+    @classmethod
+    def open(cls, file_name, name):
+        """The records of the named top level list of a json file
+
+           The index built when the module was imported is used if the file
+           is unchanged; otherwise the file is indexed again.
+        """
+        entry = _indexes.get(file_name)
+        if (entry is None or name not in entry[1] or
+                entry[0] != _signature(file_name)):
+            buffer = _buffer(file_name)
+            try:
+                index = index_records(buffer, [name])
+            except ValueError as e:
+                raise ImportError("Unable to import : Invalid json file "
+                                  "{} : {}".format(file_name, e))
+            if name not in index:
+                raise ImportError("Unable to import : {} is not a list of "
+                                  "records in {}".format(name, file_name))
+            register(file_name, index)
+            _indexes[file_name][2] = buffer
+
+        signature, index, buffer = entry = _indexes[file_name]
+        if buffer is None:
+            buffer = entry[2] = _buffer(file_name)
+
+        parse_mode = _importjson.get_configure("ParseMode")
+        return cls(buffer, index[name][2],
+                   OrderedDict if parse_mode == "ordered" else None)
+
+    def __len__(self):
+        return len(self._offsets) // 2
+
+    def _decode(self, index):
+        """Decode a single record"""
+        start, end = self._offsets[2 * index], self._offsets[2 * index + 1]
+        return json.loads(self._buffer[start:end].decode('utf-8'),
+                          object_pairs_hook=self._hook)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self._decode(position)
+                    for position in range(*index.indices(len(self)))]
+
+        if index < 0:
+            index += len(self)
+        if not 0 <= index < len(self):
+            raise IndexError("RecordList index out of range")
+        return self._decode(index)
+
+    def __iter__(self):
+        for index in range(len(self)):
+            yield self._decode(index)
+
+    def __eq__(self, other):
+        if not isinstance(other, (list, tuple, RecordList)):
+            return NotImplemented
+        return len(self) == len(other) and all(
+            mine == theirs for mine, theirs in zip(self, other))
+
+    def __ne__(self, other):
+        equal = self.__eq__(other)
+        return equal if equal is NotImplemented else not equal
+
+    __hash__ = None
+
+    def __repr__(self):
+        return "<RecordList of {} records>".format(len(self))
@@ -0,0 +1,351 @@
+#!/usr/bin/env python
+# coding=utf-8
+"""
+# importjson : Implementation of runtime.py
+
+Summary :
+    The shared implementation of classes generated as tables
+Use Case :
+    As a Developer I want a json file with thousands of classes to generate
+    data rather than code So that it imports quickly and its classes use
+    little memory
+
+Testable Statements :
+    Does a class built from a table behave as the generated class
+    Are the constraints, read only attributes & shared defaults applied
+    Can the constraints be extended by a subclass
+    Are the initializer & descriptors shared by every class
+"""
+import copy
+import inspect
+import types
+from collections import namedtuple
+
+__author__ = 'Tony Flury : anthony.flury@btinternet.com'
+__created__ = '19 Oct 2026'
+
+ClassAttributeInfo = namedtuple('ClassAttributeInfo', ['name', 'default'])
+InstanceAttributeInfo = namedtuple('InstanceAttributeInfo',
+                                   ['name', 'default'])
+
+
+def _copy_default(value):
+    """Copy the lists & dictionaries within a shared default - the other
+       json values are immutable"""
+    if isinstance(value, dict):
+        return dict((key, _copy_default(item)) for key, item in value.items())
+    if isinstance(value, list):
+        return [_copy_default(item) for item in value]
+    return value
+
+
+def _copier(default):
+    """The copier of a shared default - a single shallow copy unless there
+       are lists or dictionaries within it"""
+    values = default.values() if isinstance(default, dict) else default
+    if any(isinstance(value, (list, dict)) for value in values):
+        return _copy_default
+    return dict if isinstance(default, dict) else list
+
+
+class Field(object):
+    """An instance attribute of a class - a row of the class table
+
+       The row is (name, default, checks, plain, shared); the checks are
+       pairs of the constraints which are applied - the type (and the items
+       types) as python expressions, which are only evaluated (within the
+       module) when a value is first checked.
+    """
+    __slots__ = ('owner', 'namespace', 'name', 'default', 'mutable',
+                 'parameter', 'stored', 'method', 'inherited', 'plain', 'shared',
+                 'copy',
+                 'not_none', 'read_only', 'minimum', 'maximum',
+                 'type_expression', 'items', '_types', '_item_arguments')
+
+    def __init__(self, owner, namespace, name, default, checks, plain,
+                 shared):
+        checks = dict(checks)
+        self.owner, self.namespace = owner, namespace
+        self.name, self.default = name, default
+        self.mutable = isinstance(default, (list, dict))
+        self.parameter = None if self.mutable else default
+        self.stored = name if plain else '_' + name
+        self.method = '_constrain_' + name
+        self.inherited = hasattr(owner.__mro__[1], self.method)
+        self.plain, self.shared = plain, shared
+        self.copy = _copier(default) if shared else None
+        self.not_none = checks.get('not_none', False)
+        self.read_only = checks.get('read_only', False)
+        self.minimum, self.maximum = checks.get('min'), checks.get('max')
+        self.type_expression = checks.get('type')
+        self.items = checks.get('items')
+        self._types, self._item_arguments = None, None
+
+    def types(self):
+        """The types allowed by the type constraint"""
+        if self._types is None:
+            self._types = eval(self.type_expression, self.namespace)
+        return self._types
+
+    def item_arguments(self):
+        """The arguments for the element constraints of a list"""
+        if self._item_arguments is None:
+            arguments = dict(self.items)
+            if arguments['item_types'] is not None:
+                arguments['item_types'] = eval(arguments['item_types'],
+                                               self.namespace)
+            self._item_arguments = arguments
+        return self._item_arguments
+
+    def initial(self, value):
+        """The initial value - a mutable default is copied unless shared"""
+        if value is None and self.mutable:
+            return self.default if self.shared else copy.deepcopy(self.default)
+        return value
+
+    def constrain(self, instance, value):
+        """Apply the _constrain_<attr> method of the instance - which may
+           have been extended by a subclass"""
+        method = getattr(type(instance), self.method)
+        if isinstance(method, Constraint):
+            return method.field.check(instance, value)
+        return method(instance, value)
+
+    def check(self, instance, value):
+        """Apply the constraints - see the _constrain_<attr> method of the
+           class factory"""
+        if self.inherited:
+            value = getattr(super(self.owner, instance), self.method)(value)
+
+        if value is None:
+            if self.not_none:
+                raise ValueError(
+                    'Range Error : \'{}\' cannot be None'.format(self.name))
+            return None
+
+        if self.items is not None:
+            return self.namespace['_constrain_items'](
+                value, self.name, **self.item_arguments())
+
+        if self.type_expression is not None:
+            if not isinstance(value, self.types()):
+                raise TypeError(" Type Error : Attribute '{}' must be of type "
+                                "{} : {} given given".format(
+                                    self.name, self.type_expression,
+                                    type(value).__name__))
+
+        if isinstance(value, (dict, list)):
+            return value
+
+        if self.minimum is not None and self.maximum is not None:
+            if not self.minimum <= value <= self.maximum:
+                raise ValueError("Range Error : '{}' must be between {} and {} "
+                                 ": {} given".format(self.name, self.minimum,
+                                                     self.maximum, value))
+        elif self.minimum is not None:
+            if not self.minimum <= value:
+                raise ValueError("Range Error : '{}' must be >= {}: {} "
+                                 "given".format(self.name, self.minimum, value))
+        elif self.maximum is not None:
+            if not self.maximum >= value:
+                raise ValueError("Range Error : '{}' must be <= {}: {} "
+                                 "given".format(self.name, self.maximum, value))
+        return value
+
+
+class Attribute(object):
+    """The descriptor of a constrained (or read only) instance attribute"""
+    __slots__ = ('_field',)
+
+    def __init__(self, field):
+        self._field = field
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        field = self._field
+        try:
+            value = instance.__dict__[field.stored]
+        except KeyError:
+            raise AttributeError(field.name)
+        if field.shared and value is field.default:
+            # The shared default is copied when the attribute is first read
+            value = instance.__dict__[field.stored] = field.copy(value)
+        return value
+
+    def __set__(self, instance, value):
+        field = self._field
+        if field.read_only:
+            raise ValueError("{}.{} is read only".format(
+                field.owner.__name__, field.name))
+        instance.__dict__[field.stored] = field.constrain(instance, value)
+
+
+class Constraint(object):
+    """The _constrain_<attr> method of a class - which can be extended by a
+       subclass"""
+    __slots__ = ('field',)
+
+    def __init__(self, field):
+        self.field = field
+
+    def __get__(self, instance, owner=None):
+        if instance is None:
+            return self
+        return types.MethodType(self, instance)
+
+    def __call__(self, instance, value):
+        return self.field.check(instance, value)
+
+
+def _initializer(cls_, fields, doc):
+    """The __init__ method of a class - the attributes are the parameters (in
+       order) and any other arguments are passed to the base class"""
+    count = len(fields)
+    inherits = cls_.__mro__[1] is not object
+
+    def __init__(self, *args, **kwargs):
+        values = list(args[:count])
+        for field in fields[:len(values)]:
+            if field.name in kwargs:
+                raise TypeError("__init__() got multiple values for argument "
+                                "'{}'".format(field.name))
+        values.extend(kwargs.pop(field.name, field.parameter)
+                      for field in fields[len(values):])
+
+        if inherits:
+            super(cls_, self).__init__(*args[count:], **kwargs)
+
+        for field, value in zip(fields, values):
+            value = field.initial(value)
+            if field.plain:
+                setattr(self, field.name, value)
+            else:
+                self.__dict__[field.stored] = field.constrain(self, value)
+
+    __init__.__doc__ = doc or None
+
+    # The signature of the generated __init__
+    if hasattr(inspect, "Signature"):
+        parameter = inspect.Parameter
+        parameters = [parameter("self", parameter.POSITIONAL_OR_KEYWORD)]
+        parameters.extend(
+            parameter(field.name, parameter.POSITIONAL_OR_KEYWORD,
+                      default=field.parameter) for field in fields)
+        parameters.extend([parameter("args", parameter.VAR_POSITIONAL),
+                           parameter("kwargs", parameter.VAR_KEYWORD)])
+        __init__.__signature__ = inspect.Signature(parameters)
+    return __init__
+
+
+def _formatter(cls_name, module_name, fields, text):
+    """The __repr__ or __str__ method of a class - the default __repr__ if
+       no format is given"""
+    def values(instance):
+        """The value of each instance attribute"""
+        return dict((field.name, getattr(instance, field.stored))
+                    for field in fields)
+
+    if text is None:
+        text = "({})".format(", ".join(
+            "{name}={{{name}!r}}".format(name=field.name) for field in fields))
+
+        def format_(self):
+            return cls_name + text.format(**values(self))
+    else:
+        def format_(self):
+            return text.format(class_name=cls_name, module_name=module_name,
+                               **values(self))
+    return format_
+
+
+def _attribute_info(info, rows):
+    """The get_class_attributes or get_instance_attributes method"""
+    def get_attributes(cls_):
+        for name, default in rows:
+            yield info(name=name, default=copy.deepcopy(default))
+    return classmethod(get_attributes)
+
+
+def _loads(cls_, text):
+    """Decode a json object (or list of objects) as instances"""
+    from .decoder import loads
+    return loads(cls_, text)
+
+
+def _load_many(cls_, fp):
+    """Decode the json objects in a file as a list of instances"""
+    from .decoder import load_many
+    return load_many(cls_, fp)
+
+
+def build_class(cls_name, module_name, base, namespace, doc,
+                class_attributes, instance_attributes, repr_format=None,
+                str_format=None, json_checks=None):
+    """Create a class from its table
+
+       The class is equivalent to the class created by the class factory
+       (see class_factory.tmpl), but shares the implementation of every
+       method with every other class.
+
+       :param cls_name : The name of the class
+       :param module_name : The name of the module
+       :param base : The base class
+       :param namespace : The module's namespace - where the type constraints
+                          & the helper for element constraints are found
+       :param doc : The doc string of the class
+       :param class_attributes : Pairs of the name & value of each class
+                                 attribute
+       :param instance_attributes : A row for each instance attribute - see
+                                    Field
+       :param repr_format : The __repr__ format - None for the default
+       :param str_format : The __str__ format - None if not specified
+       :param json_checks : The attributes which are checked when decoded
+                           from json - see decoder.py
+    """
+    body = dict((name, copy.deepcopy(value))
+                for name, value in class_attributes)
+    body['__module__'] = module_name
+    if doc:
+        body['__doc__'] = doc
+    if json_checks:
+        body['_json_checks'] = json_checks
+    cls_ = type(base)(cls_name, (base,), body)
+
+    fields = tuple(Field(cls_, namespace, *row)
+                   for row in instance_attributes)
+    for field in fields:
+        if field.shared:
+            setattr(cls_, '_default_' + field.name, field.default)
+        if not field.plain:
+            setattr(cls_, field.name, Attribute(field))
+            setattr(cls_, field.method, Constraint(field))
+
+    methods = {}
+    if fields:
+        methods['__init__'] = _initializer(cls_, fields, doc)
+
+    methods['__repr__'] = _formatter(cls_name, module_name, fields,
+                                     repr_format)
+    if str_format is not None:
+        methods['__str__'] = _formatter(cls_name, module_name, fields,
+                                        str_format)
+
+    methods['get_class_attributes'] = _attribute_info(
+        ClassAttributeInfo, class_attributes)
+    methods['get_instance_attributes'] = _attribute_info(
+        InstanceAttributeInfo, [(field.name, field.default)
+                                for field in fields])
+
+    # Each method is named after the class - as in the generated code
+    for name, method in methods.items():
+        function = getattr(method, '__func__', method)
+        function.__name__ = name
+        function.__qualname__ = '{}.{}'.format(cls_name, name)
+        setattr(cls_, name, method)
+
+    # Subclasses inherit the json decoding
+    if base is object:
+        cls_.loads = classmethod(_loads)
+        cls_.load_many = classmethod(_load_many)
+    return cls_
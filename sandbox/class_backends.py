@@ -0,0 +1,123 @@
+#!/usr/bin/env python
+"""
+# importjson : Implementation of class_backends.py
+
+Summary :
+    Benchmark of the class backends
+Use Case :
+    As a Developer I want to know the import time & memory of each class
+    backend So that I can choose the backend for my json files
+
+Testable Statements :
+    How long does each backend take to generate, compile & execute a module
+    How much memory do the classes of each backend use
+    How fast are instances created, read & changed with each backend
+"""
+
+__author__ = 'Tony Flury : anthony.flury@btinternet.com'
+__created__ = '19 Oct 2026'
+
+import gc
+import json
+import sys
+import time
+import timeit
+import tracemalloc
+import types
+
+from importjson import internal
+
+
+def classes_json(classes, attributes):
+    """A json file with many classes - a third of the attributes are
+       constrained"""
+    content = {}
+    for index in range(classes):
+        definition = dict(("attr_{}".format(attr), attr)
+                          for attr in range(attributes))
+        definition["__doc__"] = "Class {}".format(index)
+        definition["__constraints__"] = dict(
+            ("attr_{}".format(attr), {"type": "int", "min": 0})
+            for attr in range(0, attributes, 3))
+        if index % 10:
+            definition["__parent__"] = "class_{}".format(index - index % 10)
+        content["class_{}".format(index)] = definition
+    return content
+
+
+def code_objects(code):
+    """The number of code objects - including the nested code objects"""
+    return 1 + sum(code_objects(const) for const in code.co_consts
+                   if isinstance(const, types.CodeType))
+
+
+def measure(content, backend, plain):
+    """Generate, compile & execute the module - timing each step
+
+       The memory is that retained by the code & the classes.
+    """
+    internal.release_module("benchmark")
+    gc.collect()
+    start = time.time()
+    source = internal.Module("benchmark", content, None,
+                             json_file="benchmark.json",
+                             plain_attributes=plain,
+                             class_tables=(backend == "tables")).generate()
+    generated = time.time()
+    tracemalloc.start()
+    code = compile(source, "benchmark.json", "exec", dont_inherit=True)
+    compiled = time.time()
+
+    namespace = {"__name__": "benchmark"}
+    executed = time.time()
+    exec(code, namespace)
+    executed = time.time() - executed
+    gc.collect()
+    memory = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+
+    return dict(generate=generated - start, compile=compiled - generated,
+                execute=executed, source=len(source),
+                code_objects=code_objects(code), memory=memory,
+                namespace=namespace)
+
+
+def throughput(namespace, number=20000):
+    """Microseconds to create an instance, read & set an attribute"""
+    cls_ = namespace["class_1"]
+    inst = cls_()
+    timings = [timeit.timeit(statement, number=number, globals=dict(
+        cls_=cls_, inst=inst)) / number * 1e6 for statement in
+        ("cls_()", "inst.attr_0", "inst.attr_1", "inst.attr_0 = 5",
+         "inst.attr_1 = 5")]
+    return timings
+
+
+def main(classes=2000, attributes=20):
+    content = json.loads(json.dumps(classes_json(classes, attributes)))
+    print("{} classes of {} attributes - python {}".format(
+        classes, attributes, sys.version.split()[0]))
+    print("{:<16}{:>10}{:>10}{:>10}{:>10}{:>10}{:>12}".format(
+        "backend", "generate", "compile", "execute", "source MB",
+        "code objs", "memory MB"))
+    results = []
+    for backend, plain in (("code", False), ("code", True),
+                           ("tables", False), ("tables", True)):
+        result = measure(content, backend, plain)
+        name = backend + (" (plain)" if plain else "")
+        results.append((name, result))
+        print("{:<16}{:>10.2f}{:>10.2f}{:>10.2f}{:>10.1f}{:>10}{:>12.1f}".format(
+            name, result["generate"], result["compile"], result["execute"],
+            result["source"] / 1e6, result["code_objects"],
+            result["memory"] / 1e6))
+
+    print("\nmicroseconds      create   get con  get free   set con  set free")
+    for name, result in results:
+        print("{:<16}".format(name) + "".join(
+            "{:>10.2f}".format(timing)
+            for timing in throughput(result["namespace"])))
+    internal.release_module("benchmark")
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
@@ -0,0 +1,110 @@
+#!/usr/bin/env python
+"""
+# importjson : Implementation of compressed_import.py
+
+Summary :
+    Benchmark of importing compressed json files
+Use Case :
+    As a Developer I want to know the trade-off between the I/O saved and the
+    CPU spent by compressed json files So that I can choose whether to
+    compress my json files
+
+Testable Statements :
+    How much smaller is each compressed file
+    How long does it take to read (& decompress) each file
+    How long does it take to import each file
+    At what read bandwidth does each compression pay for itself
+"""
+
+__author__ = 'Tony Flury : anthony.flury@btinternet.com'
+__created__ = '19 Oct 2026'
+
+import bz2
+import gzip
+import importlib
+import json
+import lzma
+import os
+import random
+import shutil
+import sys
+import tempfile
+import time
+
+import importjson
+from importjson import importjson as _importjson
+
+openers = ((".json", open), (".json.gz", gzip.open),
+           (".json.bz2", bz2.open), (".json.xz", lzma.open))
+
+
+def records_json(count, seed=1):
+    """Reference data shaped like ours - many similar records"""
+    rng = random.Random(seed)
+    return json.dumps({
+        "__doc__": "Tenant reference data",
+        "tenants": [
+            {"id": index,
+             "name": "tenant-{}".format(index),
+             "status": rng.choice(["active", "suspended", "pending"]),
+             "region": rng.choice(["eu-west-1", "us-east-1", "ap-south-1"]),
+             "limits": {"cpu": rng.choice([1, 2, 4, 8]),
+                        "memory": rng.choice([512, 1024, 2048])},
+             "tags": rng.sample(["gold", "silver", "bronze", "trial"], 2)}
+            for index in range(count)]}).encode("utf-8")
+
+
+def best(function, *args):
+    """The best of three timings"""
+    timings = []
+    for _ in range(3):
+        start = time.time()
+        function(*args)
+        timings.append(time.time() - start)
+    return min(timings)
+
+
+def import_module(directory, name):
+    """Import the json module afresh"""
+    sys.path.insert(0, directory)
+    try:
+        importlib.import_module(name)
+    finally:
+        sys.path.remove(directory)
+        sys.modules.pop(name, None)
+
+
+def main(count=50000):
+    raw = records_json(count)
+    directory = tempfile.mkdtemp()
+    importjson.configure("JSONSuffixes", [suffix for suffix, _ in openers])
+    print("{} records, {:.1f} MB of json - python {}".format(
+        count, len(raw) / 1e6, sys.version.split()[0]))
+    print("{:<10}{:>10}{:>8}{:>10}{:>10}{:>16}".format(
+        "suffix", "size MB", "ratio", "read s", "import s", "pays off below"))
+    try:
+        plain_read = None
+        for index, (suffix, opener) in enumerate(openers):
+            name = "bench_{}".format(index)
+            path = os.path.join(directory, name + suffix)
+            with opener(path, "wb") as fp:
+                fp.write(raw)
+            size = os.path.getsize(path)
+            read = best(_importjson._read_bytes, path)
+            imported = best(import_module, directory, name)
+            if plain_read is None:
+                plain_read, break_even = read, ""
+            else:
+                # The bandwidth at which the bytes saved take as long to
+                # read as the extra time spent decompressing
+                break_even = "{:.0f} MB/s".format(
+                    (len(raw) - size) / 1e6 / max(read - plain_read, 1e-9))
+            print("{:<10}{:>10.2f}{:>7.0f}x{:>10.3f}{:>10.3f}{:>16}".format(
+                suffix, size / 1e6, len(raw) / float(size), read, imported,
+                break_even))
+    finally:
+        shutil.rmtree(directory)
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
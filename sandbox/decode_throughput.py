@@ -0,0 +1,111 @@
+#!/usr/bin/env python
+"""
+# importjson : Implementation of decode_throughput.py
+
+Summary :
+    Throughput benchmark of decoding json payloads into instances
+Use Case :
+    As a Developer I want to know how fast payloads are decoded into
+    instances So that I can choose how my service ingests payloads
+
+Testable Statements :
+    How fast is json.loads followed by a Cls(**d) call per object
+    How fast is Cls.loads with each class backend
+"""
+
+__author__ = 'Tony Flury : anthony.flury@btinternet.com'
+__created__ = '19 Oct 2026'
+
+import json
+import random
+import sys
+import time
+import types
+
+from importjson import internal
+
+schema = {
+    "tenant": {"id": 0, "name": "", "status": "active", "region": "",
+               "tags": [], "limits": None, "contacts": [],
+               "__constraints__": {
+                   "id": {"type": "int", "min": 0},
+                   "name": {"type": "str", "not_none": True},
+                   "limits": {"type": "limits"},
+                   "contacts": {"items": {"type": "contact"}}}},
+    "limits": {"cpu": 1, "memory": 512, "burst": False,
+               "__constraints__": {"cpu": {"type": "int", "min": 1},
+                                   "memory": {"type": "int", "min": 0}}},
+    "contact": {"role": "", "notify": True}}
+
+
+def payload(count, seed=1):
+    """A list of tenants - each with nested limits & contacts"""
+    rng = random.Random(seed)
+    return json.dumps([
+        {"id": index,
+         "name": "tenant-{}".format(index),
+         "status": rng.choice(["active", "suspended", "pending"]),
+         "region": rng.choice(["eu-west-1", "us-east-1", "ap-south-1"]),
+         "tags": rng.sample(["gold", "silver", "bronze", "trial"], 2),
+         "limits": {"cpu": rng.choice([1, 2, 4]),
+                    "memory": rng.choice([512, 1024]),
+                    "burst": rng.choice([True, False])},
+         "contacts": [{"role": "owner", "notify": True},
+                      {"role": "billing", "notify": False}]}
+        for index in range(count)])
+
+
+def module(backend, plain):
+    """The classes generated for the schema"""
+    source = internal.Module("tenants", schema, None,
+                             json_file="tenants.json",
+                             plain_attributes=plain,
+                             class_tables=(backend == "tables")).generate()
+    mod = types.ModuleType("tenants")
+    sys.modules["tenants"] = mod
+    exec(compile(source, "tenants.json", "exec"), mod.__dict__)
+    return mod
+
+
+def by_constructor(mod, text):
+    """json.loads, then the nested classes & the class built by hand"""
+    tenants = []
+    for data in json.loads(text):
+        data["limits"] = mod.limits(**data["limits"])
+        data["contacts"] = [mod.contact(**contact)
+                            for contact in data["contacts"]]
+        tenants.append(mod.tenant(**data))
+    return tenants
+
+
+def best(function, *args):
+    """The best of three timings"""
+    timings = []
+    for _ in range(3):
+        start = time.time()
+        function(*args)
+        timings.append(time.time() - start)
+    return min(timings)
+
+
+def main(count=20000):
+    text = payload(count)
+    print("{} tenants, {:.1f} MB of json - python {}".format(
+        count, len(text) / 1e6, sys.version.split()[0]))
+    print("{:<16}{:>16}{:>16}{:>10}".format(
+        "backend", "loads + Cls(**d)", "Cls.loads", "speedup"))
+    for backend, plain in (("code", False), ("code", True),
+                           ("tables", False), ("tables", True)):
+        internal.release_module("tenants")
+        mod = module(backend, plain)
+        assert (repr(by_constructor(mod, text)) ==
+                repr(mod.tenant.loads(text)))
+        constructed = best(by_constructor, mod, text)
+        decoded = best(mod.tenant.loads, text)
+        print("{:<16}{:>15.0f}/s{:>15.0f}/s{:>9.1f}x".format(
+            backend + (" (plain)" if plain else ""), count / constructed,
+            count / decoded, constructed / decoded))
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
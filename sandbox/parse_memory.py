@@ -0,0 +1,89 @@
+#!/usr/bin/env python
+"""
+# importjson : Implementation of parse_memory.py
+
+Summary :
+    Memory benchmark of the json parse modes
+Use Case :
+    As a Developer I want to know the memory used by each parse mode So that
+    I can choose the mode for my json files
+
+Testable Statements :
+    How much memory does the parsed json use in each mode
+    How long does each mode take to parse the json
+"""
+
+__author__ = 'Tony Flury : anthony.flury@btinternet.com'
+__created__ = '19 Oct 2026'
+
+import gc
+import json
+import random
+import sys
+import time
+import tracemalloc
+
+import importjson
+from importjson import importjson as _importjson
+
+
+def records_json(count, seed=1):
+    """A configuration file shaped like ours - many similar records
+
+       Each record repeats the same keys, a handful of short enumerated
+       strings, small nested dictionaries and lists.
+    """
+    rng = random.Random(seed)
+    statuses = ["active", "suspended", "pending", "closed"]
+    regions = ["eu-west-1", "eu-west-2", "us-east-1", "ap-south-1"]
+    tags = ["gold", "silver", "bronze", "trial", "internal"]
+    return json.dumps({
+        "__doc__": "Tenant configuration",
+        "__version__": "2.1",
+        "tenants": [
+            {"id": index,
+             "name": "tenant-{}".format(index),
+             "status": rng.choice(statuses),
+             "region": rng.choice(regions),
+             "limits": {"cpu": rng.choice([1, 2, 4, 8]),
+                        "memory": rng.choice([512, 1024, 2048]),
+                        "burst": rng.choice([True, False])},
+             "features": {"sso": rng.choice([True, False]),
+                          "audit": True,
+                          "retention_days": rng.choice([30, 90, 365])},
+             "tags": rng.sample(tags, 2),
+             "contacts": [{"role": "owner", "notify": True},
+                          {"role": "billing", "notify": False}]}
+            for index in range(count)]}).encode("utf-8")
+
+
+def measure(raw, mode):
+    """The memory retained by the parsed json, and the time to parse"""
+    importjson.configure("ParseMode", mode)
+    gc.collect()
+    tracemalloc.start()
+    start = time.time()
+    json_dict = _importjson._parse_json(raw, "<benchmark>")
+    elapsed = time.time() - start
+    gc.collect()
+    retained, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del json_dict
+    return retained, peak, elapsed
+
+
+def main(count=100000):
+    raw = records_json(count)
+    print("{} records, {:.1f} MB of json - python {}".format(
+        count, len(raw) / 1e6, sys.version.split()[0]))
+    print("{:<10}{:>14}{:>14}{:>10}".format("mode", "retained MB", "peak MB",
+                                          "seconds"))
+    for mode in ("ordered", "lean", "shared"):
+        retained, peak, elapsed = measure(raw, mode)
+        print("{:<10}{:>14.1f}{:>14.1f}{:>10.2f}".format(
+            mode, retained / 1e6, peak / 1e6, elapsed))
+    importjson.configure("ParseMode", "ordered")
+
+
+if __name__ == '__main__':
+    main(*[int(arg) for arg in sys.argv[1:]])
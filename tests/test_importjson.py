@@ -15,9 +15,19 @@ from __future__ import print_function
 
 from distutils.version import StrictVersion as StVers
 
+import io
+import json
 import os
 import sys
+import array
+import collections
+import gc
 import inspect
+import time
+import timeit
+import threading
+import types
+import weakref
 
 from TempDirectoryContext import TempDirectoryContext as TestDirCont
 from random import sample
@@ -33,7 +43,13 @@ import six
 import click
 import re
 
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
 import importjson.version
+import importjson.internal
 
 __author__ = 'Tony Flury : anthony.flury@btinternet.com'
 __created__ = '16 Oct 2015'
@@ -79,6 +95,27 @@ class Installation(unittest.TestCase):
             importjson.configure("AllDictionariesAsClasses", True)
             print(cm.exception)
 
+    def test_000_003_LazyImports(self):
+        """Confirm that importing importjson doesn't import the code generator
+
+           Executed in a new interpreter so the modules imported can be
+           identified.
+        """
+        import subprocess
+        script = ("import sys\n"
+                  "before = set(sys.modules)\n"
+                  "import importjson\n"
+                  "print(' '.join(sorted(set(sys.modules) - before)))\n")
+        imported = subprocess.check_output(
+            [sys.executable, "-W", "error::DeprecationWarning", "-c", script],
+            cwd=os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+        ).decode("utf-8").split()
+
+        for name in ["importjson.internal", "templatelite", "six", "json",
+                     "imp", "datetime", "traceback", "zipfile", "hashlib",
+                     "importjson.cache"]:
+            self.assertNotIn(name, imported)
+
     def test_000_010_configurationValid(self):
         """Test obsolete config item"""
         importjson.configure("JSONSuffixes", [".JSON"])
@@ -115,25 +152,56 @@ class ModuleContentTest(object):
             name = "".join("".join(sample(ascii_lowercase, 7)))
         return name
 
-    def createModule(self, json_str, perm_error=False):
+    def createModule(self, json_str, perm_error=False, suffix=".json",
+                     opener=open):
         """Create a json file in a random file in a random directory & import
 
             :param json_str : The json to write to the file
             :param perm_error : A boolean - whether there is to be an
                             perm_error in this module - i.e. wrong permissions
+            :param suffix : The file name suffix to use for the json file
+            :param opener : The callable used to open the json file for
+                            writing - i.e. to write compressed files
         """
         with TestDirCont() as tempd:
             sys.path.append(tempd)
             self.mod_name = ModuleContentTest._random_name()
-            self.path = os.path.join(tempd, self.mod_name + ".json")
-            with open(self.path, "w") as json_fp:
-                json_fp.write(json_str)
+            self.path = os.path.join(tempd, self.mod_name + suffix)
+            with opener(self.path, "wb") as json_fp:
+                json_fp.write(json_str.encode("utf-8"))
 
             if perm_error:
                 os.chmod(self.path, 0o200)
 
         self.tm = importlib.import_module(self.mod_name)
 
+
+class JsonModuleTest(object):
+    """To be subclassed - json modules created in a temporary directory"""
+    def setUp(self):
+        self.names = []
+        with TestDirCont() as tempd:
+            self.tempd = tempd
+        sys.path.append(self.tempd)
+
+    def tearDown(self):
+        sys.path.remove(self.tempd)
+        for name in self.names:
+            sys.modules.pop(name, None)
+
+    def createFile(self, content):
+        """Create a json file - returning the module name"""
+        name = ModuleContentTest._random_name()
+        self.names.append(name)
+        with open(os.path.join(self.tempd, name + ".json"), "wb") as fp:
+            fp.write(content.encode("utf-8"))
+        return name
+
+    def createModule(self, content):
+        """Create & import a json module"""
+        return importlib.import_module(self.createFile(content))
+
+
 class ModuleData(ModuleContentTest, unittest.TestCase):
     """Test Module level data, __loader__, __file__ etc"""
     def setUp(self):
@@ -1560,6 +1628,2378 @@ class ClassAttrConflictingConstratints(ModuleContentTest, unittest.TestCase):
         with self.assertRaises(ValueError):
             instb.a1 = 3
 
+
+class CompressedModules(ModuleContentTest, unittest.TestCase):
+    """Test import of compressed json files"""
+    def setUp(self):
+        super(CompressedModules, self).setUp()
+        self._suffixes = importjson.get_configure("JSONSuffixes")
+        importjson.configure("JSONSuffixes",
+                             [".json", ".json.gz", ".json.bz2", ".json.xz"])
+
+    def tearDown(self):
+        super(CompressedModules, self).tearDown()
+        importjson.configure("JSONSuffixes", self._suffixes)
+
+    def _check_compressed(self, suffix, opener):
+        """Import a compressed module and check the content"""
+        self.createModule("""
+{
+    "__version__":"0.1",
+    "classa":{
+        "a1":1
+    }
+}""", suffix=suffix, opener=opener)
+        self.assertEqual(self.tm.__file__, self.path)
+        self.assertEqual(self.tm.__version__, "0.1")
+        self.assertEqual(self.tm.classa().a1, 1)
+
+    def test_200_000_gzip(self):
+        """Import a gzip compressed json file"""
+        import gzip
+        self._check_compressed(".json.gz", gzip.open)
+
+    def test_200_001_bzip2(self):
+        """Import a bzip2 compressed json file"""
+        import bz2
+        self._check_compressed(".json.bz2", bz2.BZ2File)
+
+    @unittest.skipIf(six.PY2, "lzma not available")
+    def test_200_002_lzma(self):
+        """Import a lzma compressed json file"""
+        import lzma
+        self._check_compressed(".json.xz", lzma.open)
+
+    def test_200_010_InvalidCompressedData(self):
+        """Test that a corrupted compressed file cannot be imported"""
+        with self.assertRaises(ImportError):
+            self.createModule("{}", suffix=".json.gz")
+
+    @staticmethod
+    def _corrupt(header):
+        """An opener which writes a valid header before the (uncompressed)
+           content - so that the compressed data is corrupt"""
+        def opener(path, mode):
+            fp = open(path, mode)
+            fp.write(header)
+            return fp
+        return opener
+
+    def test_200_012_CorruptCompressedData(self):
+        """Test that corrupt gzip (zlib) data cannot be imported"""
+        with six.assertRaisesRegex(self, ImportError, "Cannot open"):
+            self.createModule('{"a1": 1}', suffix=".json.gz",
+                              opener=self._corrupt(b"\x1f\x8b\x08\x00"
+                                                   b"\x00\x00\x00\x00"
+                                                   b"\x00\x03"))
+
+    @unittest.skipIf(six.PY2, "lzma not available")
+    def test_200_013_CorruptLzmaData(self):
+        """Test that corrupt lzma data cannot be imported"""
+        with six.assertRaisesRegex(self, ImportError, "Cannot open"):
+            self.createModule('{"a1": 1}', suffix=".json.xz",
+                              opener=self._corrupt(b"\xfd7zXZ\x00"))
+
+    def test_200_011_NotFoundUnlessConfigured(self):
+        """Test that compressed files are ignored unless configured"""
+        import gzip
+        importjson.configure("JSONSuffixes", [".json"])
+        with self.assertRaises(ImportError):
+            self.createModule("{}", suffix=".json.gz", opener=gzip.open)
+
+
+class ZipArchiveModules(unittest.TestCase):
+    """Test import of json files from a zip archive on sys.path"""
+    def setUp(self):
+        self.names = []
+        self._suffixes = importjson.get_configure("JSONSuffixes")
+        importjson.configure("JSONSuffixes", [".json", ".json.gz"])
+
+    def tearDown(self):
+        sys.path.remove(self.archive)
+        for name in self.names:
+            sys.modules.pop(name, None)
+        importjson.configure("JSONSuffixes", self._suffixes)
+        importlib.invalidate_caches()
+
+    def createArchive(self, members):
+        """Create a zip archive with the given members & add it to sys.path
+
+           :param members : A dictionary of member name to member content
+        """
+        import zipfile
+        with TestDirCont() as tempd:
+            self.archive = os.path.join(tempd,
+                                        ModuleContentTest._random_name() +
+                                        ".zip")
+            with zipfile.ZipFile(self.archive, "w") as zf:
+                for name, content in members.items():
+                    zf.writestr(name, content)
+        sys.path.append(self.archive)
+
+    def test_210_000_ImportFromArchive(self):
+        """Import a json module from a zip archive"""
+        name = ModuleContentTest._random_name()
+        self.names.append(name)
+        self.createArchive({name + ".json": '{"a1":1, "classa":{"x":2}}'})
+        tm = importlib.import_module(name)
+        self.assertEqual(tm.__file__, os.path.join(self.archive,
+                                                   name + ".json"))
+        self.assertEqual(tm.a1, 1)
+        self.assertEqual(tm.classa().x, 2)
+
+    def test_210_001_ImportManyFromArchive(self):
+        """Import several json modules from a single archive"""
+        names = [ModuleContentTest._random_name() for i in range(5)]
+        self.names.extend(names)
+        self.createArchive(
+            dict((name + ".json", '{{"value":{}}}'.format(index))
+                 for index, name in enumerate(names)))
+        for index, name in enumerate(names):
+            self.assertEqual(importlib.import_module(name).value, index)
+
+    def test_210_002_ImportCompressedFromArchive(self):
+        """Import a compressed json module from a zip archive"""
+        import gzip
+        import io
+        name = ModuleContentTest._random_name()
+        self.names.append(name)
+        buffer = io.BytesIO()
+        with gzip.GzipFile(fileobj=buffer, mode="wb") as gz:
+            gz.write(b'{"a1":3}')
+        self.createArchive({name + ".json.gz": buffer.getvalue()})
+        self.assertEqual(importlib.import_module(name).a1, 3)
+
+    def test_210_003_MissingFromArchive(self):
+        """A module not in the archive is not found"""
+        self.createArchive({"other.json": "{}"})
+        with self.assertRaises(ImportError):
+            importlib.import_module(ModuleContentTest._random_name())
+
+    def test_210_004_MemberSizeLimit(self):
+        """A member larger than the file size limit is never read"""
+        from importjson.archive import ZipIndex
+        name = ModuleContentTest._random_name()
+        self.names.append(name)
+        self.createArchive({name + ".json": '{"a1": "' + "x" * 1000 + '"}'})
+
+        def read(self, member, max_size=None):
+            """The member must not be read"""
+            raise AssertionError("Read")
+
+        importjson.configure("MaxFileSize", 100)
+        original, ZipIndex.read = ZipIndex.read, read
+        try:
+            with six.assertRaisesRegex(self, ImportError,
+                                       "exceeds the file size limit"):
+                importlib.import_module(name)
+        finally:
+            ZipIndex.read = original
+            importjson.configure("MaxFileSize", None)
+
+
+class BundleModules(unittest.TestCase):
+    """Test building and importing from a precompiled bundle"""
+    def setUp(self):
+        self.names, self.finder = [], None
+
+    def tearDown(self):
+        if self.finder in sys.meta_path:
+            sys.meta_path.remove(self.finder)
+        for name in self.names:
+            sys.modules.pop(name, None)
+
+    def createBundle(self, modules):
+        """Create json files, bundle them and then remove the json files
+
+           :param modules : A dictionary of module name to json content
+           :return : The file name of the bundle
+        """
+        import importjson.__main__
+        with TestDirCont() as tempd:
+            src = os.path.join(tempd, "src")
+            os.mkdir(src)
+            for name, content in modules.items():
+                with open(os.path.join(src, name + ".json"), "w") as fp:
+                    fp.write(content)
+            bundle = os.path.join(tempd, "app.ijb")
+            self.assertEqual(importjson.__main__.main(
+                ["bundle", src, "-o", bundle]), 0)
+
+            for name in modules:
+                os.remove(os.path.join(src, name + ".json"))
+        self.names.extend(modules)
+        return bundle
+
+    def test_220_000_ImportFromBundle(self):
+        """Import modules from a bundle once the json files are removed"""
+        a, b = ModuleContentTest._random_name(), ModuleContentTest._random_name()
+        bundle = self.createBundle({
+            a: '{"__version__":"0.1", "classa":{"x":1}}',
+            b: '{"value":[1,2,3]}'})
+        self.finder = importjson.add_bundle(bundle)
+        self.assertEqual(sorted(self.finder.modules()), sorted([a, b]))
+
+        tma, tmb = importlib.import_module(a), importlib.import_module(b)
+        self.assertEqual(tma.__version__, "0.1")
+        self.assertEqual(tma.classa().x, 1)
+        self.assertEqual(tmb.value, [1, 2, 3])
+        self.assertEqual(tmb.__json__, {"value": [1, 2, 3]})
+        self.assertIs(tmb.__loader__, self.finder)
+        self.assertTrue(inspect.iscode(self.finder.get_code(b)))
+
+    def test_220_001_UnknownModule(self):
+        """The bundle finder ignores modules not in the bundle"""
+        bundle = self.createBundle({ModuleContentTest._random_name(): "{}"})
+        self.finder = importjson.add_bundle(bundle)
+        self.assertIsNone(
+            self.finder.find_module(ModuleContentTest._random_name()))
+        with self.assertRaises(ImportError):
+            self.finder.load_module(ModuleContentTest._random_name())
+
+    def test_220_002_NotABundle(self):
+        """A file which isn't a bundle is rejected"""
+        with TestDirCont() as tempd:
+            file_name = os.path.join(tempd, "app.ijb")
+            with open(file_name, "wb") as fp:
+                fp.write(b"0" * 32)
+            with self.assertRaises(ImportError):
+                importjson.add_bundle(file_name)
+
+    def test_220_003_InvalidJson(self):
+        """An invalid json file prevents the bundle being built"""
+        import importjson.__main__
+        with TestDirCont() as tempd:
+            with open(os.path.join(tempd, "bad.json"), "w") as fp:
+                fp.write("[}")
+            self.assertEqual(importjson.__main__.main(
+                ["bundle", tempd, "-o", os.path.join(tempd, "app.ijb")]), 1)
+
+
+class CompiledModules(unittest.TestCase):
+    """Test ahead of time compilation to standalone python modules"""
+
+    _json = """{
+        "__version__":"0.1",
+        "classa":{
+            "x":1,
+            "y":[1,2],
+            "__constraints__":{"x":{"min":0}}
+        }
+    }"""
+
+    def _run_standalone(self, directory, statement):
+        """Execute a statement in a python process without importjson (or
+           six)"""
+        import subprocess
+        script = ("import sys\n"
+                  "sys.modules['importjson'] = None\n"
+                  "sys.modules['six'] = None\n"
+                  "sys.path.insert(0, {!r})\n"
+                  "{}\n".format(directory, statement))
+        return subprocess.check_output([sys.executable, "-c", script]
+                                       ).decode("utf-8").strip()
+
+    def test_230_000_CompileFile(self):
+        """Compile a json file and import it without importjson"""
+        import importjson.__main__
+        with TestDirCont() as tempd:
+            json_file = os.path.join(tempd, "src.json")
+            with open(json_file, "w") as fp:
+                fp.write(self._json)
+            output = os.path.join(tempd, "settings.py")
+            self.assertEqual(importjson.__main__.main(
+                ["compile", json_file, "-o", output]), 0)
+
+            self.assertEqual(self._run_standalone(
+                tempd, "import settings\n"
+                       "print(settings.__version__, settings.classa().y, "
+                       "settings.__json__['__version__'])"),
+                "0.1 [1, 2] 0.1")
+            self.assertEqual(self._run_standalone(
+                tempd, "import settings\n"
+                       "try:\n"
+                       "    settings.classa(x=-1)\n"
+                       "except ValueError:\n"
+                       "    print('ValueError')"),
+                "ValueError")
+
+    def test_230_001_CompileDirectory(self):
+        """Compile a directory of json files"""
+        import importjson.__main__
+        with TestDirCont() as tempd:
+            src, dest = os.path.join(tempd, "src"), os.path.join(tempd, "out")
+            os.mkdir(src)
+            for name in ["mod_a", "mod_b"]:
+                with open(os.path.join(src, name + ".json"), "w") as fp:
+                    fp.write(self._json)
+            self.assertEqual(importjson.__main__.main(
+                ["compile", src, "-o", dest, "--no-json"]), 0)
+            self.assertEqual(sorted(os.listdir(dest)),
+                             ["mod_a.py", "mod_b.py"])
+            self.assertEqual(self._run_standalone(
+                dest, "import mod_b\n"
+                      "print(mod_b.classa().x, hasattr(mod_b, '__json__'))"),
+                "1 False")
+
+    def test_230_002_StringTypes(self):
+        """A compiled module checks string types without six"""
+        from importjson.compiler import generate_source
+        with TestDirCont() as tempd:
+            json_file = os.path.join(tempd, "src.json")
+            with open(json_file, "w") as fp:
+                fp.write('{"classa":{"name":"a",'
+                         '"__constraints__":{"name":{"type":"str"}}}}')
+            source = generate_source(json_file, mod_name="named")
+            self.assertNotIn("six", source)
+            with open(os.path.join(tempd, "named.py"), "w") as fp:
+                fp.write(source)
+
+            self.assertEqual(self._run_standalone(
+                tempd, "import named\n"
+                       "print(named.classa(name='b').name)\n"
+                       "try:\n"
+                       "    named.classa(name=1)\n"
+                       "except TypeError:\n"
+                       "    print('TypeError')"),
+                "b\nTypeError")
+
+    def test_230_003_NoDecoding(self):
+        """A compiled module has no json decoding class methods"""
+        from importjson.compiler import generate_source
+        with TestDirCont() as tempd:
+            json_file = os.path.join(tempd, "src.json")
+            with open(json_file, "w") as fp:
+                fp.write(self._json)
+            source = generate_source(json_file, mod_name="decoded")
+            self.assertNotIn("importjson", source.split('"""', 2)[2])
+            with open(os.path.join(tempd, "decoded.py"), "w") as fp:
+                fp.write(source)
+
+            self.assertEqual(self._run_standalone(
+                tempd, "import decoded\n"
+                       "print(hasattr(decoded.classa, 'loads'), "
+                       "hasattr(decoded.classa, 'load_many'))"),
+                "False False")
+
+
+class ReproducibleAndCachedModules(ModuleContentTest, unittest.TestCase):
+    """Test reproducible code generation and the content addressed cache"""
+    def setUp(self):
+        super(ReproducibleAndCachedModules, self).setUp()
+        self._generate = importjson.internal.Module.generate
+
+    def tearDown(self):
+        super(ReproducibleAndCachedModules, self).tearDown()
+        importjson.internal.Module.generate = self._generate
+        importjson.configure("Reproducible", False)
+        importjson.configure("CacheDirectory", None)
+
+    def test_240_000_ReproducibleSource(self):
+        """Reproducible generation creates identical source"""
+        importjson.configure("Reproducible", True)
+        self.createModule('{"a1":1}')
+        source = self.tm.__loader__.get_source(self.mod_name)
+        self.assertIn("Generated Thu 01 Jan 1970 00:00:00", source)
+        self.assertIn("Original json data : {}.json".format(self.mod_name),
+                      source)
+        self.assertNotIn(os.path.dirname(self.path), source)
+        self.assertEqual(source, self.tm.__loader__.get_source(self.mod_name))
+
+    def test_240_010_CacheIsPopulated(self):
+        """Importing with a cache directory populates the cache"""
+        with TestDirCont() as cache_dir:
+            importjson.configure("CacheDirectory", cache_dir)
+            self.createModule('{"a1":1, "classa":{"x":2}}')
+            entries = [name for dir_path, dirs, files in os.walk(cache_dir)
+                       for name in files]
+            self.assertEqual(len([e for e in entries if e.endswith(".py")]), 1)
+            self.assertEqual(
+                len([e for e in entries if e.endswith(".code")]), 1)
+            self.assertEqual(self.tm.classa().x, 2)
+
+    def test_240_011_CacheIsUsed(self):
+        """A cached module is imported without generating code"""
+        with TestDirCont() as cache_dir:
+            importjson.configure("CacheDirectory", cache_dir)
+            self.createModule('{"a1":1, "classa":{"x":2}}')
+
+            def fail(module):
+                raise AssertionError("Code generated")
+            importjson.internal.Module.generate = fail
+
+            # Reload uses the cached code
+            imp.reload(self.tm)
+            self.assertEqual(self.tm.classa().x, 2)
+            self.assertEqual(self.tm.__json__["a1"], 1)
+
+            # So does the source
+            self.assertIn("classa = _class_factory_",
+                          self.tm.__loader__.get_source(self.mod_name))
+
+    def test_240_012_CacheKeyedByContent(self):
+        """A changed json file is not served from the cache"""
+        with TestDirCont() as cache_dir:
+            importjson.configure("CacheDirectory", cache_dir)
+            self.createModule('{"a1":1}')
+            with open(self.path, "w") as fp:
+                fp.write('{"a1":2}')
+            imp.reload(self.tm)
+            self.assertEqual(self.tm.a1, 2)
+
+    def test_240_013_CacheKey(self):
+        """The cache key depends on the content and the other parts"""
+        from importjson.cache import CodeCache
+        self.assertEqual(CodeCache.key(b"{}", "a"), CodeCache.key(b"{}", "a"))
+        self.assertNotEqual(CodeCache.key(b"{}", "a"),
+                            CodeCache.key(b"{ }", "a"))
+        self.assertNotEqual(CodeCache.key(b"{}", "a"),
+                            CodeCache.key(b"{}", "b"))
+
+    def test_240_014_UnwritableCache(self):
+        """An unwritable cache directory doesn't prevent the import"""
+        with TestDirCont() as tempd:
+            cache_file = os.path.join(tempd, "not_a_dir")
+            with open(cache_file, "w") as fp:
+                fp.write("")
+            importjson.configure("CacheDirectory", cache_file)
+            self.createModule('{"a1":1}')
+            self.assertEqual(self.tm.a1, 1)
+
+    @unittest.skipIf(sys.platform.startswith("win"), "posix file modes")
+    def test_240_015_CacheEntryMode(self):
+        """Cache entries are created with the mode of any other new file"""
+        import stat
+        from importjson import cache
+        umask = os.umask(0o022)
+        try:
+            with TestDirCont() as cache_dir:
+                importjson.configure("CacheDirectory", cache_dir)
+                cache._mode = None
+                self.createModule('{"a1":1}')
+                modes = set(stat.S_IMODE(os.stat(os.path.join(dir_path,
+                                                             name)).st_mode)
+                            for dir_path, dirs, files in os.walk(cache_dir)
+                            for name in files)
+                self.assertEqual(modes, {0o644})
+        finally:
+            os.umask(umask)
+            cache._mode = None
+
+
+class RegisteredRoots(unittest.TestCase):
+    """Test the scoped search of registered roots"""
+    def setUp(self):
+        self.roots, self.names = [], []
+
+    def tearDown(self):
+        for path, prefix in self.roots:
+            importjson.unregister_root(path, prefix=prefix)
+        for name in self.names:
+            sys.modules.pop(name, None)
+        importjson.configure("GlobalSearch", True)
+
+    def createRoot(self, modules, prefix=''):
+        """Create json files in a new directory & register it as a root
+
+           :param modules : A dictionary of module name to json content
+           :param prefix : The prefix to register the root with
+        """
+        with TestDirCont() as tempd:
+            root = os.path.join(tempd, ModuleContentTest._random_name())
+            os.mkdir(root)
+            for name, content in modules.items():
+                with open(os.path.join(root, name + ".json"), "w") as fp:
+                    fp.write(content)
+        importjson.register_root(root, prefix=prefix)
+        self.roots.append((root, prefix))
+        return root
+
+    def test_250_000_PrefixedRoot(self):
+        """Import a json module within a registered prefix"""
+        prefix = ModuleContentTest._random_name()
+        self.names.extend([prefix, prefix + ".settings"])
+        root = self.createRoot({"settings": '{"a1":1}'}, prefix=prefix)
+
+        tm = importlib.import_module(prefix + ".settings")
+        self.assertEqual(tm.a1, 1)
+        self.assertEqual(tm.__package__, prefix)
+        self.assertEqual(tm.__file__, os.path.join(root, "settings.json"))
+
+        package = sys.modules[prefix]
+        self.assertEqual(package.__path__, [root])
+        self.assertTrue(package.__loader__.is_package(prefix))
+        self.assertIs(package.settings, tm)
+
+    def test_250_001_DottedPrefix(self):
+        """Import a json module within a dotted prefix"""
+        top = ModuleContentTest._random_name()
+        prefix = top + ".config"
+        self.names.extend([top, prefix, prefix + ".settings"])
+        self.createRoot({"settings": '{"a1":2}'}, prefix=prefix)
+        self.assertEqual(importlib.import_module(prefix + ".settings").a1, 2)
+        self.assertEqual(sys.modules[top].__path__, [])
+
+    def test_250_002_PrefixedRootMissingModule(self):
+        """A module missing from a prefixed root is not found"""
+        prefix = ModuleContentTest._random_name()
+        self.names.append(prefix)
+        self.createRoot({"settings": '{}'}, prefix=prefix)
+        with self.assertRaises(ImportError):
+            importlib.import_module(prefix + ".missing")
+
+    def test_250_010_GlobalSearchDisabled(self):
+        """With global search disabled only registered roots are searched"""
+        name = ModuleContentTest._random_name()
+        with TestDirCont() as tempd:
+            with open(os.path.join(tempd, name + ".json"), "w") as fp:
+                fp.write('{}')
+            sys.path.append(tempd)
+            try:
+                importjson.configure("GlobalSearch", False)
+                self.assertIsNone(
+                    importjson.JSONLoader().find_module(name))
+                with self.assertRaises(ImportError):
+                    importlib.import_module(name)
+            finally:
+                sys.path.remove(tempd)
+
+    def test_250_011_TopLevelRoot(self):
+        """A root without a prefix provides top level modules"""
+        name = ModuleContentTest._random_name()
+        self.names.append(name)
+        importjson.configure("GlobalSearch", False)
+        self.createRoot({name: '{"a1":3}'})
+        self.assertEqual(importlib.import_module(name).a1, 3)
+
+    def test_250_020_UnregisterUnknown(self):
+        """Unregistering an unknown root is an error"""
+        with self.assertRaises(ValueError):
+            importjson.unregister_root(ModuleContentTest._random_name())
+
+
+class ConcurrentLoading(ModuleContentTest, unittest.TestCase):
+    """Test that concurrent imports of a module share a single load"""
+    def setUp(self):
+        super(ConcurrentLoading, self).setUp()
+        self._parse_json = importjson.importjson._parse_json
+        self.parsed = []
+
+        def slow_parse(raw, file_name, *args):
+            """Slow parse - so that all the threads overlap"""
+            self.parsed.append(file_name)
+            time.sleep(0.2)
+            return self._parse_json(raw, file_name, *args)
+        importjson.importjson._parse_json = slow_parse
+
+    def tearDown(self):
+        importjson.importjson._parse_json = self._parse_json
+        super(ConcurrentLoading, self).tearDown()
+
+    def test_260_000_ConcurrentImports(self):
+        """Many threads importing the same module share one load"""
+        import threading
+        with TestDirCont() as tempd:
+            sys.path.append(tempd)
+            self.mod_name = ModuleContentTest._random_name()
+            with open(os.path.join(tempd, self.mod_name + ".json"), "w") as fp:
+                fp.write('{"a1":1, "classa":{"x":1}}')
+
+        loader = importjson.JSONLoader()
+        start, results, errors = threading.Event(), [], []
+
+        def import_module(index):
+            start.wait()
+            try:
+                if index % 2:
+                    mod = importlib.import_module(self.mod_name)
+                else:
+                    mod = loader.find_module(self.mod_name).load_module(
+                        self.mod_name)
+                results.append((mod, hasattr(mod, "classa")))
+            except BaseException as e:
+                errors.append(e)
+
+        threads = [threading.Thread(target=import_module, args=(index,))
+                   for index in range(16)]
+        for thread in threads:
+            thread.start()
+        start.set()
+        for thread in threads:
+            thread.join()
+
+        self.tm = sys.modules[self.mod_name]
+        self.assertEqual(errors, [])
+        self.assertEqual(len(self.parsed), 1)
+        self.assertEqual(len(results), 16)
+        for mod, complete in results:
+            self.assertIs(mod, self.tm)
+            self.assertTrue(complete)
+
+    def test_260_001_ReloadStillLoads(self):
+        """A load after the module is complete is a reload"""
+        self.createModule('{"a1":1}')
+        self.tm.__loader__.load_module(self.mod_name)
+        self.assertEqual(len(self.parsed), 2)
+
+    def test_260_002_FailedImportNotInstalled(self):
+        """A module which fails to import is not left in sys.modules"""
+        with self.assertRaises(ImportError):
+            self.createModule('{"classa":{"__class_attributes__":1}}')
+        self.assertNotIn(self.mod_name, sys.modules)
+
+    def test_260_003_ReentrantImport(self):
+        """A module which imports itself while loading cannot be imported"""
+        with TestDirCont() as tempd:
+            sys.path.append(tempd)
+            self.mod_name = ModuleContentTest._random_name()
+            with open(os.path.join(tempd, self.mod_name + ".json"), "w") as fp:
+                fp.write('{{"base": {{"x": 1}}, "derived": {{"__parent__": '
+                         '"{}.base"}}}}'.format(self.mod_name))
+
+        with six.assertRaisesRegex(self, ImportError,
+                                   "circular import of json modules : "
+                                   "{0} -> {0}".format(self.mod_name)):
+            importlib.import_module(self.mod_name)
+        self.assertNotIn(self.mod_name, sys.modules)
+
+
+@unittest.skipIf(six.PY2, "asyncio not available")
+class AsyncLoading(ModuleContentTest, unittest.TestCase):
+    """Test loading json modules from within an asyncio event loop"""
+    def setUp(self):
+        import asyncio
+        super(AsyncLoading, self).setUp()
+        self.loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(self.loop)
+        self.names = []
+        self._parse_json = importjson.importjson._parse_json
+        self.parsed = []
+
+        def slow_parse(raw, file_name, *args):
+            """Slow parse - so that the event loop can be observed"""
+            self.parsed.append(file_name)
+            time.sleep(0.1)
+            return self._parse_json(raw, file_name, *args)
+        importjson.importjson._parse_json = slow_parse
+
+    def tearDown(self):
+        import asyncio
+        importjson.importjson._parse_json = self._parse_json
+        asyncio.set_event_loop(None)
+        self.loop.close()
+        for name in self.names:
+            sys.modules.pop(name, None)
+        if self.mod_name:
+            sys.path.remove(self.tempd)
+
+    def createJson(self, content):
+        """Create a json file in a directory on sys.path - but don't import"""
+        if not self.mod_name:
+            with TestDirCont() as tempd:
+                self.tempd = tempd
+            sys.path.append(self.tempd)
+
+        self.mod_name = ModuleContentTest._random_name()
+        self.names.append(self.mod_name)
+        path = os.path.join(self.tempd, self.mod_name + ".json")
+        with open(path, "w") as fp:
+            fp.write(content)
+        return self.mod_name, path
+
+    def run_async(self, awaitable):
+        """Run until the future is complete"""
+        return self.loop.run_until_complete(awaitable)
+
+    def test_270_000_LoadByName(self):
+        """Load a module by name"""
+        name, path = self.createJson('{"a1":1, "classa":{"x":2}}')
+        tm = self.run_async(importjson.aload(name))
+        self.assertIs(sys.modules[name], tm)
+        self.assertEqual(tm.a1, 1)
+        self.assertEqual(tm.classa().x, 2)
+
+    def test_270_001_LoadByPath(self):
+        """Load a module by the file name"""
+        name, path = self.createJson('{"a1":3}')
+        tm = self.run_async(importjson.aload(path))
+        self.assertEqual(tm.__name__, name)
+        self.assertEqual(tm.__file__, path)
+        self.assertEqual(tm.a1, 3)
+
+    def test_270_002_LoadMany(self):
+        """Load several modules concurrently"""
+        names = [self.createJson('{{"value":{}}}'.format(index))[0]
+                 for index in range(4)]
+        modules = self.run_async(importjson.aload_many(names))
+        self.assertEqual([mod.value for mod in modules], [0, 1, 2, 3])
+
+    def test_270_003_Coalesced(self):
+        """Concurrent loads of the same module share a single load"""
+        import asyncio
+        name, path = self.createJson('{"a1":1}')
+        modules = self.run_async(asyncio.gather(
+            *[importjson.aload(name) for index in range(5)]))
+        self.assertEqual(len(self.parsed), 1)
+        for mod in modules:
+            self.assertIs(mod, sys.modules[name])
+
+    def test_270_004_LoopNotBlocked(self):
+        """The event loop continues to run during the load"""
+        name, path = self.createJson('{"a1":1}')
+        ticks = []
+
+        def ticker():
+            ticks.append(time.time())
+            self.loop.call_later(0.01, ticker)
+
+        self.loop.call_soon(ticker)
+        self.assertEqual(self.run_async(importjson.aload(name)).a1, 1)
+        self.assertGreater(len(ticks), 3)
+
+    def test_270_005_NotFound(self):
+        """Loading an unknown module raises ImportError"""
+        with self.assertRaises(ImportError):
+            self.run_async(importjson.aload(ModuleContentTest._random_name()))
+
+    def test_270_006_ImportDuringLoad(self):
+        """An import before the loaded module is installed shares the load"""
+        from importjson import asyncload
+        name, path = self.createJson('{"a1":1}')
+        mod = asyncload._load_detached(name, None)
+        self.assertNotIn(name, sys.modules)
+
+        self.assertIs(importlib.import_module(name), mod)
+        self.assertIs(asyncload._install(name, mod), mod)
+        self.assertEqual(len(self.parsed), 1)
+
+    def test_270_007_RunningLoop(self):
+        """The load uses the running loop - not the current event loop"""
+        import asyncio
+        name, path = self.createJson('{"a1":1}')
+        asyncio.set_event_loop(None)
+        self.assertEqual(self.run_async(importjson.aload(name)).a1, 1)
+
+    def test_270_008_CancelOneLoad(self):
+        """Cancelling one of the concurrent loads doesn't cancel the others"""
+        import asyncio
+        name, path = self.createJson('{"a1":1}')
+        first = self.loop.create_task(importjson.aload(name))
+        second = self.loop.create_task(importjson.aload(name))
+        self.loop.call_soon(first.cancel)
+
+        self.assertIs(self.run_async(second), sys.modules[name])
+        self.assertTrue(first.cancelled())
+        self.assertEqual(len(self.parsed), 1)
+
+
+class ModuleRegistry(JsonModuleTest, unittest.TestCase):
+    """Test unloading and eviction of the least recently loaded modules"""
+    def setUp(self):
+        super(ModuleRegistry, self).setUp()
+        self.evicted = []
+        importjson.add_eviction_hook(self.hook)
+
+    def tearDown(self):
+        importjson.remove_eviction_hook(self.hook)
+        importjson.configure("MaxModules", None)
+        super(ModuleRegistry, self).tearDown()
+
+    def hook(self, name, module):
+        """Eviction hook - record the evicted modules"""
+        self.evicted.append((name, module))
+
+    def createModule(self, content='{"a1":1}'):
+        """Create & import a json module"""
+        return super(ModuleRegistry, self).createModule(content)
+
+    def test_280_000_Unload(self):
+        """An unloaded module is removed and imported afresh"""
+        tm = self.createModule()
+        name = tm.__name__
+        importjson.unload(name)
+        self.assertNotIn(name, sys.modules)
+        self.assertNotIn(name, importjson.JSONLoader._found_modules)
+
+        tm2 = importlib.import_module(name)
+        self.assertIsNot(tm, tm2)
+        self.assertEqual(tm2.a1, 1)
+        self.assertEqual(self.evicted, [])
+
+    def test_280_001_UnloadUnknown(self):
+        """Unloading an unknown module is an error"""
+        with self.assertRaises(ValueError):
+            importjson.unload(ModuleContentTest._random_name())
+
+    def test_280_010_Eviction(self):
+        """The least recently loaded module is evicted above MaxModules"""
+        importjson.configure("MaxModules", 2)
+        first, second = self.createModule(), self.createModule()
+
+        # A reload makes the first module the most recently loaded
+        first.__loader__.load_module(first.__name__)
+        third = self.createModule()
+
+        self.assertEqual(self.evicted, [(second.__name__, second)])
+        self.assertNotIn(second.__name__, sys.modules)
+        self.assertIn(first.__name__, sys.modules)
+        self.assertIn(third.__name__, sys.modules)
+
+    def test_280_011_NoEvictionWithoutLimit(self):
+        """Without MaxModules nothing is evicted"""
+        for index in range(5):
+            self.createModule()
+        self.assertEqual(self.evicted, [])
+
+    def test_280_012_EvictionOfDependents(self):
+        """The dependents of an evicted module are evicted & reported"""
+        importjson.configure("MaxModules", 2)
+        base = self.createModule('{"Entity": {"id": 0}}')
+        dependent = self.createModule(
+            '{{"Person": {{"__parent__": "{}.Entity"}}}}'.format(
+                base.__name__))
+        self.createModule()
+
+        self.assertEqual(self.evicted, [(dependent.__name__, dependent),
+                                        (base.__name__, base)])
+        self.assertNotIn(dependent.__name__, sys.modules)
+
+    def test_280_013_NoEvictionOfReferences(self):
+        """The module being loaded & the modules it references are kept"""
+        importjson.configure("MaxModules", 1)
+        other = self.createModule()
+        base = self.createFile('{"Entity": {"id": 0}}')
+        child = importlib.import_module(self.createFile(
+            '{{"Person": {{"__parent__": "{}.Entity"}}}}'.format(base)))
+
+        self.assertEqual(self.evicted, [(other.__name__, other)])
+        self.assertIs(sys.modules[child.__name__], child)
+        self.assertTrue(issubclass(child.Person, sys.modules[base].Entity))
+
+
+class SchemaDataModules(JsonModuleTest, unittest.TestCase):
+    """Test data modules which share the classes of a schema module"""
+    schema = '{"point": {"x": 0, "y": 0}, "origin": 0}'
+
+    def test_290_000_SharedClasses(self):
+        """Data modules share the classes of the schema module"""
+        schema = self.createFile(self.schema)
+        data1 = self.createFile(
+            '{{"__schema__": "{}", "a1": 1, "d1": {{"k": 2}}}}'.format(schema))
+        data2 = self.createFile('{{"__schema__": "{}"}}'.format(schema))
+
+        tm1, tm2 = (importlib.import_module(data1),
+                    importlib.import_module(data2))
+        sm = sys.modules[schema]
+        self.assertIs(tm1.point, sm.point)
+        self.assertIs(tm2.point, sm.point)
+        self.assertEqual(tm1.a1, 1)
+        self.assertEqual(tm1.d1, {"k": 2})
+        self.assertFalse(hasattr(tm1, "origin"))
+        self.assertEqual(tm1.point(x=3).x, 3)
+        self.assertEqual([cls.name for cls in tm1.get_classes()], ["point"])
+        self.assertEqual([(attr.name, attr.default)
+                          for attr in tm1.get_attributes()],
+                         [("a1", 1), ("d1", {"k": 2})])
+        self.assertEqual(tm2.__doc__, "Module {} - Data for schema {}".format(
+            data2, schema))
+
+    def test_290_001_DataSource(self):
+        """The source of a data module imports the schema classes"""
+        schema = self.createFile(self.schema)
+        data = self.createFile(
+            '{{"__schema__": "{}", "a1": [1, 2]}}'.format(schema))
+        tm = importlib.import_module(data)
+        source = tm.__loader__.get_source(data)
+        self.assertIn("from {} import point".format(schema), source)
+
+        namespace = {}
+        exec(tm.__loader__.get_code(data), namespace)
+        self.assertIs(namespace["point"], tm.point)
+        self.assertEqual(namespace["a1"], [1, 2])
+
+    def test_290_010_MissingSchema(self):
+        """A data module with an unknown schema cannot be imported"""
+        data = self.createFile(
+            '{{"__schema__": "{}"}}'.format(ModuleContentTest._random_name()))
+        with self.assertRaises(ImportError):
+            importlib.import_module(data)
+
+    def test_290_011_InvalidSchema(self):
+        """The schema must be named by a string"""
+        data = self.createFile('{"__schema__": 1}')
+        with self.assertRaises(ImportError):
+            importlib.import_module(data)
+
+
+class SharedClassFactories(JsonModuleTest, unittest.TestCase):
+    """Test that identical class definitions share their code"""
+    def test_300_000_SharedBetweenModules(self):
+        """Identical classes in different modules share code"""
+        tm1 = self.createModule('{"classa": {"x": 1, "y": [1]}}')
+        tm2 = self.createModule('{"classb": {"x": 1, "y": [1]}}')
+
+        self.assertIsNot(tm1.classa, tm2.classb)
+        self.assertEqual(tm1.classa.__name__, "classa")
+        self.assertEqual(tm2.classb.__name__, "classb")
+        self.assertEqual(tm2.classb.__module__, tm2.__name__)
+        self.assertEqual(repr(tm2.classb(x=2)), "classb(x=2, y=[1])")
+        if hasattr(tm1.classa.__init__.__code__, "replace"):
+            self.assertIs(tm1.classa.__init__.__code__,
+                          tm2.classb.__init__.__code__)
+
+    def test_300_001_SharedWithinModule(self):
+        """Identical classes in the same module share a single factory"""
+        tm = self.createModule('{"classa": {"x": 1}, "classb": {"x": 1},'
+                               ' "classc": {"x": 2}}')
+        source = tm.__loader__.get_source(tm.__name__)
+        self.assertEqual(source.count("def _class_factory_"), 2)
+        self.assertIsNot(tm.classa, tm.classb)
+        self.assertEqual(tm.classb().x, 1)
+        self.assertEqual(tm.classc().x, 2)
+
+    def test_300_002_DifferentBase(self):
+        """Classes which differ only by base class share a factory"""
+        tm = self.createModule('{"base": {"x": 1}, '
+                               '"classa": {"__parent__": "base", "y": 1}, '
+                               '"classb": {"y": 1}}')
+        self.assertTrue(issubclass(tm.classa, tm.base))
+        self.assertFalse(issubclass(tm.classb, tm.base))
+        self.assertEqual(tm.classa(y=2).x, 1)
+
+    def test_300_003_AttributeOrder(self):
+        """Classes whose attributes are in a different order don't share"""
+        tm = self.createModule('{"classa": {"x": 1, "y": 2},'
+                               ' "classb": {"y": 2, "x": 1}}')
+        self.assertEqual(repr(tm.classa(10, 20)), "classa(x=10, y=20)")
+        self.assertEqual(repr(tm.classb(10, 20)), "classb(y=10, x=20)")
+
+    def test_300_004_QualifiedNames(self):
+        """The methods are named after their class"""
+        tm = self.createModule('{"classa": {"x": 1, "__constraints__":'
+                               ' {"x": {"type": "int"}}}}')
+        self.assertEqual(tm.classa.__init__.__qualname__, "classa.__init__")
+        self.assertEqual(tm.classa.x.fset.__qualname__, "classa.x")
+        self.assertEqual(tm.classa.get_instance_attributes.__qualname__,
+                         "classa.get_instance_attributes")
+
+    @unittest.skipUnless(hasattr(types.CodeType, "replace"),
+                         "code objects can't be rebuilt")
+    def test_300_005_SharedCodeFile(self):
+        """Tracebacks show the class factory - not another module's file"""
+        import linecache
+        import traceback
+        content = '{"c": {"x": 1, "__constraints__": {"x": {"type": "int"}}}}'
+        tm1, tm2 = self.createModule(content), self.createModule(content)
+        try:
+            tm2.c(x="a")
+        except TypeError:
+            frame = traceback.extract_tb(sys.exc_info()[2])[-1]
+        else:
+            self.fail("TypeError not raised")
+        self.assertNotIn(tm1.__name__, frame[0])
+        self.assertTrue(frame[0].startswith("<class factory _class_factory_"))
+        self.assertIn("raise TypeError", linecache.getline(frame[0], frame[1]))
+
+    @unittest.skipUnless(hasattr(types.CodeType, "replace"),
+                         "code objects can't be rebuilt")
+    def test_300_006_Released(self):
+        """The class factories are forgotten when no module uses them"""
+        from importjson.importjson import _factory_code
+        content = '{"c": {"x": 1, "__constraints__": {"x": {"max": 3}}}}'
+        tm1, tm2 = self.createModule(content), self.createModule(content)
+        name = tm1.c.__init__.__code__.co_filename.strip("<>").split()[-1]
+        self.assertIn(name, _factory_code)
+
+        importjson.unload(tm1.__name__)
+        self.assertIn(name, _factory_code)
+        importjson.unload(tm2.__name__)
+        self.assertNotIn(name, _factory_code)
+        self.assertNotIn(name, importjson.internal.factory_sources())
+
+
+class CrossModuleReferences(JsonModuleTest, unittest.TestCase):
+    """Test classes which reference classes in other json modules"""
+    def setUp(self):
+        super(CrossModuleReferences, self).setUp()
+        self._parse_json = importjson.importjson._parse_json
+        self.parsed = []
+
+        def counting_parse(raw, file_name, *args):
+            """Record each json file parsed"""
+            self.parsed.append(os.path.basename(file_name))
+            return self._parse_json(raw, file_name, *args)
+        importjson.importjson._parse_json = counting_parse
+
+    def tearDown(self):
+        importjson.importjson._parse_json = self._parse_json
+        super(CrossModuleReferences, self).tearDown()
+
+    def createFiles(self, count):
+        """Create a base module and modules which reference its classes
+
+           :return : The base module name & the names of the other modules
+        """
+        base = self.createFile('{"Entity": {"id": 0}}')
+        names = [self.createFile(
+            '{{"Person": {{"__parent__": "{base}.Entity", "friend": null,'
+            ' "__constraints__": {{"friend": {{"type": "{base}.Entity"}}}}'
+            '}}}}'.format(base=base)) for _ in range(count)]
+        return base, names
+
+    def test_310_000_ReferencedParent(self):
+        """A class can be derived from a class in another json module"""
+        base, (name,) = self.createFiles(1)
+        tm = importlib.import_module(name)
+        bm = sys.modules[base]
+
+        self.assertTrue(issubclass(tm.Person, bm.Entity))
+        self.assertEqual(tm.Person(friend=bm.Entity(id=2)).friend.id, 2)
+        with self.assertRaises(TypeError):
+            tm.Person(friend=1)
+
+    def test_310_001_References(self):
+        """The referenced modules are identified from the json"""
+        self.assertEqual(importjson.importjson._references(
+            {"a": {"__parent__": "x.y.A", "b": 1,
+                   "__constraints__": {"b": {"type": "z.B"}}},
+             "c": {"__parent__": "a"}}), set(["x.y", "z"]))
+        self.assertEqual(importjson.importjson._references(
+            {"__schema__": "common.schema"}), set(["common.schema"]))
+
+    def test_310_010_Preload(self):
+        """Preload builds each module in the graph once"""
+        base, names = self.createFiles(3)
+        modules = importjson.preload(names)
+
+        self.assertEqual([mod.__name__ for mod in modules], names)
+        self.assertIn(base, sys.modules)
+        self.assertEqual(sorted(self.parsed),
+                         sorted(name + ".json" for name in [base] + names))
+        self.assertEqual(importjson.JSONLoader._prebuilt, {})
+
+    def test_310_011_PreloadSingleModule(self):
+        """A single module is preloaded by the calling thread"""
+        threads, parse_json = [], importjson.importjson._parse_json
+
+        def recording_parse(*args):
+            """Record the thread parsing each json file"""
+            threads.append(threading.current_thread())
+            return parse_json(*args)
+        importjson.importjson._parse_json = recording_parse
+
+        base, _ = self.createFiles(0)
+        importjson.preload([base])
+        self.assertEqual(threads, [threading.current_thread()])
+
+    def test_310_020_UnloadDependents(self):
+        """Unloading a module unloads only the modules depending on it"""
+        base, names = self.createFiles(2)
+        other = self.createFile('{"a1": 1}')
+        importjson.preload(names + [other])
+
+        self.assertEqual(sorted(importjson.dependents(base)), sorted(names))
+        importjson.unload(base)
+        for name in [base] + names:
+            self.assertNotIn(name, sys.modules)
+        self.assertIn(other, sys.modules)
+
+    def createCycle(self):
+        """Two modules whose classes are derived from each other's classes"""
+        first, second = (ModuleContentTest._random_name() for _ in range(2))
+        self.names.extend([first, second])
+        for name, other in ((first, second), (second, first)):
+            with open(os.path.join(self.tempd, name + ".json"), "w") as fp:
+                fp.write('{{"A": {{"x": 1}}, "C": {{"__parent__": '
+                         '"{}.A"}}}}'.format(other))
+        return first, second
+
+    def test_310_030_CircularImport(self):
+        """Modules which reference each other cannot be imported"""
+        first, second = self.createCycle()
+        with six.assertRaisesRegex(
+                self, ImportError, "circular import of json modules : "
+                "{0} -> {1} -> {0}".format(first, second)):
+            importlib.import_module(first)
+        self.assertNotIn(first, sys.modules)
+        self.assertNotIn(second, sys.modules)
+
+    def test_310_031_CircularPreload(self):
+        """Preloading modules which reference each other is an error"""
+        first, second = self.createCycle()
+        with six.assertRaisesRegex(self, ImportError,
+                                   "circular import of json modules"):
+            importjson.preload([first])
+        self.assertNotIn(first, sys.modules)
+        self.assertEqual(importjson.JSONLoader._prebuilt, {})
+
+
+class DirectoryPackages(JsonModuleTest, unittest.TestCase):
+    """Test packages created from directories of json files"""
+    def createTree(self, tree, directory=None):
+        """Create a tree of files - a dictionary value is a sub directory"""
+        directory = directory or self.tempd
+        for name, content in tree.items():
+            path = os.path.join(directory, name)
+            if isinstance(content, dict):
+                os.mkdir(path)
+                self.createTree(content, path)
+            else:
+                with open(path, "w") as fp:
+                    fp.write(content)
+
+    def createPackage(self):
+        """A package with an __init__ json file, a module & a sub package"""
+        name = ModuleContentTest._random_name()
+        self.names.extend([name, name + ".db", name + ".sub",
+                           name + ".sub.x"])
+        self.createTree({name: {"__init__.json": '{"a1": 1}',
+                                "db.json": '{"host": "local"}',
+                                "sub": {"__jsonpackage__": "",
+                                        "x.json": '{"a1": 2}'}}})
+        return name
+
+    def test_320_000_PackageInit(self):
+        """A directory with an __init__ json file is a package"""
+        name = self.createPackage()
+        pkg = importlib.import_module(name)
+        self.assertEqual(pkg.a1, 1)
+        self.assertEqual(pkg.__path__, [os.path.join(self.tempd, name)])
+        self.assertTrue(pkg.__loader__.is_package(name))
+        self.assertEqual(pkg.__file__,
+                         os.path.join(self.tempd, name, "__init__.json"))
+
+    def test_320_001_ImportSubmodules(self):
+        """The json files within a package are submodules"""
+        name = self.createPackage()
+        self.assertEqual(importlib.import_module(name + ".db").host, "local")
+        self.assertEqual(importlib.import_module(name + ".sub.x").a1, 2)
+        self.assertIs(sys.modules[name].db, sys.modules[name + ".db"])
+
+    def test_320_002_MarkedPackage(self):
+        """A directory with the marker file is a package without content"""
+        name = self.createPackage()
+        sub = importlib.import_module(name + ".sub")
+        self.assertFalse(hasattr(sub, "__file__"))
+        self.assertEqual(sub.__path__, [os.path.join(self.tempd, name, "sub")])
+
+    def test_320_003_NotAPackage(self):
+        """A directory without an __init__ json file is not a package"""
+        name = ModuleContentTest._random_name()
+        self.createTree({name: {"db.json": '{}'}})
+        self.assertIsNone(
+            importjson.JSONPackageFinder().find_module(name))
+        self.assertNotIn(name, importjson.JSONLoader._packages)
+
+    @unittest.skipIf(sys.version_info < (3, 7),
+                     "Module __getattr__ requires Python 3.7")
+    def test_320_010_LazySubmodules(self):
+        """Submodules are imported on first attribute access"""
+        name = self.createPackage()
+        pkg = importlib.import_module(name)
+        self.assertNotIn(name + ".db", sys.modules)
+        self.assertIn("db", dir(pkg))
+        self.assertIn("sub", dir(pkg))
+
+        self.assertEqual(pkg.db.host, "local")
+        self.assertIn(name + ".db", sys.modules)
+        self.assertEqual(pkg.sub.x.a1, 2)
+        self.assertFalse(hasattr(pkg, "missing"))
+
+    @unittest.skipIf(sys.version_info < (3, 7),
+                     "Module __getattr__ requires Python 3.7")
+    def test_320_011_NotSubmodules(self):
+        """Directories & files which can't be imported aren't submodules"""
+        name = self.createPackage()
+        self.createTree({"__pycache__": {}, "not-a-name": {},
+                         "bad-name.json": "{}"},
+                        os.path.join(self.tempd, name))
+        names = dir(importlib.import_module(name))
+        for entry in ("__pycache__", "not-a-name", "bad-name"):
+            self.assertNotIn(entry, names)
+
+    @unittest.skipIf(six.PY2, "Requires find_spec")
+    def test_320_020_PythonModulesNotProbed(self):
+        """Python modules & packages are found without probing for json"""
+        name = ModuleContentTest._random_name()
+        self.names.append(name)
+        self.createTree({name: {"__init__.py": "value = 1\n"}})
+
+        probe = importjson.JSONLoader._find_package
+        probed = []
+
+        def counting_probe(fullname, directory):
+            """Record each directory probed"""
+            probed.append(directory)
+            return probe(fullname, directory)
+        importjson.JSONLoader._find_package = staticmethod(counting_probe)
+        try:
+            self.assertEqual(importlib.import_module(name).value, 1)
+        finally:
+            importjson.JSONLoader._find_package = staticmethod(probe)
+        self.assertEqual(probed, [])
+
+    @unittest.skipIf(six.PY2, "Requires find_spec")
+    def test_320_021_MissingModuleNotSearchedAgain(self):
+        """The package finder doesn't ask the python path finder"""
+        from importlib.machinery import PathFinder
+
+        def find_spec(*args):
+            """The python path finder must not be asked"""
+            raise AssertionError("Searched by the python path finder")
+
+        original, PathFinder.find_spec = (PathFinder.__dict__["find_spec"],
+                                          staticmethod(find_spec))
+        try:
+            self.assertIsNone(importjson.JSONPackageFinder().find_spec(
+                ModuleContentTest._random_name()))
+        finally:
+            PathFinder.find_spec = original
+
+    @unittest.skipIf(six.PY2, "Requires find_spec")
+    def test_320_022_ExecModule(self):
+        """A package is imported without falling back to load_module"""
+        import warnings
+        name = self.createPackage()
+        with warnings.catch_warnings(record=True) as caught:
+            warnings.simplefilter("always")
+            pkg = importlib.import_module(name)
+        self.assertEqual(pkg.a1, 1)
+        self.assertIs(pkg.__spec__.loader, pkg.__loader__)
+        self.assertEqual([str(warning.message) for warning in caught
+                          if issubclass(warning.category, ImportWarning)], [])
+
+
+class ParseModes(JsonModuleTest, unittest.TestCase):
+    """Test the lean & shared in memory representations of the json"""
+    content = ('{"a1": [{"status": "active", "tags": ["x", "y"]},'
+               ' {"status": "active", "tags": ["x", "y"]}],'
+               ' "classa": {"x": 1, "status": "active"}}')
+
+    def tearDown(self):
+        importjson.configure("ParseMode", "ordered")
+        super(ParseModes, self).tearDown()
+
+    def parse(self, mode):
+        """Parse the content in the given mode"""
+        importjson.configure("ParseMode", mode)
+        return importjson.importjson._parse_json(self.content.encode("utf-8"),
+                                                 "test.json")
+
+    def test_330_000_Ordered(self):
+        """The default mode parses to OrderedDict"""
+        json_dict = self.parse("ordered")
+        self.assertIsInstance(json_dict, collections.OrderedDict)
+        self.assertIsNot(json_dict["a1"][0], json_dict["a1"][1])
+
+    def test_330_001_Lean(self):
+        """Lean mode shares keys and repeated strings"""
+        json_dict = self.parse("lean")
+        self.assertEqual(json_dict, self.parse("ordered"))
+        self.assertEqual(list(json_dict), ["a1", "classa"])
+
+        first, second = json_dict["a1"]
+        if sys.version_info >= (3, 7):
+            self.assertIs(type(first), dict)
+        self.assertIsNot(first, second)
+        self.assertIs(first["status"], second["status"])
+        self.assertIs(first["status"], json_dict["classa"]["status"])
+        self.assertIs(first["tags"][0], second["tags"][0])
+        self.assertIs(list(first)[0], list(second)[0])
+
+    def test_330_002_Shared(self):
+        """Shared mode shares numbers, but never dictionaries or lists"""
+        json_dict = self.parse("shared")
+        self.assertEqual(json_dict, self.parse("ordered"))
+        first, second = json_dict["a1"]
+        self.assertIsNot(first, second)
+        self.assertIsNot(first["tags"], second["tags"])
+        self.assertIs(first["status"], second["status"])
+
+        first["tags"].append("z")
+        self.assertEqual(second["tags"], ["x", "y"])
+
+    def test_330_004_SharedZeros(self):
+        """Shared mode keeps the sign of zero"""
+        importjson.configure("ParseMode", "shared")
+        json_dict = importjson.importjson._parse_json(
+            b'{"a": [0.0, -0.0, -0.0, 0, 1.5, 1.5]}', "test.json")
+        self.assertEqual([repr(value) for value in json_dict["a"]],
+                         ["0.0", "-0.0", "-0.0", "0", "1.5", "1.5"])
+        self.assertIs(json_dict["a"][4], json_dict["a"][5])
+
+    def test_330_003_UnknownMode(self):
+        """An unknown parse mode is an error"""
+        with self.assertRaises(ValueError):
+            self.parse("compact")
+
+    def test_330_010_LeanModule(self):
+        """A module imported in lean mode is unchanged"""
+        importjson.configure("ParseMode", "lean")
+        tm = self.createModule(self.content)
+        self.assertEqual(tm.a1[0]["tags"], ["x", "y"])
+        self.assertEqual(tm.classa().status, "active")
+        self.assertEqual(tm.__json__["classa"]["x"], 1)
+
+    def test_330_011_SharedDataModule(self):
+        """The identical lists of a shared data module are distinct"""
+        importjson.configure("ParseMode", "shared")
+        tm = self.createModule('{"xs": [1000, 2000], "ys": [1000, 2000]}')
+        self.assertIsNot(tm.xs, tm.ys)
+        self.assertIs(tm.xs[0], tm.ys[0])
+        tm.xs.append(3000)
+        self.assertEqual(tm.ys, [1000, 2000])
+
+
+class ModuleJSONOptions(JsonModuleTest, unittest.TestCase):
+    """Test the options for the __json__ module attribute"""
+    content = '{"a1": [1, 2], "classa": {"x": 1}}'
+
+    def tearDown(self):
+        importjson.configure("ModuleJSON", "eager")
+        super(ModuleJSONOptions, self).tearDown()
+
+    def createModule(self, held):
+        """Create & import a json module with the __json__ option"""
+        importjson.configure("ModuleJSON", held)
+        return importlib.import_module(self.createFile(self.content))
+
+    def test_340_000_Eager(self):
+        """By default the module holds the parsed json"""
+        tm = self.createModule("eager")
+        self.assertIn("__json__", tm.__dict__)
+        self.assertEqual(tm.__json__["a1"], [1, 2])
+
+    def test_340_001_None(self):
+        """The module can be created without the parsed json"""
+        tm = self.createModule("none")
+        self.assertFalse(hasattr(tm, "__json__"))
+        self.assertEqual(tm.a1, [1, 2])
+        self.assertEqual(tm.classa().x, 1)
+
+    @unittest.skipIf(sys.version_info < (3, 7),
+                     "Module __getattr__ requires Python 3.7")
+    def test_340_002_Lazy(self):
+        """The json is rebuilt from the file when it is accessed"""
+        tm = self.createModule("lazy")
+        self.assertNotIn("__json__", tm.__dict__)
+        self.assertEqual(tm.__json__, {"a1": [1, 2], "classa": {"x": 1}})
+        self.assertIsNot(tm.__json__, tm.__json__)
+        self.assertIn("__json__", dir(tm))
+        self.assertFalse(hasattr(tm, "missing"))
+
+    def test_340_003_Unknown(self):
+        """An unknown option is an error"""
+        with self.assertRaises(ValueError):
+            self.createModule("sometimes")
+
+
+class NumericArrays(JsonModuleTest, unittest.TestCase):
+    """Test array backed numeric module attributes"""
+    content = ('{"t1": [1, 2, 3], "t2": [1.5, 2], "grid": [[1, 2], [3, 4.5]],'
+               ' "mixed": [1, true], "ragged": [[1], [2, 3]], "empty": [],'
+               ' "huge": [1, 100000000000000000000]}')
+
+    def tearDown(self):
+        importjson.configure("NumericArrays", None)
+        super(NumericArrays, self).tearDown()
+
+    def createModule(self, content, numeric_arrays=None):
+        """Create & import a json module"""
+        importjson.configure("NumericArrays", numeric_arrays)
+        return importlib.import_module(self.createFile(content))
+
+    def test_350_000_NoArrays(self):
+        """By default numeric lists are lists"""
+        tm = self.createModule(self.content)
+        self.assertIsInstance(tm.t1, list)
+        self.assertNotIn("_numeric_array", tm.__dict__)
+
+    def test_350_001_AllArrays(self):
+        """Every numeric list can be an array"""
+        tm = self.createModule(self.content, "array")
+        self.assertEqual(tm.t1, array.array('q', [1, 2, 3]))
+        self.assertEqual(tm.t2, array.array('d', [1.5, 2.0]))
+        self.assertEqual(tm.grid, [array.array('d', [1, 2]),
+                                   array.array('d', [3, 4.5])])
+
+        # Not homogeneous numeric lists
+        self.assertEqual(tm.mixed, [1, True])
+        self.assertEqual(tm.ragged, [[1], [2, 3]])
+        self.assertEqual(tm.empty, [])
+        self.assertEqual(tm.huge, [1, 100000000000000000000])
+
+        # The json is unchanged
+        self.assertEqual(tm.__json__["t1"], [1, 2, 3])
+
+    def test_350_002_NamedArrays(self):
+        """Attributes can be named as arrays in the json"""
+        tm = self.createModule('{"__arrays__": ["t1"], "t1": [1, 2],'
+                               ' "t2": [3, 4]}')
+        self.assertEqual(tm.t1, array.array('q', [1, 2]))
+        self.assertEqual(tm.t2, [3, 4])
+        self.assertFalse(hasattr(tm, "__arrays__"))
+
+    def test_350_003_InvalidNamedArrays(self):
+        """__arrays__ must be a list of names"""
+        with self.assertRaises(ImportError):
+            self.createModule('{"__arrays__": "t1", "t1": [1, 2]}')
+
+    def test_350_004_FloatPrecision(self):
+        """Integers beyond 2 ** 53 never become floats"""
+        tm = self.createModule('{"exact": [9007199254740992, 0.5],'
+                               ' "inexact": [9007199254740993, 0.5],'
+                               ' "negative": [-9007199254740993, 0.5],'
+                               ' "ints": [9007199254740993, 1]}', "array")
+        self.assertEqual(tm.exact, array.array('d', [2 ** 53, 0.5]))
+        self.assertEqual(tm.inexact, [9007199254740993, 0.5])
+        self.assertEqual(tm.negative, [-9007199254740993, 0.5])
+        self.assertEqual(tm.ints, array.array('q', [2 ** 53 + 1, 1]))
+
+    @unittest.skipIf(numpy is None, "Requires numpy")
+    def test_350_010_NumpyArrays(self):
+        """Numeric lists can be numpy arrays"""
+        tm = self.createModule(self.content, "numpy")
+        self.assertEqual(tm.t1.tolist(), [1, 2, 3])
+        self.assertEqual(tm.grid.shape, (2, 2))
+        self.assertEqual(tm.grid[1, 1], 4.5)
+
+
+class ItemConstraints(JsonModuleTest, unittest.TestCase):
+    """Test the element constraints on list attributes"""
+    content = ('{"c": {"p": [0.5, 0.2], "q": [1, 2], "r": [],'
+               ' "__constraints__": {'
+               '"p": {"type": "list", "max_length": 3, "storage": "array",'
+               ' "items": {"type": "float", "min": 0, "max": 1}},'
+               '"q": {"items": {"type": "int"}, "min_length": 1}}}}')
+
+    def test_360_000_Defaults(self):
+        """The defaults are checked, and stored as an array if required"""
+        tm = self.createModule(self.content)
+        inst = tm.c()
+        self.assertEqual(inst.p, array.array('d', [0.5, 0.2]))
+        self.assertEqual(inst.q, [1, 2])
+
+    def test_360_001_ItemRange(self):
+        """Items outside the range are rejected"""
+        inst = self.createModule(self.content).c()
+        with self.assertRaises(ValueError):
+            inst.p = [0.5, 2.0]
+        with self.assertRaises(ValueError):
+            inst.p = array.array('d', [-0.5])
+
+    def test_360_002_ItemType(self):
+        """Items of the wrong type are rejected - as are tuples"""
+        tm = self.createModule(self.content)
+        inst = tm.c()
+        with self.assertRaises(TypeError):
+            inst.p = [0.5, "a"]
+        with self.assertRaises(TypeError):
+            inst.q = [1, 2.5]
+        with self.assertRaises(TypeError):
+            inst.q = array.array('d', [1.0])
+        with self.assertRaises(TypeError):
+            inst.p = "abc"
+        with self.assertRaises(TypeError):
+            inst.q = (1, 2)
+        with self.assertRaises(TypeError):
+            tm.c(q=(1, 2))
+
+    def test_360_003_Length(self):
+        """The list length is constrained"""
+        inst = self.createModule(self.content).c()
+        with self.assertRaises(ValueError):
+            inst.p = [0.1] * 4
+        with self.assertRaises(ValueError):
+            inst.q = []
+
+    def test_360_004_Storage(self):
+        """Lists are stored as arrays, arrays are accepted as is"""
+        tm = self.createModule(self.content)
+        inst = tm.c(p=[0.25, 1])
+        self.assertEqual(inst.p, array.array('d', [0.25, 1.0]))
+
+        value = array.array('d', [0.75])
+        inst.p = value
+        self.assertIs(inst.p, value)
+
+        inst.q = array.array('q', [3])
+        self.assertEqual(inst.q, array.array('q', [3]))
+
+    def test_360_005_InvalidStorage(self):
+        """Array storage requires numeric items"""
+        with self.assertRaises(ImportError):
+            self.createModule('{"c": {"p": [], "__constraints__": {'
+                              '"p": {"storage": "array",'
+                              ' "items": {"type": "str"}}}}}')
+
+    def test_360_006_MutableDefaults(self):
+        """A passed value is used, and a default list isn't shared"""
+        tm = self.createModule(self.content)
+        first, second = tm.c(), tm.c(q=[7])
+        self.assertEqual(second.q, [7])
+        self.assertIsNot(first.q, tm.c().q)
+
+    @unittest.skipIf(numpy is None, "Requires numpy")
+    def test_360_010_NumpyArrays(self):
+        """numpy arrays are checked by dtype and range"""
+        inst = self.createModule(self.content).c()
+        inst.p = numpy.array([0.5, 0.75])
+        with self.assertRaises(ValueError):
+            inst.p = numpy.array([0.5, 1.75])
+        with self.assertRaises(TypeError):
+            inst.q = numpy.array([0.5])
+
+
+class RecordLists(JsonModuleTest, unittest.TestCase):
+    """Test the lazily decoded lists of records"""
+    content = ('{"__records__": ["rows", "values"], "a": 1,\n'
+               ' "rows": [ {"id": 0, "name": "a, [b]"} ,\n'
+               '   {"id": 1, "name": "\u00e9t\u00e9"}, {"id": 2, "name": "c"}],\n'
+               ' "values": [], "plain": [1, 2]}')
+
+    def tearDown(self):
+        importjson.configure("CacheDirectory", None)
+        super(RecordLists, self).tearDown()
+
+    def test_370_000_Access(self):
+        """Records are accessed by position, slice & iteration"""
+        from importjson.records import RecordList
+        tm = self.createModule(self.content)
+        self.assertIsInstance(tm.rows, RecordList)
+        self.assertEqual(len(tm.rows), 3)
+        self.assertEqual(tm.rows[0]["name"], "a, [b]")
+        self.assertEqual(tm.rows[-2]["name"], u"\u00e9t\u00e9")
+        self.assertEqual([row["id"] for row in tm.rows[1:]], [1, 2])
+        self.assertEqual([row["id"] for row in tm.rows], [0, 1, 2])
+        self.assertEqual(tm.rows, [{"id": 0, "name": "a, [b]"},
+                                   {"id": 1, "name": u"\u00e9t\u00e9"},
+                                   {"id": 2, "name": "c"}])
+        with self.assertRaises(IndexError):
+            tm.rows[3]
+
+    def test_370_001_OtherAttributes(self):
+        """Other attributes are unchanged"""
+        tm = self.createModule(self.content)
+        self.assertEqual(tm.a, 1)
+        self.assertEqual(tm.plain, [1, 2])
+        self.assertEqual(len(tm.values), 0)
+        self.assertFalse(hasattr(tm, "__records__"))
+
+    def test_370_002_DecodedOnAccess(self):
+        """Each access decodes the record"""
+        tm = self.createModule(self.content)
+        self.assertIsNot(tm.rows[0], tm.rows[0])
+
+    def test_370_003_InvalidRecords(self):
+        """__records__ must name top level lists"""
+        with self.assertRaises(ImportError):
+            self.createModule('{"__records__": ["a"], "a": 1}')
+        with self.assertRaises(ImportError):
+            self.createModule('{"__records__": "a", "a": [1]}')
+
+    def test_370_004_CachedIndex(self):
+        """With a cache, the records aren't decoded when imported again"""
+        from importjson import records
+        with TestDirCont() as cache_dir:
+            importjson.configure("CacheDirectory", cache_dir)
+            tm = self.createModule(self.content)
+            name = tm.__name__
+            importjson.unload(name)
+
+            def index_records(buffer, names):
+                """The records must not be indexed again"""
+                raise AssertionError("Indexed")
+
+            original, records.index_records = (records.index_records,
+                                               index_records)
+            try:
+                tm = importlib.import_module(name)
+                self.assertEqual(tm.rows[2]["name"], "c")
+            finally:
+                records.index_records = original
+
+    def test_370_005_IndexRecords(self):
+        """The start & end of each record is found"""
+        from importjson.records import index_records
+        raw = b'{"x": {"y": [1]}, "y" : [ 1 , "]" ,{} ], "z": []}'
+        index = index_records(raw, ["y", "z"])
+        start, end, offsets = index["y"]
+        self.assertEqual(raw[start:end], b'[ 1 , "]" ,{} ]')
+        self.assertEqual([raw[offsets[i]:offsets[i + 1]]
+                          for i in range(0, len(offsets), 2)],
+                         [b'1', b'"]"', b'{}'])
+        self.assertEqual(len(index["z"][2]), 0)
+
+    def test_370_006_SinglePass(self):
+        """Without a cache the records are indexed, but never parsed"""
+        parsed = []
+        original = importjson.importjson._parse_json
+
+        def parse_json(raw, *args):
+            """Record the json which is parsed"""
+            parsed.append(raw)
+            return original(raw, *args)
+
+        importjson.importjson._parse_json = parse_json
+        try:
+            tm = self.createModule(self.content)
+        finally:
+            importjson.importjson._parse_json = original
+
+        self.assertEqual(len(parsed), 1)
+        self.assertNotIn(b'"id"', parsed[0])
+        self.assertIn(b'"plain": [1, 2]', parsed[0])
+        self.assertEqual(tm.rows[2]["name"], "c")
+
+    def test_370_007_NamesAfterRecords(self):
+        """__records__ can follow the lists it names"""
+        tm = self.createModule('{"rows": [{"id": 1}], "plain": [1],'
+                               ' "__records__": ["rows"]}')
+        self.assertEqual(tm.rows, [{"id": 1}])
+        self.assertEqual(tm.plain, [1])
+
+    def test_370_008_InvalidJson(self):
+        """Invalid json is a ValueError, or an ImportError when imported"""
+        from importjson.records import index_records
+        with self.assertRaises(ValueError):
+            index_records(b'{"y": [1, }', ["y"])
+        with self.assertRaises(ValueError):
+            index_records(b'{"y": [1, ', ["y"])
+        with self.assertRaises(ImportError):
+            self.createModule('{"__records__": ["y"], "y": [1, ]}')
+
+    def test_370_009_Released(self):
+        """Unloading the module forgets the index & closes the json file"""
+        from importjson import records
+        tm = self.createModule(self.content)
+        self.assertEqual(tm.rows[0]["id"], 0)
+        self.assertIn(tm.__file__, records._indexes)
+
+        importjson.unload(tm.__name__)
+        self.assertNotIn(tm.__file__, records._indexes)
+        self.assertTrue(tm.rows._buffer.closed)
+
+
+class ParallelGeneration(JsonModuleTest, unittest.TestCase):
+    """Test the generation & compilation of a module by many processes"""
+
+    def setUp(self):
+        from importjson import parallel
+        super(ParallelGeneration, self).setUp()
+        self.chunk_size, parallel._chunk_size = parallel._chunk_size, 2
+
+    def tearDown(self):
+        from importjson import parallel
+        parallel._chunk_size = self.chunk_size
+        importjson.configure("GenerateWorkers", None)
+        super(ParallelGeneration, self).tearDown()
+
+    def content(self):
+        """Classes which are distinct from those in any other test"""
+        prefix = ModuleContentTest._random_name()
+        classes = collections.OrderedDict(
+            ("c{}".format(index),
+             {"{}_{}".format(prefix, index): index,
+              "__constraints__": {"{}_{}".format(prefix, index):
+                                  {"type": "int"}}})
+            for index in range(12))
+        classes["c0"]["__parent__"] = "c11"
+        return prefix, json.dumps(classes)
+
+    def createModule(self, content, workers):
+        """Create & import a json module"""
+        importjson.configure("GenerateWorkers", workers)
+        return importlib.import_module(self.createFile(content))
+
+    @unittest.skipUnless(hasattr(os, "fork"), "Requires fork")
+    def test_380_000_IdenticalSource(self):
+        """The source is the same as the serially generated source"""
+        from importjson.importjson import JSONLoader
+        prefix, content = self.content()
+        tm = self.createModule(content, 3)
+        source = JSONLoader().get_source(tm.__name__)
+
+        importjson.internal._factory_sources.clear()
+        importjson.configure("GenerateWorkers", None)
+        self.assertEqual(JSONLoader().get_source(tm.__name__), source)
+
+    @unittest.skipUnless(hasattr(os, "fork"), "Requires fork")
+    def test_380_001_Classes(self):
+        """The classes are created - each after the class it inherits from"""
+        prefix, content = self.content()
+        tm = self.createModule(content, 3)
+        self.assertTrue(issubclass(tm.c0, tm.c11))
+        self.assertEqual(getattr(tm.c5(), "{}_5".format(prefix)), 5)
+        self.assertEqual([cls.name for cls in tm.get_classes()],
+                         ["c{}".format(index) for index in range(12)])
+
+    @unittest.skipUnless(hasattr(os, "fork"), "Requires fork")
+    def test_380_002_LineNumbers(self):
+        """Tracebacks refer to the lines of the generated source"""
+        import traceback
+        from importjson.importjson import JSONLoader
+        prefix, content = self.content()
+        tm = self.createModule(content, 3)
+        source = JSONLoader().get_source(tm.__name__)
+        lines = source.splitlines()
+
+        # The source is compiled by the processes
+        from importjson import parallel
+        self.assertIsNotNone(parallel.compile_source(
+            source, "x.json", 3, importjson.internal.factory_sources()))
+
+        try:
+            setattr(tm.c7(), "{}_7".format(prefix), "x")
+        except TypeError:
+            frame = traceback.extract_tb(sys.exc_info()[2])[-1]
+        else:
+            self.fail("TypeError not raised")
+
+        # The shared code of a class factory has a file of its own
+        if frame[0].startswith("<class factory "):
+            import linecache
+            self.assertIn("raise TypeError",
+                          linecache.getline(frame[0], frame[1]))
+        else:
+            self.assertIn("raise TypeError", lines[frame[1] - 1])
+
+    def test_380_003_ForwardParent(self):
+        """A class can inherit from a class defined later in the json"""
+        tm = self.createModule('{"b": {"__parent__": "a", "y": 2},'
+                               ' "a": {"x": 1}}', None)
+        self.assertEqual((tm.b().x, tm.b().y), (1, 2))
+
+    @unittest.skipUnless(hasattr(os, "fork"), "Requires fork")
+    def test_380_004_OtherThreads(self):
+        """A process running other threads generates the code serially"""
+        import threading
+        from importjson import parallel
+        prefix, content = self.content()
+        done = threading.Event()
+        thread = threading.Thread(target=done.wait)
+        thread.start()
+        try:
+            self.assertIsNone(parallel._pool(2))
+            tm = self.createModule(content, 3)
+        finally:
+            done.set()
+            thread.join()
+        self.assertEqual(getattr(tm.c5(), "{}_5".format(prefix)), 5)
+
+
+class ImportLimits(JsonModuleTest, unittest.TestCase):
+    """Test the resource limits applied to an import"""
+    content = ('{"__doc__": "[[[[[[", "a": [[[1]]], "b": 2,'
+               ' "c1": {"x": 1, "y": 2}, "c2": {"z": 3}}')
+    limits = ["MaxFileSize", "MaxDepth", "MaxClasses", "MaxAttributes",
+              "MaxSourceSize", "MaxImportSeconds"]
+
+    def tearDown(self):
+        for limit in self.limits:
+            importjson.configure(limit, None)
+        super(ImportLimits, self).tearDown()
+
+    def createModule(self, limit=None, value=None):
+        """Create & import a json module with a limit"""
+        if limit is not None:
+            importjson.configure(limit, value)
+        return importlib.import_module(self.createFile(self.content))
+
+    def assertExceeds(self, limit, value, description):
+        """The import fails - naming the limit"""
+        with six.assertRaisesRegex(self, ImportError,
+                                   "exceeds the {} limit".format(
+                                       description)):
+            self.createModule(limit, value)
+
+    def test_390_000_WithinLimits(self):
+        """A json file within every limit is imported"""
+        importjson.configure("MaxFileSize", len(self.content))
+        for limit, value in [("MaxDepth", 4), ("MaxClasses", 2),
+                             ("MaxAttributes", 5), ("MaxSourceSize", 10 ** 6),
+                             ("MaxImportSeconds", 60)]:
+            importjson.configure(limit, value)
+        tm = self.createModule()
+        self.assertEqual(tm.c1().y, 2)
+
+    def test_390_001_FileSize(self):
+        """A json file larger than the limit is rejected"""
+        self.assertExceeds("MaxFileSize", len(self.content) - 1, "file size")
+
+    def test_390_002_Depth(self):
+        """Nesting deeper than the limit is rejected"""
+        self.assertExceeds("MaxDepth", 3, "nesting depth")
+
+    def test_390_003_Classes(self):
+        """Too many classes are rejected"""
+        self.assertExceeds("MaxClasses", 1, "number of classes")
+
+    def test_390_004_Attributes(self):
+        """Too many attributes are rejected"""
+        self.assertExceeds("MaxAttributes", 4, "number of attributes")
+
+    def test_390_005_SourceSize(self):
+        """Too much generated source is rejected"""
+        self.assertExceeds("MaxSourceSize", 1000, "generated source size")
+
+    def test_390_006_ImportTime(self):
+        """An import which takes too long is abandoned"""
+        self.assertExceeds("MaxImportSeconds", 0, "import time")
+
+    def test_390_007_DepthIgnoresStrings(self):
+        """Brackets within strings are not nesting"""
+        from importjson.limits import ImportLimits as Limits
+        limits = Limits("x.json", max_depth=2)
+        limits.check_depth(b'{"a": "[[[{{", "b": ["\\"[["]}')
+        with self.assertRaises(ImportError):
+            limits.check_depth(b'{"a": [[]]}')
+
+    def test_390_008_ListTime(self):
+        """The time is checked while a long list is parsed"""
+        from importjson.limits import ImportLimits as Limits
+        hooks = Limits("x.json", max_seconds=0).parser_hooks(dict)
+        with six.assertRaisesRegex(self, ImportError, "import time"):
+            json.loads("[" + ", ".join(["1.5"] * 10000) + "]", **hooks)
+
+        hooks = Limits("x.json", max_seconds=60).parser_hooks(dict)
+        self.assertEqual(json.loads('[1, 2.5, {"a": 3}]', **hooks),
+                         [1, 2.5, {"a": 3}])
+
+
+class SharedDefaults(JsonModuleTest, unittest.TestCase):
+    """Test mutable defaults which are shared until changed"""
+    content = ('{"k": {"d": {"a": [1, 2], "b": 2}, "l": [1, [2]], "n": 3},'
+               ' "j": {"__parent__": "k", "m": {"x": 1}}}')
+
+    def tearDown(self):
+        importjson.configure("SharedDefaults", False)
+        super(SharedDefaults, self).tearDown()
+
+    def createModule(self, shared=True):
+        """Create & import a json module"""
+        importjson.configure("SharedDefaults", shared)
+        return importlib.import_module(self.createFile(self.content))
+
+    def test_400_000_NotShared(self):
+        """By default every instance has its own defaults"""
+        tm = self.createModule(shared=False)
+        first, second = tm.k(), tm.k()
+        self.assertIsNot(first.d, second.d)
+        self.assertIsInstance(first.d, dict)
+        self.assertEqual(first.d, {"a": [1, 2], "b": 2})
+
+    def test_400_001_Shared(self):
+        """The default is built once and shared"""
+        tm = self.createModule()
+        first, second = tm.k(), tm.k()
+        self.assertIs(first._d, second._d)
+        self.assertEqual(first.d, {"a": [1, 2], "b": 2})
+        self.assertEqual(first.l, [1, [2]])
+        self.assertEqual(first.d["b"], 2)
+        self.assertEqual(len(first.l), 2)
+
+    def test_400_002_CopiedOnChange(self):
+        """Changing the default only changes that instance"""
+        tm = self.createModule()
+        first, second = tm.k(), tm.k()
+        first.d["b"] = 5
+        first.l.append(3)
+        self.assertEqual(first.d, {"a": [1, 2], "b": 5})
+        self.assertEqual(first.l, [1, [2], 3])
+        self.assertIsInstance(first.d, dict)
+        self.assertEqual(second.d, {"a": [1, 2], "b": 2})
+        self.assertEqual(second.l, [1, [2]])
+
+    def test_400_003_NestedChange(self):
+        """Changing a nested item only changes that instance"""
+        tm = self.createModule()
+        first, second = tm.k(), tm.k()
+        first.d["a"].append(3)
+        first.l[1].append(3)
+        self.assertEqual(first.d["a"], [1, 2, 3])
+        self.assertEqual(first.l, [1, [2, 3]])
+        self.assertEqual(second.d["a"], [1, 2])
+        self.assertEqual(tm.k().l, [1, [2]])
+
+    def test_400_004_Reassignment(self):
+        """Augmented assignment & assignment from another instance"""
+        tm = self.createModule()
+        first, second = tm.k(), tm.k()
+        first.l += [9]
+        self.assertEqual(first.l, [1, [2], 9])
+        self.assertEqual(second.l, [1, [2]])
+
+        # As with any other value, both instances then have the same dict
+        second.d = first.d
+        self.assertIsInstance(second._d, dict)
+        second.d["b"] = 7
+        self.assertEqual(first.d["b"], 7)
+        self.assertEqual(tm.k().d["b"], 2)
+
+        third = tm.k(d=tm.k().d)
+        self.assertIsInstance(third._d, dict)
+
+    def test_400_005_Inherited(self):
+        """Subclasses share their own and inherited defaults"""
+        tm = self.createModule()
+        inst = tm.j()
+        self.assertEqual(inst.m, {"x": 1})
+        self.assertEqual(inst.d, {"a": [1, 2], "b": 2})
+        inst.m["y"] = 2
+        self.assertEqual(tm.j().m, {"x": 1})
+
+    def test_400_006_GivenValue(self):
+        """A given value is used as is"""
+        tm = self.createModule()
+        value = [4]
+        self.assertIs(tm.k(l=value).l, value)
+
+    def test_400_007_OrdinaryValues(self):
+        """The value read is an ordinary list or dictionary"""
+        tm = self.createModule()
+        inst = tm.k()
+        self.assertIs(type(inst.l), list)
+        self.assertIs(type(inst.d), dict)
+        self.assertEqual(json.loads(json.dumps(tm.k().l)), [1, [2]])
+        self.assertEqual([0] + tm.k().l, [0, 1, [2]])
+        self.assertIs(inst.l, inst.l)
+
+    def test_400_008_ValueReadBeforeChange(self):
+        """A value read before the attribute is changed is not the new
+           value"""
+        tm = self.createModule()
+        inst = tm.k()
+        value = inst.l
+        inst.l = [9]
+        value.append(1)
+        self.assertEqual(inst.l, [9])
+        self.assertEqual(value, [1, [2], 1])
+        self.assertEqual(tm.k().l, [1, [2]])
+
+    def test_400_009_ReadCost(self):
+        """Reading a large shared default costs far less than building it"""
+        self.content = json.dumps(
+            {"k": {"d": dict(("k{}".format(index), index)
+                             for index in range(300))}})
+        for backend in ("code", "tables"):
+            importjson.configure("ClassBackend", backend)
+            try:
+                built, shared = (self.createModule(shared=shared).k
+                                 for shared in (False, True))
+            finally:
+                importjson.configure("ClassBackend", "code")
+
+            built_cost, shared_cost = (
+                min(timeit.repeat(lambda: cls().d, number=200, repeat=5))
+                for cls in (built, shared))
+            self.assertLess(shared_cost, built_cost / 2)
+            self.assertEqual(shared().d, built().d)
+
+
+class PlainAttributes(JsonModuleTest, unittest.TestCase):
+    """Test unconstrained attributes stored directly in the instance"""
+    content = ('{"k": {"a": 1, "l": [1], "b": 2, "c": 3, "r": 4,'
+               ' "__constraints__": {"b": {"type": "int", "min": 0},'
+               ' "c": {"not_none": false}, "r": {"read_only": true}}},'
+               ' "j": {"__parent__": "k", "a": 5, "m": {"x": 1},'
+               ' "__constraints__": {"a": {"max": 10}}}}')
+
+    def tearDown(self):
+        importjson.configure("PlainAttributes", False)
+        super(PlainAttributes, self).tearDown()
+
+    def createModule(self, plain=True):
+        """Create & import a json module"""
+        importjson.configure("PlainAttributes", plain)
+        return importlib.import_module(self.createFile(self.content))
+
+    def test_410_000_NotPlain(self):
+        """By default every attribute is a property"""
+        tm = self.createModule(plain=False)
+        self.assertTrue(inspect.isdatadescriptor(tm.k.a))
+        self.assertEqual(tm.k().__dict__["_a"], 1)
+
+    def test_410_001_Plain(self):
+        """Unconstrained attributes are stored directly"""
+        tm = self.createModule()
+        inst = tm.k(a=7, l=None)
+        self.assertFalse(hasattr(tm.k, "a"))
+        self.assertFalse(hasattr(tm.k, "_constrain_l"))
+        self.assertEqual(inst.__dict__["a"], 7)
+        self.assertEqual(inst.l, [1])
+        self.assertIsNot(inst.l, tm.k().l)
+        self.assertFalse(hasattr(tm.k, "c"))
+        inst.a = "any value"
+        self.assertEqual(inst.a, "any value")
+        self.assertEqual(repr(inst), "k(a='any value', l=[1], b=2, c=3, r=4)")
+
+    def test_410_002_Constrained(self):
+        """Constrained & read only attributes keep their properties"""
+        tm = self.createModule()
+        inst = tm.k()
+        self.assertTrue(inspect.isdatadescriptor(tm.k.b))
+        self.assertTrue(inspect.isdatadescriptor(tm.k.r))
+        with six.assertRaisesRegex(self, ValueError, "Range Error"):
+            inst.b = -1
+        with six.assertRaisesRegex(self, ValueError, "read only"):
+            inst.r = 5
+
+    def test_410_003_Inherited(self):
+        """A constraint in either class applies to the attribute"""
+        tm = self.createModule()
+        inst = tm.j()
+        self.assertEqual((inst.a, inst.b, inst.m), (5, 2, {"x": 1}))
+        with six.assertRaisesRegex(self, ValueError, "Range Error"):
+            inst.a = 11
+        with six.assertRaisesRegex(self, ValueError, "Range Error"):
+            inst.b = -1
+        self.assertEqual(repr(inst), "j(a=5, m={'x': 1})")
+
+    def test_410_004_InstanceAttributes(self):
+        """The instance attribute information is unchanged"""
+        tm = self.createModule()
+        self.assertEqual([(attr.name, attr.default)
+                          for attr in tm.k.get_instance_attributes()],
+                         [("a", 1), ("l", [1]), ("b", 2), ("c", 3), ("r", 4)])
+
+
+class ClassTables(JsonModuleTest, unittest.TestCase):
+    """Test classes built from tables by the shared runtime"""
+    content = ('{"__doc__": "Tables", "k": {"__doc__": "Class k",'
+               ' "__class_attributes__": {"ca": [1, 2]},'
+               ' "a": 1, "l": [1], "b": 2, "r": 4, "p": null, "o": null,'
+               ' "i": [3], "__repr__": "<{class_name} {a}>",'
+               ' "__str__": "{module_name}.{class_name}",'
+               ' "__constraints__": {"b": {"type": "int", "min": 0,'
+               ' "max": 10}, "r": {"read_only": true},'
+               ' "p": {"type": "point"}, "o": {"not_none": false},'
+               ' "i": {"items": {"type": "int", "max": 5}}}},'
+               ' "j": {"__parent__": "k", "a": 5, "m": {"x": 1}, "b": 2,'
+               ' "__constraints__": {"b": {"min": 1}}},'
+               ' "point": {"x": 0}}')
+
+    def tearDown(self):
+        for key in ("ClassBackend", "SharedDefaults", "PlainAttributes"):
+            importjson.configure(key, importjson.get_configure(key) and
+                                 {"ClassBackend": "code"}.get(key, False))
+        super(ClassTables, self).tearDown()
+
+    def createModule(self, backend="tables", **options):
+        """Create & import a json module"""
+        importjson.configure("ClassBackend", backend)
+        for key, value in options.items():
+            importjson.configure(key, value)
+        return importlib.import_module(self.createFile(self.content))
+
+    def test_420_000_Tables(self):
+        """The module has a table for each class - and no class factories"""
+        tm = self.createModule()
+        source = tm.__loader__.get_source(tm.__name__)
+        self.assertIn("k = _build_class(", source)
+        self.assertNotIn("_class_factory_", source)
+        self.assertEqual(tm.k.__module__, tm.__name__)
+        self.assertEqual(tm.k.__doc__, "Class k")
+        self.assertEqual(tm.k.ca, [1, 2])
+        self.assertEqual([cls.name for cls in tm.get_classes()],
+                         ["k", "j", "point"])
+
+    def test_420_001_Initializer(self):
+        """Instances are initialised as by the class factories"""
+        tm = self.createModule()
+        inst = tm.j(7, {"y": 2}, 3, 0, [2], 6, r=5)
+        self.assertEqual((inst.a, inst.m, inst.b, inst.l, inst.r),
+                         (7, {"y": 2}, 3, [2], 5))
+        self.assertIsNot(tm.k().l, tm.k().l)
+        self.assertEqual(tm.k().l, [1])
+        with self.assertRaises(TypeError):
+            tm.k(2, a=3)
+
+    def test_420_002_Constraints(self):
+        """The constraints are applied"""
+        tm = self.createModule()
+        inst = tm.k()
+        with six.assertRaisesRegex(self, ValueError,
+                                   "'b' must be between 0 and 10"):
+            inst.b = 11
+        with six.assertRaisesRegex(self, TypeError, "must be of type int"):
+            inst.b = "a"
+        with six.assertRaisesRegex(self, ValueError, "k.r is read only"):
+            inst.r = 1
+        with six.assertRaisesRegex(self, TypeError, "must be of type point"):
+            inst.p = 1
+        inst.p = tm.point(x=3)
+        self.assertEqual(inst.p.x, 3)
+        with six.assertRaisesRegex(self, ValueError, "must be <= 5"):
+            inst.i = [6]
+        inst.o = None
+        self.assertIsNone(inst.o)
+
+    def test_420_003_InheritedConstraints(self):
+        """The constraints of the base class are applied as well"""
+        tm = self.createModule()
+        inst = tm.j()
+        with six.assertRaisesRegex(self, ValueError, "must be >= 1"):
+            inst.b = 0
+        with six.assertRaisesRegex(self, ValueError, "between 0 and 10"):
+            inst.b = 11
+
+    def test_420_004_ExtendedConstraints(self):
+        """A subclass can extend the constraints"""
+        tm = self.createModule()
+
+        class Even(tm.k):
+            def _constrain_b(self, value):
+                value = super(Even, self)._constrain_b(value)
+                if value % 2:
+                    raise ValueError("b must be even")
+                return value
+
+        inst = Even()
+        inst.b = 4
+        with six.assertRaisesRegex(self, ValueError, "must be even"):
+            inst.b = 3
+        with six.assertRaisesRegex(self, ValueError, "between 0 and 10"):
+            inst.b = 12
+
+    def test_420_005_Representation(self):
+        """repr, str & the attribute information"""
+        tm = self.createModule()
+        self.assertEqual(repr(tm.k()), "<k 1>")
+        self.assertEqual(str(tm.k()), "{}.k".format(tm.__name__))
+        self.assertEqual(repr(tm.j()), "j(a=5, m={'x': 1}, b=2)")
+        self.assertEqual(list(tm.k.get_class_attributes()), [("ca", [1, 2])])
+        self.assertEqual([tuple(attr) for attr in
+                          tm.j.get_instance_attributes()],
+                         [("a", 5), ("m", {"x": 1}), ("b", 2)])
+
+    def test_420_006_Options(self):
+        """Plain attributes and shared defaults are supported"""
+        tm = self.createModule(PlainAttributes=True, SharedDefaults=True)
+        first, second = tm.k(), tm.k()
+        self.assertFalse(hasattr(tm.k, "a"))
+        self.assertIs(first._i, second._i)
+        first.i.append(4)
+        self.assertEqual((first.i, second.i), ([3, 4], [3]))
+        with six.assertRaisesRegex(self, ValueError, "between 0 and 10"):
+            first.b = 11
+
+    def test_420_007_SharedImplementation(self):
+        """The classes share their methods"""
+        tm = self.createModule()
+        self.assertIs(tm.k.__init__.__code__, tm.j.__init__.__code__)
+        self.assertIs(type(vars(tm.k)["b"]), type(vars(tm.j)["b"]))
+
+    def test_420_008_UnknownBackend(self):
+        """An unknown backend is rejected"""
+        with self.assertRaises(ImportError):
+            self.createModule(backend="bytecode")
+
+    def test_420_009_Standalone(self):
+        """Compiled modules always use class factories"""
+        import importjson.compiler
+        importjson.configure("ClassBackend", "tables")
+        path = os.path.join(self.tempd, "standalone.json")
+        with open(path, "w") as fp:
+            fp.write(self.content)
+        source = importjson.compiler.generate_source(path)
+        self.assertNotIn("_build_class", source)
+
+    @unittest.skipUnless(hasattr(inspect, "signature"), "Requires signature")
+    def test_420_010_Introspection(self):
+        """The methods have the signature & names of the generated code"""
+        tables, code = self.createModule(), self.createModule("code")
+        for name in ("k", "j", "point"):
+            self.assertEqual(str(inspect.signature(getattr(tables, name))),
+                             str(inspect.signature(getattr(code, name))))
+        self.assertEqual(str(inspect.signature(tables.k))[:14],
+                         "(a=1, l=None, ")
+        for method in ("__init__", "__repr__", "__str__",
+                       "get_instance_attributes"):
+            self.assertEqual(getattr(tables.k, method).__qualname__,
+                             "k." + method)
+
+
+class JsonDecoding(JsonModuleTest, unittest.TestCase):
+    """Test json payloads decoded straight into instances"""
+    content = ('{"tenant": {"id": 0, "name": "", "tags": [], "limits": null,'
+               ' "contacts": [],'
+               ' "__constraints__": {"id": {"type": "int", "min": 0},'
+               ' "name": {"not_none": true}, "limits": {"type": "limits"},'
+               ' "contacts": {"items": {"type": "contact"}}}},'
+               ' "limits": {"cpu": 1, "burst": false,'
+               ' "__constraints__": {"cpu": {"type": "int", "min": 1}}},'
+               ' "contact": {"role": "", "notify": true},'
+               ' "special": {"__parent__": "tenant", "level": 1},'
+               ' "premium": {"__parent__": "tenant", "contacts": [],'
+               ' "__constraints__": {"contacts": {"max_length": 1}}},'
+               ' "basic": {"__parent__": "tenant", "limits": null}}')
+    backends = ("code", "tables")
+
+    def tearDown(self):
+        for key in ("ClassBackend", "SharedDefaults", "PlainAttributes"):
+            importjson.configure(key, importjson.get_configure(key) and
+                                 {"ClassBackend": "code"}.get(key, False))
+        super(JsonDecoding, self).tearDown()
+
+    def createModule(self, backend, **options):
+        """Create & import a json module"""
+        importjson.configure("ClassBackend", backend)
+        for key, value in options.items():
+            importjson.configure(key, value)
+        return importlib.import_module(self.createFile(self.content))
+
+    def modules(self):
+        """A module for each backend - with & without plain attributes"""
+        for backend in self.backends:
+            for plain in (False, True):
+                yield self.createModule(backend, PlainAttributes=plain)
+
+    def test_430_000_Loads(self):
+        """A json object is decoded as an instance - with its defaults"""
+        for tm in self.modules():
+            inst = tm.tenant.loads('{"id": 3, "name": "acme"}')
+            self.assertIsInstance(inst, tm.tenant)
+            self.assertEqual((inst.id, inst.name, inst.tags, inst.limits,
+                              inst.contacts), (3, "acme", [], None, []))
+            self.assertEqual(repr(inst), repr(tm.tenant(id=3, name="acme")))
+            inst.tags.append("gold")
+            self.assertEqual(tm.tenant.loads('{}').tags, [])
+            with six.assertRaisesRegex(self, ValueError, "must be >= 0"):
+                inst.id = -1
+
+    def test_430_001_Nested(self):
+        """Nested objects & lists of objects are decoded as instances"""
+        for tm in self.modules():
+            inst = tm.tenant.loads(
+                '{"limits": {"cpu": 2}, "tags": [{"a": 1}],'
+                ' "contacts": [{"role": "owner"}, {"role": "billing",'
+                ' "notify": false}]}')
+            self.assertIsInstance(inst.limits, tm.limits)
+            self.assertEqual((inst.limits.cpu, inst.limits.burst),
+                             (2, False))
+            self.assertEqual([(contact.role, contact.notify)
+                              for contact in inst.contacts],
+                             [("owner", True), ("billing", False)])
+            self.assertEqual(inst.tags, [{"a": 1}])
+
+    def test_430_002_Constraints(self):
+        """The constraints are applied to the decoded values"""
+        for tm in self.modules():
+            with six.assertRaisesRegex(self, ValueError, "must be >= 0"):
+                tm.tenant.loads('{"id": -1}')
+            with six.assertRaisesRegex(self, TypeError, "must be of type"):
+                tm.tenant.loads('{"id": "1"}')
+            with six.assertRaisesRegex(self, ValueError, "cannot be None"):
+                tm.tenant.loads('{"name": null}')
+            with six.assertRaisesRegex(self, ValueError, "must be >= 1"):
+                tm.tenant.loads('{"limits": {"cpu": 0}}')
+            with self.assertRaises(TypeError):
+                tm.tenant.loads('{"contacts": [1]}')
+
+    def test_430_003_UnknownKeys(self):
+        """Keys which aren't attributes are ignored"""
+        for tm in self.modules():
+            inst = tm.contact.loads('{"role": "owner", "extra": 1}')
+            self.assertEqual(inst.role, "owner")
+            self.assertFalse(hasattr(inst, "extra"))
+
+    def test_430_004_LoadMany(self):
+        """A json list or json lines are decoded as a list of instances"""
+        for tm in self.modules():
+            for text in ('[{"role": "a"}, {"role": "b"}]',
+                         '{"role": "a"}\n{"role": "b"}\n',
+                         b'{"role": "a"} {"role": "b"}'):
+                stream = (io.BytesIO(text) if isinstance(text, bytes)
+                          else io.StringIO(six.text_type(text)))
+                self.assertEqual([inst.role for inst in
+                                  tm.contact.load_many(stream)], ["a", "b"])
+            self.assertEqual([inst.role for inst in tm.contact.loads(
+                b'[{"role": "a"}]')], ["a"])
+
+    def test_430_005_NotAnObject(self):
+        """Only json objects are decoded - and invalid json is rejected"""
+        for tm in self.modules():
+            with six.assertRaisesRegex(self, ValueError,
+                                       "expecting a json object for contact"):
+                tm.contact.loads('1')
+            with self.assertRaises(ValueError):
+                tm.contact.loads('{"role": ')
+
+    def test_430_006_Inherited(self):
+        """Generated subclasses decode their own & inherited attributes"""
+        for tm in self.modules():
+            inst = tm.special.loads('{"id": 2, "level": 3,'
+                                    ' "limits": {"cpu": 4}}')
+            self.assertEqual((inst.id, inst.level, inst.limits.cpu),
+                             (2, 3, 4))
+            with six.assertRaisesRegex(self, ValueError, "must be >= 0"):
+                tm.special.loads('{"id": -2}')
+
+    def test_430_007_Subclass(self):
+        """A subclass's extended constraints & initializer are used"""
+        for tm in self.modules():
+            class Tenant(tm.tenant):
+                def __init__(self, *args, **kwargs):
+                    super(Tenant, self).__init__(*args, **kwargs)
+                    self.initialised = True
+
+                def _constrain_id(self, value):
+                    value = super(Tenant, self)._constrain_id(value)
+                    if value % 2:
+                        raise ValueError("id must be even")
+                    return value
+
+            inst = Tenant.loads('{"id": 2, "limits": {"cpu": 2}}')
+            self.assertTrue(inst.initialised)
+            self.assertIsInstance(inst.limits, tm.limits)
+            with six.assertRaisesRegex(self, ValueError, "must be even"):
+                Tenant.loads('{"id": 3}')
+
+    def test_430_008_NestedConstraints(self):
+        """Nested instances are only trusted if their class is the only
+           constraint - in every class"""
+        from importjson import decoder
+        for tm in self.modules():
+            self.assertEqual(
+                [exact for _, _, _, exact in decoder._plan(tm.tenant).nested],
+                ["_limits", "_contacts"])
+
+            contacts = '{"contacts": [{"role": "a"}, {"role": "b"}]}'
+            self.assertEqual(len(tm.tenant.loads(contacts).contacts), 2)
+            with six.assertRaisesRegex(self, ValueError, "at most 1 items"):
+                tm.premium.loads(contacts)
+
+            # The constraints of a redefined attribute are inherited
+            self.assertIsInstance(
+                tm.basic.loads('{"limits": {"cpu": 2}}').limits, tm.limits)
+            with self.assertRaises(TypeError):
+                tm.basic.loads('{"limits": 5}')
+
+    def test_430_009_ConvertedSharedDefault(self):
+        """A shared default converted by its constraints isn't shared by
+           the decoded instances"""
+        self.content = ('{"c": {"p": [0.5], "__constraints__": {"p": '
+                        '{"storage": "array", "items": {"type": "float"}}}}}')
+        for backend in self.backends:
+            tm = self.createModule(backend, SharedDefaults=True)
+            first, second = tm.c.loads('[{}, {}]')
+            self.assertIsNot(first.p, second.p)
+            first.p.append(1.0)
+            self.assertEqual(list(second.p), [0.5])
+
+    def test_430_010_Released(self):
+        """The classes of an unloaded module are released once decoded"""
+        for backend in self.backends:
+            tm = self.createModule(backend)
+            tm.tenant.loads('{"limits": {"cpu": 2}, "contacts": [{}]}')
+            classes = [weakref.ref(tm.tenant), weakref.ref(tm.limits)]
+            importjson.unload(tm.__name__)
+            del tm
+            gc.collect()
+            self.assertEqual([cls() for cls in classes], [None, None])
+
+
 # noinspection PyUnusedLocal
 def load_tests(loader, tests=None, pattern=None):
     test_classes = [
@@ -1576,7 +4016,31 @@ def load_tests(loader, tests=None, pattern=None):
         ClassInheritanceExplicit,
         ClassInheritanceImplicit,
         ClassAttrConstraint,
-        ClassAttrConflictingConstratints
+        ClassAttrConflictingConstratints,
+        CompressedModules,
+        ZipArchiveModules,
+        BundleModules,
+        CompiledModules,
+        ReproducibleAndCachedModules,
+        RegisteredRoots,
+        ConcurrentLoading,
+        AsyncLoading,
+        ModuleRegistry,
+        SchemaDataModules,
+        SharedClassFactories,
+        CrossModuleReferences,
+        DirectoryPackages,
+        ParseModes,
+        ModuleJSONOptions,
+        NumericArrays,
+        ItemConstraints,
+        RecordLists,
+        ParallelGeneration,
+        ImportLimits,
+        SharedDefaults,
+        PlainAttributes,
+        ClassTables,
+        JsonDecoding,
     ]
 
     suite = unittest.TestSuite()